@@ -10,3 +10,6 @@ __version__ = '0.1.1'
 __author__ = 'Omni Digital'
 __license__ = 'MIT License'
 __url__ = 'https://github.com/omni-digital/do-audit'
+
+
+from do_audit.auditor import Auditor  # noqa: E402, F401
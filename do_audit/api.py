@@ -4,14 +4,70 @@ do-audit DigitalOcean API related code
 """
 from __future__ import unicode_literals
 
+import csv
+import datetime
+import itertools
+import json
+import os
+import socket
+from collections import OrderedDict
+
 import dateutil.parser
+import dateutil.tz
 import dns.zone
+import six
 import tablib
 
+from do_audit.metrics import METRICS_HEADERS
+from do_audit.resources import ResourceSnapshot
 from do_audit.utils import yes_no, droplet_url
 
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+ORPHANS_HEADERS = ['Issue', 'Domain', 'Subdomain', 'Record type', 'Address', 'Droplet']
+
+# Binary formats `export_columns` can write to, on top of the ones tablib supports
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+# Text formats `stream_rows` can write to as the rows are produced
+STREAMING_FORMATS = ('csv', 'tsv', 'json')
+
+ACCOUNT_HEADERS = ['Email', 'Status', 'Droplet limit', 'Floating IP limit', 'UUID']
+DOMAIN_HEADERS = ['Domain', 'Subdomain', 'Record type', 'Destination']
 
-def create_accounts_dataset(account, verbose=False):
+
+def select_headers(headers, default_headers, columns=None):
+    """
+    Pick the dataset headers that should be computed
+
+    :param headers: all available headers
+    :type headers: list of str
+    :param default_headers: headers used when no columns were requested
+    :type default_headers: list of str
+    :param columns: requested columns, in order
+    :type columns: list of str
+    :returns: dataset headers
+    :rtype: list of str
+    :raises ValueError: when one of the requested columns isn't available
+    """
+    if not columns:
+        return list(default_headers)
+
+    unknown = [column for column in columns if column not in headers]
+    if unknown:
+        raise ValueError("Unknown column(s): {}. Available columns: {}".format(
+            ', '.join(unknown), ', '.join(headers),
+        ))
+
+    return list(columns)
+
+
+def create_accounts_dataset(account, verbose=False, columns=None):
     """
     Create DigitalOcean account dataset
 
@@ -19,23 +75,32 @@ def create_accounts_dataset(account, verbose=False):
     :type account: digitalocean.Account.Account
     :param verbose: if account information should be verbose
     :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
     :returns: account dataset
     :rtype: tablib.Dataset
     """
-    email = account.email
-    if not account.email_verified:
-        email += ' (unverified)'
+    default_headers = ACCOUNT_HEADERS if verbose else ACCOUNT_HEADERS[:3]
+    headers = select_headers(ACCOUNT_HEADERS, default_headers, columns)
 
-    status = account.status
-    if account.status_message:
-        status += ' ({})'.format(account.status_message)
-
-    # Create dataset with the data we want
-    headers = ['Email', 'Status', 'Droplet limit']
-    row = [email, status, account.droplet_limit]
-    if verbose:
-        headers += ['Floating IP limit', 'UUID']
-        row += [account.floating_ip_limit, account.uuid]
+    row = []
+    for header in headers:
+        if header == 'Email':
+            email = account.email
+            if not account.email_verified:
+                email += ' (unverified)'
+            row.append(email)
+        elif header == 'Status':
+            status = account.status
+            if account.status_message:
+                status += ' ({})'.format(account.status_message)
+            row.append(status)
+        elif header == 'Droplet limit':
+            row.append(account.droplet_limit)
+        elif header == 'Floating IP limit':
+            row.append(account.floating_ip_limit)
+        elif header == 'UUID':
+            row.append(account.uuid)
 
     dataset = tablib.Dataset(headers=headers)
     dataset.append(row)
@@ -43,7 +108,304 @@ def create_accounts_dataset(account, verbose=False):
     return dataset
 
 
-def create_droplets_dataset(droplets, verbose=False):
+def parse_created_at(value):
+    """
+    Parse DigitalOcean API timestamp
+
+    The API always returns timestamps in the same 'YYYY-MM-DDTHH:MM:SSZ' format so we slice them by hand
+    and only fall back to the (much slower) generic `dateutil` parser when the value doesn't match it.
+
+    :param value: ISO 8601 timestamp
+    :type value: str
+    :returns: timezone aware datetime
+    :rtype: datetime.datetime
+    """
+    if len(value) == 20 and value[4] == '-' and value[7] == '-' and value[10] == 'T' and value[19] == 'Z':
+        try:
+            return datetime.datetime(
+                int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                tzinfo=dateutil.tz.tzutc(),
+            )
+        except ValueError:
+            pass
+
+    return dateutil.parser.parse(value)
+
+
+def guess_droplet_os(droplet):
+    """
+    Try to guess droplet OS
+
+    :param droplet: DigitalOcean droplet
+    :type droplet: digitalocean.Droplet.Droplet
+    :returns: droplet OS name
+    :rtype: str
+    """
+    if droplet.kernel:
+        return droplet.kernel.get('name', 'unknown')
+    elif droplet.image:
+        return '{} {}'.format(droplet.image['distribution'], droplet.image['name'])
+    return 'unknown'
+
+
+# Droplet columns, each one transformed in a single batch
+DROPLET_COLUMNS = OrderedDict([
+    ('Name', lambda droplets: [droplet.name for droplet in droplets]),
+    ('Status', lambda droplets: [droplet.status for droplet in droplets]),
+    ('OS', lambda droplets: [guess_droplet_os(droplet) for droplet in droplets]),
+    ('IP', lambda droplets: [droplet.ip_address for droplet in droplets]),
+    ('CPU', lambda droplets: [droplet.vcpus for droplet in droplets]),
+    ('Memory', lambda droplets: [str(droplet.memory) + ' MB' for droplet in droplets]),
+    ('Disk', lambda droplets: [str(droplet.disk) + ' GB' for droplet in droplets]),
+    ('Tags', lambda droplets: [', '.join(droplet.tags) for droplet in droplets]),
+    ('Backups', lambda droplets: [yes_no(droplet.backups) for droplet in droplets]),
+    ('Locked', lambda droplets: [yes_no(droplet.locked) for droplet in droplets]),
+    ('Monitoring', lambda droplets: [yes_no(droplet.monitoring) for droplet in droplets]),
+    ('Features', lambda droplets: [', '.join(droplet.features) for droplet in droplets]),
+    ('Region', lambda droplets: [droplet.region['name'] for droplet in droplets]),
+    ('URL', lambda droplets: [droplet_url(droplet.id) for droplet in droplets]),
+    ('Created at', lambda droplets: [
+        parse_created_at(droplet.created_at).strftime('%a, %x %X') for droplet in droplets
+    ]),
+])
+DROPLET_HEADERS = list(DROPLET_COLUMNS)
+DROPLET_VERBOSE_HEADERS = ['Tags', 'Backups', 'Locked', 'Monitoring', 'Features', 'Region']
+
+
+def _metrics_column(header, format_value):
+    return lambda droplets, metrics: [
+        format_value(metrics.get(droplet.id, {}).get(header)) for droplet in droplets
+    ]
+
+
+def _percent(value):
+    return '-' if value is None else '{:.1f}%'.format(value)
+
+
+def _mbps(value):
+    return '-' if value is None else '{:.2f} Mbps'.format(value)
+
+
+# Droplet monitoring metrics columns, transformed from the `metrics.MetricsClient.fetch` summaries
+DROPLET_METRICS_COLUMNS = OrderedDict(
+    (header, _metrics_column(header, _percent if header.startswith(('CPU', 'Memory')) else _mbps))
+    for header in METRICS_HEADERS
+)
+DROPLET_METRICS_HEADERS = list(DROPLET_METRICS_COLUMNS)
+DROPLET_ALL_HEADERS = DROPLET_HEADERS + DROPLET_METRICS_HEADERS
+
+
+def droplets_headers(verbose=False, columns=None, metrics=False):
+    """
+    Get DigitalOcean droplets dataset headers
+
+    :param verbose: if droplets information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose` and `metrics`
+    :type columns: list of str
+    :param metrics: if the monitoring metrics columns should be included
+    :type metrics: bool
+    :returns: droplets dataset headers
+    :rtype: list of str
+    """
+    default_headers = [
+        header for header in DROPLET_HEADERS
+        if verbose or header not in DROPLET_VERBOSE_HEADERS
+    ]
+    if metrics:
+        default_headers += DROPLET_METRICS_HEADERS
+
+    return select_headers(DROPLET_ALL_HEADERS, default_headers, columns)
+
+
+def droplets_column(header, droplets, metrics=None):
+    """
+    Transform the droplets into a single column
+
+    :param header: column header
+    :type header: str
+    :param droplets: list of DigitalOcean droplets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param metrics: monitoring metrics summaries keyed by the droplet ID, see `metrics.MetricsClient.fetch`
+    :type metrics: dict
+    :returns: column values
+    :rtype: list
+    """
+    if header in DROPLET_METRICS_COLUMNS:
+        return DROPLET_METRICS_COLUMNS[header](droplets, metrics or {})
+    return DROPLET_COLUMNS[header](droplets)
+
+
+def create_droplets_columns(droplets, verbose=False, columns=None, metrics=None):
+    """
+    Create DigitalOcean droplets columns
+
+    Each column is transformed in one batch which is much quicker than building the dataset row by row
+    when there's a lot of droplets.
+
+    :param droplets: list of DigitalOcean droplets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param verbose: if droplets information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param metrics: monitoring metrics summaries keyed by the droplet ID, the metrics columns are included if set
+    :type metrics: dict
+    :returns: droplets columns keyed by their header
+    :rtype: collections.OrderedDict
+    """
+    droplets = list(droplets)
+    headers = droplets_headers(verbose=verbose, columns=columns, metrics=metrics is not None)
+
+    return OrderedDict((header, droplets_column(header, droplets, metrics)) for header in headers)
+
+
+def iter_droplets_rows(droplets, headers, chunk_size=500, metrics=None):
+    """
+    Lazily create DigitalOcean droplets dataset rows
+
+    Droplets are transformed column by column in chunks, so memory usage is bounded by the chunk size
+    and not the number of droplets.
+
+    :param droplets: iterable of DigitalOcean droplets
+    :type droplets: iterable of digitalocean.Droplet.Droplet
+    :param headers: dataset headers, see `droplets_headers`
+    :type headers: list of str
+    :param chunk_size: how many droplets to transform at once
+    :type chunk_size: int
+    :param metrics: monitoring metrics summaries keyed by the droplet ID
+    :type metrics: dict
+    :returns: droplets dataset rows
+    :rtype: generator of list
+    """
+    droplets = iter(droplets)
+
+    while True:
+        chunk = list(itertools.islice(droplets, chunk_size))
+        if not chunk:
+            return
+
+        for row in zip(*[droplets_column(header, chunk, metrics) for header in headers]):
+            yield list(row)
+
+
+def columns_to_dataset(columns):
+    """
+    Create dataset from columns
+
+    :param columns: columns keyed by their header
+    :type columns: collections.OrderedDict
+    :returns: dataset
+    :rtype: tablib.Dataset
+    """
+    return tablib.Dataset(*zip(*columns.values()), headers=list(columns))
+
+
+def dataset_to_columns(dataset):
+    """
+    Create columns from dataset
+
+    :param dataset: dataset
+    :type dataset: tablib.Dataset
+    :returns: columns keyed by their header
+    :rtype: collections.OrderedDict
+    """
+    return OrderedDict((header, dataset[header]) for header in dataset.headers)
+
+
+def export_columns(columns, output_file, data_format):
+    """
+    Export columns straight to a compact binary format
+
+    :param columns: columns keyed by their header
+    :type columns: collections.OrderedDict
+    :param output_file: binary output file
+    :type output_file: file
+    :param data_format: one of `COLUMNAR_FORMATS`
+    :type data_format: str
+    :raises ImportError: when `pyarrow` isn't installed
+    :raises ValueError: when the data format isn't supported
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "Exporting to '{}' requires the 'pyarrow' package ('pip install do-audit[columnar]').".format(data_format)
+        )
+
+    arrays = [
+        pyarrow.array([
+            value if value is None or isinstance(value, (six.string_types, six.integer_types, float)) else str(value)
+            for value in values
+        ])
+        for values in columns.values()
+    ]
+    table = pyarrow.Table.from_arrays(arrays, names=list(columns))
+
+    if data_format == 'parquet':
+        pyarrow.parquet.write_table(table, output_file)
+    elif data_format == 'arrow':
+        with pyarrow.ipc.new_file(output_file, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError("Unsupported columnar data format: '{}'".format(data_format))
+
+
+def stream_rows(headers, rows, output_file, data_format, chunk_size=100):
+    """
+    Export rows to a text format as they are produced
+
+    Rows are serialized in chunks, so only the current chunk is ever kept in memory.
+
+    :param headers: dataset headers
+    :type headers: list of str
+    :param rows: dataset rows
+    :type rows: iterable of list
+    :param output_file: binary output file
+    :type output_file: file
+    :param data_format: one of `STREAMING_FORMATS`
+    :type data_format: str
+    :param chunk_size: how many rows to write at once
+    :type chunk_size: int
+    :raises ValueError: when the data format isn't supported
+    """
+    if data_format not in STREAMING_FORMATS:
+        raise ValueError("Unsupported streaming data format: '{}'".format(data_format))
+
+    buffer = six.StringIO()
+
+    def flush():
+        output_file.write(buffer.getvalue().encode())
+        output_file.flush()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if data_format == 'json':
+        buffer.write('[')
+    else:
+        # Same dialects as the tablib exports
+        if data_format == 'tsv':
+            writer = csv.writer(buffer, delimiter=str('\t'))
+        else:
+            writer = csv.writer(buffer, lineterminator=os.linesep)
+        writer.writerow(headers)
+
+    for n, row in enumerate(rows, start=1):
+        if data_format == 'json':
+            if n > 1:
+                buffer.write(', ')
+            buffer.write(json.dumps(OrderedDict(zip(headers, row)), default=six.text_type))
+        else:
+            writer.writerow(row)
+
+        if n % chunk_size == 0:
+            flush()
+
+    if data_format == 'json':
+        buffer.write(']')
+    flush()
+
+
+def create_droplets_dataset(droplets, verbose=False, columns=None, metrics=None):
     """
     Create DigitalOcean droplets dataset
 
@@ -51,57 +413,65 @@ def create_droplets_dataset(droplets, verbose=False):
     :type droplets: list of digitalocean.Droplet.Droplet
     :param verbose: if droplets information should be verbose
     :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param metrics: monitoring metrics summaries keyed by the droplet ID, the metrics columns are included if set
+    :type metrics: dict
     :returns: droplets dataset
     :rtype: tablib.Dataset
     """
-    headers = ['Name', 'Status', 'OS', 'IP', 'CPU', 'Memory', 'Disk']
-    if verbose:
-        headers += ['Tags', 'Backups', 'Locked', 'Monitoring', 'Features', 'Region']
-    headers += ['URL', 'Created at']
+    return columns_to_dataset(create_droplets_columns(droplets, verbose=verbose, columns=columns, metrics=metrics))
 
-    dataset = tablib.Dataset(headers=headers)
 
-    for droplet in droplets:
-        created_at = dateutil.parser.parse(droplet.created_at)
+def zone_addresses(zone_file):
+    """
+    Get all IP addresses the zone A and AAAA records point at
 
-        # Try to guess droplet OS
-        if droplet.kernel:
-            do_os = droplet.kernel.get('name', 'unknown')
-        elif droplet.image:
-            do_os = '{} {}'.format(droplet.image['distribution'], droplet.image['name'])
-        else:
-            do_os = 'unknown'
+    :param zone_file: domain zone file contents
+    :type zone_file: str
+    :returns: IP addresses
+    :rtype: set of str
+    """
+    zone = dns.zone.from_text(zone_file)
 
-        # Generate human readable droplet info row
-        row = [
-            droplet.name, droplet.status, do_os, droplet.ip_address, droplet.vcpus,
-            str(droplet.memory) + ' MB', str(droplet.disk) + ' GB',
-        ]
-        if verbose:
-            row += [
-                ', '.join(droplet.tags), yes_no(droplet.backups), yes_no(droplet.locked), yes_no(droplet.monitoring),
-                ', '.join(droplet.features), droplet.region['name'],
-            ]
-        row += [droplet_url(droplet.id), created_at.strftime('%a, %x %X')]
+    return {
+        normalize_address(str(address))
+        for rdtype in [dns.rdatatype.A, dns.rdatatype.AAAA]
+        for _, rd in zone.iterate_rdatasets(rdtype)
+        for address in rd
+    }
 
-        dataset.append(row)
 
-    return dataset
+def domains_headers(columns=None):
+    """
+    Get DigitalOcean domains dataset headers
+
+    :param columns: only include these columns
+    :type columns: list of str
+    :returns: domains dataset headers
+    :rtype: list of str
+    """
+    return select_headers(DOMAIN_HEADERS, DOMAIN_HEADERS, columns)
 
 
-def create_domains_dataset(domains, verbose=False):
+def iter_domains_rows(domains, headers, verbose=False, addresses=None):
     """
-    Create DigitalOcean domains dataset
+    Lazily create DigitalOcean domains dataset rows
 
-    :param domains: list of DigitalOcean domains
-    :type domains: list of digitalocean.Domain.Domain
+    Zones are parsed one at a time as the rows are consumed.
+
+    :param domains: iterable of DigitalOcean domains
+    :type domains: iterable of digitalocean.Domain.Domain
+    :param headers: dataset headers, see `domains_headers`
+    :type headers: list of str
     :param verbose: if domains information should be verbose
     :type verbose: bool
-    :returns: domains dataset
-    :rtype: tablib.Dataset
+    :param addresses: only include A and AAAA records pointing at these IP addresses
+    :type addresses: set of str
+    :returns: domains dataset rows
+    :rtype: generator of list
     """
-    headers = ['Domain', 'Subdomain', 'Record type', 'Destination']
-    dataset = tablib.Dataset(headers=headers)
+    indexes = [DOMAIN_HEADERS.index(header) for header in headers]
 
     for domain in domains:
         # We could use Digital Ocean domain records API endpoint but parsing the zone file is *much* quicker
@@ -115,8 +485,469 @@ def create_domains_dataset(domains, verbose=False):
                 # Non verbose output only contains A and CNAME records
                 if not verbose and rd.rdtype not in [dns.rdatatype.A, dns.rdatatype.CNAME]:
                     continue
+                # Address filtered output only contains records pointing at the matching droplets
+                if addresses is not None and rd.rdtype not in [dns.rdatatype.A, dns.rdatatype.AAAA]:
+                    continue
 
                 for address in rd:
-                    dataset.append([domain, subdomain, dns.rdatatype.to_text(rd.rdtype), str(address)])
+                    if addresses is not None and normalize_address(str(address)) not in addresses:
+                        continue
 
-    return dataset
+                    row = [domain, subdomain, dns.rdatatype.to_text(rd.rdtype), str(address)]
+                    yield [row[index] for index in indexes]
+
+
+def create_domains_dataset(domains, verbose=False, addresses=None, columns=None):
+    """
+    Create DigitalOcean domains dataset
+
+    :param domains: list of DigitalOcean domains
+    :type domains: list of digitalocean.Domain.Domain
+    :param verbose: if domains information should be verbose
+    :type verbose: bool
+    :param addresses: only include A and AAAA records pointing at these IP addresses
+    :type addresses: set of str
+    :param columns: only include these columns
+    :type columns: list of str
+    :returns: domains dataset
+    :rtype: tablib.Dataset
+    """
+    headers = domains_headers(columns)
+    rows = iter_domains_rows(domains, headers, verbose=verbose, addresses=addresses)
+
+    return tablib.Dataset(*rows, headers=headers)
+
+
+def normalize_address(address):
+    """
+    Normalize IP address text so the same address always has the same representation
+
+    :param address: IPv4 or IPv6 address
+    :type address: str
+    :returns: normalized IP address
+    :rtype: str
+    """
+    if ':' not in address:
+        return address
+
+    try:
+        return socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, address))
+    except (socket.error, ValueError):
+        return address.lower()
+
+
+def droplet_addresses(droplet):
+    """
+    Get all IP addresses of the droplet
+
+    :param droplet: DigitalOcean droplet
+    :type droplet: digitalocean.Droplet.Droplet
+    :returns: public and private, IPv4 and IPv6 addresses
+    :rtype: set of str
+    """
+    addresses = {
+        net['ip_address']
+        for version in ['v4', 'v6']
+        for net in (getattr(droplet, 'networks', None) or {}).get(version, [])
+    }
+    addresses.update([droplet.ip_address, droplet.ip_v6_address, droplet.private_ip_address])
+    addresses.discard(None)
+
+    return {normalize_address(address) for address in addresses}
+
+
+def index_account_addresses(droplets, floating_ips=()):
+    """
+    Index every IP address owned by the account
+
+    :param droplets: list of DigitalOcean droplets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param floating_ips: list of DigitalOcean floating IPs
+    :type floating_ips: list of digitalocean.FloatingIP.FloatingIP
+    :returns: droplets keyed by their IP address, `None` for unassigned floating IPs
+    :rtype: dict
+    """
+    droplets_by_id = {}
+    index = {}
+
+    for droplet in droplets:
+        droplets_by_id[droplet.id] = droplet
+        for address in droplet_addresses(droplet):
+            index[address] = droplet
+
+    for floating_ip in floating_ips:
+        droplet = floating_ip.droplet or {}
+        index[normalize_address(floating_ip.ip)] = droplets_by_id.get(droplet.get('id'))
+
+    return index
+
+
+def iter_orphans_rows(droplets, domains, headers, floating_ips=()):
+    """
+    Lazily find dangling DNS records and unreferenced droplets
+
+    A and AAAA records of all the zones are hash joined against the account IP addresses index. Records
+    pointing outside of the account are a subdomain takeover risk and droplets no record points at are
+    possibly forgotten about. No requests are sent to the records addresses.
+
+    :param droplets: list of DigitalOcean droplets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param domains: iterable of DigitalOcean domains
+    :type domains: iterable of digitalocean.Domain.Domain
+    :param headers: dataset headers, see `ORPHANS_HEADERS`
+    :type headers: list of str
+    :param floating_ips: list of DigitalOcean floating IPs
+    :type floating_ips: list of digitalocean.FloatingIP.FloatingIP
+    :returns: orphans dataset rows
+    :rtype: generator of list
+    """
+    droplets = list(droplets)
+    account_addresses = index_account_addresses(droplets, floating_ips)
+    indexes = [ORPHANS_HEADERS.index(header) for header in headers]
+    referenced = set()
+
+    for domain in domains:
+        zone = dns.zone.from_text(domain.zone_file)
+        domain = zone.origin.to_text(omit_final_dot=True)
+
+        for rdtype in [dns.rdatatype.A, dns.rdatatype.AAAA]:
+            for key, rd in zone.iterate_rdatasets(rdtype):
+                for address in rd:
+                    address = normalize_address(str(address))
+
+                    if address in account_addresses:
+                        if account_addresses[address] is not None:
+                            referenced.add(account_addresses[address].id)
+                        continue
+
+                    row = [
+                        'Dangling record', domain, key.to_text(omit_final_dot=True), dns.rdatatype.to_text(rdtype),
+                        address, None,
+                    ]
+                    yield [row[index] for index in indexes]
+
+    for droplet in droplets:
+        if droplet.id in referenced:
+            continue
+
+        row = [
+            'Unreferenced droplet', None, None, None, droplet.ip_address,
+            '{} ({})'.format(droplet.name, droplet_url(droplet.id)),
+        ]
+        yield [row[index] for index in indexes]
+
+
+def create_orphans_dataset(droplets, domains, floating_ips=(), columns=None):
+    """
+    Create dangling DNS records and unreferenced droplets dataset
+
+    :param droplets: list of DigitalOcean droplets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param domains: list of DigitalOcean domains
+    :type domains: list of digitalocean.Domain.Domain
+    :param floating_ips: list of DigitalOcean floating IPs
+    :type floating_ips: list of digitalocean.FloatingIP.FloatingIP
+    :param columns: only include these columns
+    :type columns: list of str
+    :returns: orphans dataset
+    :rtype: tablib.Dataset
+    """
+    headers = select_headers(ORPHANS_HEADERS, ORPHANS_HEADERS, columns)
+    rows = iter_orphans_rows(droplets, domains, headers, floating_ips=floating_ips)
+
+    return tablib.Dataset(*rows, headers=headers)
+
+
+def _region_name(region):
+    """Get region name from the API region object or slug"""
+    if isinstance(region, dict):
+        return region.get('name') or region.get('slug')
+    return region
+
+
+def _droplet_names(droplet_ids, droplets_by_id):
+    """Get comma separated names of the droplets, falling back to their IDs"""
+    return ', '.join(
+        droplets_by_id[droplet_id].name if droplet_id in droplets_by_id else str(droplet_id)
+        for droplet_id in droplet_ids or []
+    )
+
+
+def _created_at(value):
+    """Format API timestamp the same way as the droplets 'Created at' column"""
+    return parse_created_at(value).strftime('%a, %x %X') if value else None
+
+
+# Resource columns, each one transformed in a single batch from the resources and all the fetched account resources
+# (see `do_audit.resources.ResourceSnapshot`)
+VOLUME_COLUMNS = OrderedDict([
+    ('Name', lambda volumes, account: [volume.name for volume in volumes]),
+    ('Region', lambda volumes, account: [_region_name(volume.region) for volume in volumes]),
+    ('Size', lambda volumes, account: ['{} GB'.format(volume.size_gigabytes) for volume in volumes]),
+    ('Droplets', lambda volumes, account: [
+        _droplet_names(volume.droplet_ids, account.droplets_by_id) for volume in volumes
+    ]),
+    ('Filesystem', lambda volumes, account: [volume.filesystem_type for volume in volumes]),
+    ('Tags', lambda volumes, account: [', '.join(volume.tags or []) for volume in volumes]),
+    ('Description', lambda volumes, account: [volume.description for volume in volumes]),
+    ('ID', lambda volumes, account: [volume.id for volume in volumes]),
+    ('Created at', lambda volumes, account: [_created_at(volume.created_at) for volume in volumes]),
+])
+VOLUME_VERBOSE_HEADERS = ['Tags', 'Description', 'ID']
+
+SNAPSHOT_COLUMNS = OrderedDict([
+    ('Name', lambda snapshots, account: [snapshot.name for snapshot in snapshots]),
+    ('Type', lambda snapshots, account: [snapshot.resource_type for snapshot in snapshots]),
+    ('Resource', lambda snapshots, account: [
+        _droplet_names([int(snapshot.resource_id)], account.droplets_by_id)
+        if snapshot.resource_type == 'droplet' and snapshot.resource_id else snapshot.resource_id
+        for snapshot in snapshots
+    ]),
+    ('Regions', lambda snapshots, account: [', '.join(snapshot.regions or []) for snapshot in snapshots]),
+    ('Size', lambda snapshots, account: ['{} GB'.format(snapshot.size_gigabytes) for snapshot in snapshots]),
+    ('Min disk size', lambda snapshots, account: [
+        '{} GB'.format(snapshot.min_disk_size) for snapshot in snapshots
+    ]),
+    ('ID', lambda snapshots, account: [snapshot.id for snapshot in snapshots]),
+    ('Created at', lambda snapshots, account: [_created_at(snapshot.created_at) for snapshot in snapshots]),
+])
+SNAPSHOT_VERBOSE_HEADERS = ['Min disk size', 'ID']
+
+FLOATING_IP_COLUMNS = OrderedDict([
+    ('IP', lambda floating_ips, account: [floating_ip.ip for floating_ip in floating_ips]),
+    ('Region', lambda floating_ips, account: [
+        _region_name(floating_ip.region) for floating_ip in floating_ips
+    ]),
+    ('Droplet', lambda floating_ips, account: [
+        _droplet_names([floating_ip.droplet['id']], account.droplets_by_id) if floating_ip.droplet else '-'
+        for floating_ip in floating_ips
+    ]),
+])
+FLOATING_IP_VERBOSE_HEADERS = []
+
+LOAD_BALANCER_COLUMNS = OrderedDict([
+    ('Name', lambda load_balancers, account: [load_balancer.name for load_balancer in load_balancers]),
+    ('Status', lambda load_balancers, account: [load_balancer.status for load_balancer in load_balancers]),
+    ('IP', lambda load_balancers, account: [
+        getattr(load_balancer, 'ip', None) for load_balancer in load_balancers
+    ]),
+    ('Algorithm', lambda load_balancers, account: [
+        load_balancer.algorithm for load_balancer in load_balancers
+    ]),
+    ('Region', lambda load_balancers, account: [
+        _region_name(load_balancer.region) for load_balancer in load_balancers
+    ]),
+    ('Droplets', lambda load_balancers, account: [
+        _droplet_names(account.tagged_droplet_ids(
+            load_balancer.droplet_ids, [load_balancer.tag] if load_balancer.tag else [],
+        ), account.droplets_by_id)
+        for load_balancer in load_balancers
+    ]),
+    ('Tag', lambda load_balancers, account: [load_balancer.tag for load_balancer in load_balancers]),
+    ('Forwarding rules', lambda load_balancers, account: [
+        ', '.join(
+            '{}:{} -> {}:{}'.format(rule.entry_protocol, rule.entry_port, rule.target_protocol, rule.target_port)
+            for rule in load_balancer.forwarding_rules
+        )
+        for load_balancer in load_balancers
+    ]),
+    ('ID', lambda load_balancers, account: [load_balancer.id for load_balancer in load_balancers]),
+    ('Created at', lambda load_balancers, account: [
+        _created_at(load_balancer.created_at) for load_balancer in load_balancers
+    ]),
+])
+LOAD_BALANCER_VERBOSE_HEADERS = ['Tag', 'Forwarding rules', 'ID']
+
+FIREWALL_COLUMNS = OrderedDict([
+    ('Name', lambda firewalls, account: [firewall.name for firewall in firewalls]),
+    ('Status', lambda firewalls, account: [firewall.status for firewall in firewalls]),
+    ('Droplets', lambda firewalls, account: [
+        _droplet_names(account.tagged_droplet_ids(firewall.droplet_ids, firewall.tags), account.droplets_by_id)
+        for firewall in firewalls
+    ]),
+    ('Tags', lambda firewalls, account: [', '.join(firewall.tags or []) for firewall in firewalls]),
+    ('Inbound rules', lambda firewalls, account: [len(firewall.inbound_rules) for firewall in firewalls]),
+    ('Outbound rules', lambda firewalls, account: [len(firewall.outbound_rules) for firewall in firewalls]),
+    ('ID', lambda firewalls, account: [firewall.id for firewall in firewalls]),
+    ('Created at', lambda firewalls, account: [_created_at(firewall.created_at) for firewall in firewalls]),
+])
+FIREWALL_VERBOSE_HEADERS = ['ID']
+
+TAG_COLUMNS = OrderedDict([
+    ('Name', lambda tags, account: [tag.name for tag in tags]),
+    ('Resources', lambda tags, account: [(tag.resources or {}).get('count') for tag in tags]),
+    ('Droplets', lambda tags, account: [
+        ((tag.resources or {}).get('droplets') or {}).get('count') for tag in tags
+    ]),
+])
+TAG_VERBOSE_HEADERS = []
+
+
+def create_resources_columns(resources, column_functions, verbose_headers, verbose=False, columns=None,
+                             droplets=None, account=None):
+    """
+    Create DigitalOcean resources columns
+
+    :param resources: list of DigitalOcean resources of a single type
+    :type resources: list
+    :param column_functions: column transformations keyed by their header, e.g. `VOLUME_COLUMNS`
+    :type column_functions: collections.OrderedDict
+    :param verbose_headers: headers only included in verbose output
+    :type verbose_headers: list of str
+    :param verbose: if resources information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: resources columns keyed by their header
+    :rtype: collections.OrderedDict
+    """
+    resources = list(resources)
+    account = account or ResourceSnapshot(droplets=droplets)
+
+    all_headers = list(column_functions)
+    default_headers = [header for header in all_headers if verbose or header not in verbose_headers]
+    headers = select_headers(all_headers, default_headers, columns)
+
+    return OrderedDict((header, column_functions[header](resources, account)) for header in headers)
+
+
+def create_volumes_dataset(volumes, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean volumes dataset
+
+    :param volumes: list of DigitalOcean volumes
+    :type volumes: list of digitalocean.Volume.Volume
+    :param verbose: if volumes information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: volumes dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        volumes, VOLUME_COLUMNS, VOLUME_VERBOSE_HEADERS, verbose=verbose, columns=columns, droplets=droplets,
+        account=account,
+    ))
+
+
+def create_snapshots_dataset(snapshots, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean snapshots dataset
+
+    :param snapshots: list of DigitalOcean snapshots
+    :type snapshots: list of digitalocean.Snapshot.Snapshot
+    :param verbose: if snapshots information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: snapshots dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        snapshots, SNAPSHOT_COLUMNS, SNAPSHOT_VERBOSE_HEADERS, verbose=verbose, columns=columns, droplets=droplets,
+        account=account,
+    ))
+
+
+def create_floating_ips_dataset(floating_ips, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean floating IPs dataset
+
+    :param floating_ips: list of DigitalOcean floating IPs
+    :type floating_ips: list of digitalocean.FloatingIP.FloatingIP
+    :param verbose: if floating IPs information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: floating IPs dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        floating_ips, FLOATING_IP_COLUMNS, FLOATING_IP_VERBOSE_HEADERS, verbose=verbose, columns=columns,
+        droplets=droplets, account=account,
+    ))
+
+
+def create_load_balancers_dataset(load_balancers, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean load balancers dataset
+
+    :param load_balancers: list of DigitalOcean load balancers
+    :type load_balancers: list of digitalocean.LoadBalancer.LoadBalancer
+    :param verbose: if load balancers information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: load balancers dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        load_balancers, LOAD_BALANCER_COLUMNS, LOAD_BALANCER_VERBOSE_HEADERS, verbose=verbose, columns=columns,
+        droplets=droplets, account=account,
+    ))
+
+
+def create_firewalls_dataset(firewalls, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean firewalls dataset
+
+    :param firewalls: list of DigitalOcean firewalls
+    :type firewalls: list of digitalocean.Firewall.Firewall
+    :param verbose: if firewalls information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: list of DigitalOcean droplets used for showing droplet names instead of IDs
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: fetched account resources used for the droplets, including the tagged ones, overrides `droplets`
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: firewalls dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        firewalls, FIREWALL_COLUMNS, FIREWALL_VERBOSE_HEADERS, verbose=verbose, columns=columns, droplets=droplets,
+        account=account,
+    ))
+
+
+def create_tags_dataset(tags, verbose=False, columns=None, droplets=None, account=None):
+    """
+    Create DigitalOcean tags dataset
+
+    :param tags: list of DigitalOcean tags
+    :type tags: list of digitalocean.Tag.Tag
+    :param verbose: if tags information should be verbose
+    :type verbose: bool
+    :param columns: only compute these columns, overrides `verbose`
+    :type columns: list of str
+    :param droplets: unused, accepted for consistency with the other resources datasets
+    :type droplets: list of digitalocean.Droplet.Droplet
+    :param account: unused, accepted for consistency with the other resources datasets
+    :type account: do_audit.resources.ResourceSnapshot
+    :returns: tags dataset
+    :rtype: tablib.Dataset
+    """
+    return columns_to_dataset(create_resources_columns(
+        tags, TAG_COLUMNS, TAG_VERBOSE_HEADERS, verbose=verbose, columns=columns, droplets=droplets,
+        account=account,
+    ))
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit embeddable Python API
+"""
+from __future__ import unicode_literals
+
+import os
+from collections import namedtuple
+
+import digitalocean
+
+from do_audit import api
+from do_audit.filters import AuditFilter
+from do_audit.probe import PING_HEADERS, ProbeResult, iter_ping_rows
+from do_audit.progress import measure
+from do_audit.utils import DO_ACCESS_TOKEN_ENV, droplet_url
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+
+# Typed domain zone record, the fields follow `api.DOMAIN_HEADERS`
+DNSRecord = namedtuple('DNSRecord', ['domain', 'subdomain', 'record_type', 'destination'])
+
+
+class AsyncIterator(object):
+    """
+    Asynchronous iterator over a blocking iterator, for `async for` loops
+
+    Every item is fetched in the event loop executor so the blocking API requests and probes never block the
+    event loop itself. Requires Python 3.5+.
+    """
+    def __init__(self, iterator, loop=None, executor=None):
+        """
+        :param iterator: blocking iterator
+        :type iterator: iterator
+        :param loop: event loop, the current one by default
+        :type loop: asyncio.AbstractEventLoop
+        :param executor: executor the items are fetched in, the event loop default one by default
+        :type executor: concurrent.futures.Executor
+        """
+        self._iterator = iterator
+        self._loop = loop
+        self._executor = executor
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        loop = self._loop or asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, self._next)
+
+    def _next(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration  # noqa: F821, Python 3 only
+
+
+class Auditor(object):
+    """
+    Audit of a DigitalOcean account
+
+    The same droplets, DNS records and probes the command line interface shows, as typed results and without
+    any serialization. The filtered droplets and domains are fetched once and reused by all the methods.
+
+    Example::
+
+        auditor = Auditor(access_token='...', max_workers=16)
+        for result in auditor.probe_domains():
+            print(result.url, result.status_code)
+
+        async for result in auditor.probe_domains_async():
+            ...
+    """
+    def __init__(self, manager=None, access_token=None, audit_filter=None, session=None, timeout=3, max_workers=8,
+                 fingerprinter=None, probe_mode='get', escalate=False, cache=None):
+        """
+        :param manager: Digital Ocean manager instance, created from the access token if not passed
+        :type manager: digitalocean.Manager
+        :param access_token: Digital Ocean API access token, read from the environment if not passed
+        :type access_token: str
+        :param audit_filter: droplets and domains filters
+        :type audit_filter: do_audit.filters.AuditFilter
+        :param session: session used for sending the probes
+        :type session: requests.Session
+        :param timeout: how many seconds to wait for the probed servers before giving up
+        :type timeout: int
+        :param max_workers: how many probes can be in flight at the same time
+        :type max_workers: int
+        :param fingerprinter: response signatures matcher, the default signatures are used if not passed
+        :type fingerprinter: do_audit.fingerprint.Fingerprinter
+        :param probe_mode: one of `probe.PROBE_MODES`
+        :type probe_mode: str
+        :param escalate: if targets that passed the cheaper probe should be probed with a GET request too
+        :type escalate: bool
+        :param cache: probe results cache, fresh results are served from it instead of probing the targets again
+        :type cache: do_audit.cache.ProbeCache
+        """
+        self.manager = manager or digitalocean.Manager(token=access_token or os.getenv(DO_ACCESS_TOKEN_ENV))
+        self.audit_filter = audit_filter or AuditFilter()
+        self.session = session
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.fingerprinter = fingerprinter
+        self.probe_mode = probe_mode
+        self.escalate = escalate
+        self.cache = cache
+
+        self._droplets = None
+        self._domains = None
+
+    def get_droplets(self):
+        """
+        Get droplets matching the filters, they're only fetched once
+
+        :rtype: list of digitalocean.Droplet.Droplet
+        """
+        if self._droplets is None:
+            self._droplets = self.audit_filter.get_droplets(self.manager)
+        return self._droplets
+
+    def get_domains(self):
+        """
+        Get domains matching the filters, they're only fetched once
+
+        :rtype: list of digitalocean.Domain.Domain
+        """
+        if self._domains is None:
+            self._domains = self.audit_filter.get_domains(self.manager)
+        return self._domains
+
+    def get_droplet_addresses(self):
+        """
+        Get IP addresses of droplets matching the filters
+
+        :returns: IP addresses or `None` if no droplet filters were set
+        :rtype: set of str or None
+        """
+        if not self.audit_filter.filters_droplets:
+            return None
+        return self.audit_filter.get_droplet_addresses(self.manager, droplets=self.get_droplets())
+
+    def iter_droplets(self):
+        """
+        Iterate over droplets matching the filters
+
+        When the domain filter is set, only the droplets the domains records point at are included.
+
+        :rtype: generator of digitalocean.Droplet.Droplet
+        """
+        addresses = None
+        if self.audit_filter.domains:
+            addresses = set()
+            for domain in self.get_domains():
+                addresses.update(api.zone_addresses(domain.zone_file))
+
+        for droplet in self.get_droplets():
+            if addresses is None or not addresses.isdisjoint(api.droplet_addresses(droplet)):
+                yield droplet
+
+    def iter_dns_records(self, verbose=False):
+        """
+        Iterate over DNS records of the domains matching the filters
+
+        When any of the droplet filters is set, only the A and AAAA records pointing at the droplets are
+        included.
+
+        :param verbose: if all the record types should be included instead of only A and CNAME records
+        :type verbose: bool
+        :rtype: generator of DNSRecord
+        """
+        rows = api.iter_domains_rows(
+            self.get_domains(), api.DOMAIN_HEADERS, verbose=verbose, addresses=self.get_droplet_addresses(),
+        )
+        for row in rows:
+            yield DNSRecord(*row)
+
+    def probe_domains(self, headers=None, journal=None, stats=None, deadline=None):
+        """
+        Probe the DNS records of the domains matching the filters
+
+        Up to `max_workers` probes are sent at the same time, the results are in the zone records order. With the
+        deadline, the targets that weren't probed in time get the `probe.DEADLINE_ERROR`.
+
+        :param headers: requested `probe.PING_HEADERS`, only these fields are computed
+        :type headers: list of str
+        :param journal: checkpoint journal the completed probes are read from and written to
+        :type journal: do_audit.journal.ProbeJournal
+        :param stats: progress and statistics the API requests and probes are counted in
+        :type stats: do_audit.progress.ProbeStats
+        :param deadline: whole run deadline
+        :type deadline: do_audit.progress.Deadline
+        :rtype: generator of do_audit.probe.ProbeResult
+        """
+        headers = headers or PING_HEADERS
+
+        with measure(stats, 'api_fetch'):
+            # The cached probes are only valid for the same droplets, even if they aren't shown
+            do_droplets = {}
+            if 'Droplet' in headers or self.cache is not None:
+                do_droplets = {
+                    droplet.ip_address: (droplet.name, droplet_url(droplet.id)) for droplet in self.get_droplets()
+                }
+            domains = self.get_domains()
+            addresses = self.get_droplet_addresses()
+
+        results = iter_ping_rows(
+            domains, headers, self.timeout, do_droplets, addresses=addresses, journal=journal,
+            fingerprinter=self.fingerprinter, session=self.session, max_workers=self.max_workers,
+            mode=self.probe_mode, escalate=self.escalate, stats=stats, deadline=deadline,
+            cache=self.cache,
+        )
+        for domain, url, row in results:
+            yield ProbeResult.from_row(domain, url, headers, row)
+
+    def iter_droplets_async(self, loop=None, executor=None):
+        """
+        Asynchronously iterate over droplets matching the filters, see `iter_droplets`
+
+        :rtype: AsyncIterator
+        """
+        return AsyncIterator(self.iter_droplets(), loop=loop, executor=executor)
+
+    def iter_dns_records_async(self, verbose=False, loop=None, executor=None):
+        """
+        Asynchronously iterate over DNS records of the domains matching the filters, see `iter_dns_records`
+
+        :rtype: AsyncIterator
+        """
+        return AsyncIterator(self.iter_dns_records(verbose=verbose), loop=loop, executor=executor)
+
+    def probe_domains_async(self, headers=None, journal=None, deadline=None, loop=None, executor=None):
+        """
+        Asynchronously probe the DNS records of the domains matching the filters, see `probe_domains`
+
+        :rtype: AsyncIterator
+        """
+        return AsyncIterator(
+            self.probe_domains(headers=headers, journal=journal, deadline=deadline), loop=loop, executor=executor,
+        )
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit cross-run probe results cache
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import socket
+import threading
+import time
+
+from six.moves.urllib.parse import urlparse
+
+from do_audit.journal import is_healthy_row, serialize_row
+from do_audit.utils import write_json_atomic
+
+
+def resolve_url(url, timeout=None):
+    """
+    Helper function for resolving the URL host to the IP address it would be probed at
+
+    `getaddrinfo` can't be given a timeout, so with one the lookup runs in a daemon thread which is left behind
+    if it doesn't finish in time.
+
+    :param url: probed URL
+    :type url: str
+    :param timeout: how many seconds to wait for the lookup, no limit by default
+    :type timeout: float
+    :returns: first resolved IP address or `None` if the host can't be resolved in time
+    :rtype: str
+    """
+    parsed_url = urlparse(url)
+    port = parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)
+    addresses = []
+
+    def lookup():
+        try:
+            addresses.append(socket.getaddrinfo(parsed_url.hostname, port, 0, socket.SOCK_STREAM)[0][4][0])
+        except (socket.error, IndexError):
+            pass
+
+    if timeout is None:
+        lookup()
+    else:
+        thread = threading.Thread(target=lookup)
+        thread.daemon = True
+        thread.start()
+        thread.join(timeout)
+
+    return addresses[0] if addresses else None
+
+
+def probe_state(digest, droplet, mode):
+    """
+    Helper function for computing a digest of everything a cached probe result depends on
+
+    :param digest: zone file digest
+    :type digest: str
+    :param droplet: name and URL of the droplet the resolved IP address belongs to
+    :type droplet: tuple
+    :param mode: probe mode, including the escalation
+    :type mode: str
+    :returns: state SHA-1 hex digest
+    :rtype: str
+    """
+    return hashlib.sha1(json.dumps([digest, droplet, mode]).encode('utf-8')).hexdigest()
+
+
+class ProbeCache(object):
+    """
+    Probe results cache, shared between the runs
+
+    Entries are keyed by the probed URL and the IP address its host resolves to, so moving a record to another
+    server always misses the cache. They're also only valid for the zone file, droplet and probe mode they were
+    probed with (see `probe_state`) and for the `fresh_ok` or `fresh_fail` number of seconds, depending on the
+    result. The cache file is written when it's closed.
+    """
+    def __init__(self, path, fresh_ok=3600, fresh_fail=0):
+        """
+        :param path: cache file path
+        :type path: str
+        :param fresh_ok: for how many seconds the healthy results are served from the cache
+        :type fresh_ok: int
+        :param fresh_fail: for how many seconds the failed results are served from the cache
+        :type fresh_fail: int
+        """
+        self.path = path
+        self.fresh_ok = fresh_ok
+        self.fresh_fail = fresh_fail
+        self.entries = self.load(path)
+        self.last_ips = {
+            entry['url']: entry['ip'] for entry in sorted(self.entries.values(), key=lambda entry: entry['probed_at'])
+        }
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path):
+        """
+        Load cached probes from an existing cache file
+
+        Missing or corrupted cache files are treated as empty.
+
+        :param path: cache file path
+        :type path: str
+        :returns: cache entries keyed by `(url, ip)`
+        :rtype: dict
+        """
+        try:
+            with io.open(path, encoding='utf-8') as fp:
+                return {(entry['url'], entry['ip']): entry for entry in json.load(fp)['entries']}
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def last_ip(self, url):
+        """
+        Get the IP address the URL was last cached at, for when there's no time left to resolve its host
+
+        :param url: probed URL
+        :type url: str
+        :returns: IP address or `None` if the URL was never cached
+        :rtype: str
+        """
+        with self._lock:
+            return self.last_ips.get(url)
+
+    def get(self, url, ip, state, headers):
+        """
+        Get fresh cached probe row ordered by the given headers
+
+        :param url: probed URL
+        :type url: str
+        :param ip: IP address the URL host resolves to
+        :type ip: str
+        :param state: cached probe state, see `probe_state`
+        :type state: str
+        :param headers: dataset headers, all of them but 'Cached' need to be cached
+        :type headers: list of str
+        :returns: dataset row, marked as cached, or `None` if there's no fresh entry
+        :rtype: list
+        """
+        with self._lock:
+            entry = self.entries.get((url, ip))
+
+        if entry is None or entry['state'] != state:
+            return None
+        if any(header not in entry['row'] for header in headers if header != 'Cached'):
+            return None
+
+        fresh_for = self.fresh_ok if is_healthy_row(entry['row']) else self.fresh_fail
+        if time.time() - entry['probed_at'] >= fresh_for:
+            return None
+
+        return [entry['row'].get(header) if header != 'Cached' else 'Yes' for header in headers]
+
+    def store(self, url, ip, state, headers, row):
+        """
+        Cache completed probe row
+
+        :param url: probed URL
+        :type url: str
+        :param ip: IP address the URL host resolves to
+        :type ip: str
+        :param state: probe state, see `probe_state`
+        :type state: str
+        :param headers: dataset headers
+        :type headers: list of str
+        :param row: dataset row
+        :type row: list
+        """
+        row = serialize_row(headers, row)
+        row.pop('Cached', None)
+
+        entry = {'url': url, 'ip': ip, 'state': state, 'probed_at': time.time(), 'row': row}
+        with self._lock:
+            self.entries[(url, ip)] = entry
+            self.last_ips[url] = ip
+
+    def close(self):
+        """Write the entries that may still be fresh to the cache file"""
+        expires_at = time.time() - max(self.fresh_ok, self.fresh_fail)
+
+        with self._lock:
+            entries = [entry for entry in self.entries.values() if entry['probed_at'] > expires_at]
+
+        write_json_atomic(self.path, {'entries': entries})
@@ -5,28 +5,177 @@ do-audit command line utility related code
 from __future__ import unicode_literals
 
 import os
+from collections import OrderedDict
 
 import click
-import dns.zone
-import requests
-import six
 import tablib
 
 from do_audit import api
-from do_audit.utils import add_options, get_do_manager, click_echo_kvp, yes_no, droplet_url
+from do_audit.auditor import Auditor
+from do_audit.fingerprint import DEFAULT_SIGNATURES, Fingerprinter, parse_signature
+from do_audit.filters import AuditFilter, DROPLET_STATUSES
+from do_audit.cache import ProbeCache
+from do_audit.journal import ProbeJournal
+from do_audit.metrics import MetricsClient
+from do_audit.probe import PING_HEADERS, PROBE_MODES
+from do_audit.progress import Deadline, ProbeStats, StatusFileProgress, StderrProgress, measure
+from do_audit.render import Renderer
+from do_audit.resources import fetch_resources
+from do_audit.utils import add_options, get_do_manager, parse_duration
 
 
 click.disable_unicode_literals_warning = True
 tablib_formats = ('json', 'xls', 'yaml', 'csv', 'dbf', 'tsv', 'html', 'latex', 'xlsx', 'ods')
+data_formats = tablib_formats + api.COLUMNAR_FORMATS
+
+command_headers = {
+    'account': api.ACCOUNT_HEADERS,
+    'droplets': api.DROPLET_ALL_HEADERS,
+    'domains': api.DOMAIN_HEADERS,
+    'ping-domains': PING_HEADERS,
+    'orphans': api.ORPHANS_HEADERS,
+}
+
+
+def parse_columns(ctx, param, value):
+    """
+    Click callback for parsing and validating the `--columns` option
+
+    :returns: requested columns, in order
+    :rtype: list of str
+    :raises click.BadParameter: when one of the columns isn't available for the subcommand
+    """
+    if not value:
+        return None
+
+    columns = [column.strip() for column in value.split(',') if column.strip()]
+    headers = command_headers.get(ctx.command.name)
+
+    if headers:
+        try:
+            api.select_headers(headers, headers, columns)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+    return columns
+
+
+def parse_duration_option(ctx, param, value):
+    """
+    Click callback for parsing the duration options, e.g. '--fresh-ok 1h'
+
+    :returns: number of seconds
+    :rtype: int
+    :raises click.BadParameter: when the duration isn't in the expected format
+    """
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def parse_signatures(ctx, param, value):
+    """
+    Click callback for parsing the `--signature` options
+
+    :returns: custom signatures keyed by their name
+    :rtype: collections.OrderedDict
+    :raises click.BadParameter: when one of the signatures isn't in the 'name=regex' format
+    """
+    try:
+        return OrderedDict(parse_signature(signature) for signature in value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
 
 global_options = [
     click.option('--access-token', '-t', type=str, help="Digital Ocean API access token."),
     click.option('--output-file', '-o', type=click.File('wb'), help="Output file path."),
-    click.option('--data-format', '-f', type=click.Choice(tablib_formats), default='csv',
+    click.option('--data-format', '-f', type=click.Choice(data_formats), default='csv',
                  help="Output file dat format."),
     click.option('--verbose', '-v', is_flag=True, help="Show extra information."),
+    click.option('--columns', '-c', callback=parse_columns,
+                 help="Comma separated list of columns to show, e.g. 'Name,IP,Created at'."),
+    click.option('--table', is_flag=True, help="Show the output as a compact table."),
+]
+
+# Resources subcommand datasets, keyed by the resource type
+resource_datasets = OrderedDict([
+    ('volumes', ("Volumes", api.create_volumes_dataset)),
+    ('snapshots', ("Snapshots", api.create_snapshots_dataset)),
+    ('floating_ips', ("Floating IPs", api.create_floating_ips_dataset)),
+    ('load_balancers', ("Load balancers", api.create_load_balancers_dataset)),
+    ('firewalls', ("Firewalls", api.create_firewalls_dataset)),
+    ('tags', ("Tags", api.create_tags_dataset)),
+])
+
+filter_options = [
+    click.option('--tag', 'tags', multiple=True, help="Only include droplets with this tag."),
+    click.option('--region', 'regions', multiple=True, help="Only include droplets in this region (slug or name)."),
+    click.option('--status', 'statuses', multiple=True, type=click.Choice(DROPLET_STATUSES),
+                 help="Only include droplets with this status."),
+    click.option('--domain', 'domain_names', multiple=True, help="Only include this domain."),
 ]
 
+# Minimum `--table` column widths of the streamed ping rows, as they're printed before all of them are known
+ping_table_widths = {'Domain': 20, 'URL': 40, 'Status code': 11, 'IP': 15, 'Droplet': 20}
+
+
+def export_dataset(dataset, output_file, data_format, columns=None):
+    """
+    Export dataset to the output file and let the user know about it
+
+    :param dataset: dataset to export
+    :type dataset: tablib.Dataset
+    :param output_file: binary output file
+    :type output_file: file
+    :param data_format: one of `data_formats`
+    :type data_format: str
+    :param columns: already built dataset columns, used by the columnar formats
+    :type columns: collections.OrderedDict
+    :raises click.ClickException: when the columnar format dependencies aren't installed
+    """
+    if data_format in api.COLUMNAR_FORMATS:
+        try:
+            api.export_columns(columns or api.dataset_to_columns(dataset), output_file, data_format)
+        except ImportError as e:
+            raise click.ClickException(str(e))
+    else:
+        export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
+        output_file.write(dataset.export(data_format, **export_kwargs).encode())
+
+    echo_export_success(output_file, data_format)
+
+
+def export_rows(headers, rows, output_file, data_format):
+    """
+    Export dataset rows to the output file, streaming them when the data format allows it
+
+    :param headers: dataset headers
+    :type headers: list of str
+    :param rows: dataset rows
+    :type rows: iterable of list
+    :param output_file: binary output file
+    :type output_file: file
+    :param data_format: one of `data_formats`
+    :type data_format: str
+    """
+    if data_format in api.STREAMING_FORMATS:
+        api.stream_rows(headers, rows, output_file, data_format)
+        echo_export_success(output_file, data_format)
+    else:
+        export_dataset(tablib.Dataset(*rows, headers=headers), output_file, data_format)
+
+
+def echo_export_success(output_file, data_format):
+    """Let the user know the data was exported"""
+    click.secho(
+        "{format} data was successfully exported to '{file_path}'".format(
+            format=data_format.upper(),
+            file_path=click.format_filename(output_file.name),
+        ), fg='green',
+    )
+
 
 @click.group()
 @add_options(global_options)
@@ -46,211 +195,351 @@ def cli(ctx, access_token, **kwargs):
 @cli.command()
 @add_options(global_options)
 @click.pass_context
-def account(ctx, access_token, output_file, data_format, verbose):
+def account(ctx, access_token, output_file, data_format, verbose, columns, table):
     """Show basic account info"""
     if not ctx.obj:
         ctx.obj = get_do_manager(access_token)
     do_account = ctx.obj.get_account()
 
-    dataset = api.create_accounts_dataset(do_account, verbose=verbose)
+    dataset = api.create_accounts_dataset(do_account, verbose=verbose, columns=columns)
 
     # Export to file
     if output_file:
-        export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
-        output_file.write(dataset.export(data_format, **export_kwargs).encode())
-
-        click.secho(
-            "{format} data was successfully exported to '{file_path}'".format(
-                format=data_format.upper(),
-                file_path=click.format_filename(output_file.name),
-            ), fg='green',
-        )
+        export_dataset(dataset, output_file, data_format)
     # Print dataset to stdout
     else:
-        for key, value in dataset.dict[0].items():
-            click_echo_kvp(key, value)
+        with Renderer() as renderer:
+            if table:
+                renderer.table(dataset.headers, dataset)
+            else:
+                for key, value in dataset.dict[0].items():
+                    renderer.kvp(key, value)
 
 
 @cli.command()
+@click.option('--metrics', is_flag=True, help="Include CPU, memory and bandwidth summaries from the monitoring API.")
+@click.option('--metrics-window', type=click.IntRange(min=60), default=3600,
+              help="How many seconds of the most recent metrics to summarize.")
+@add_options(filter_options)
 @add_options(global_options)
 @click.pass_context
-def droplets(ctx, access_token, output_file, data_format, verbose):
+def droplets(ctx, metrics, metrics_window, tags, regions, statuses, domain_names, access_token, output_file,
+             data_format, verbose, columns, table):
     """List your droplets"""
     if not ctx.obj:
         ctx.obj = get_do_manager(access_token)
-    do_droplets = ctx.obj.get_all_droplets()
 
-    dataset = api.create_droplets_dataset(do_droplets, verbose=verbose)
+    audit_filter = AuditFilter(tags=tags, regions=regions, statuses=statuses, domains=domain_names)
+    do_droplets = list(Auditor(ctx.obj, audit_filter=audit_filter).iter_droplets())
 
-    # Export to file
-    if output_file:
-        export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
-        output_file.write(dataset.export(data_format, **export_kwargs).encode())
+    headers = api.droplets_headers(verbose=verbose, columns=columns, metrics=metrics)
 
-        click.secho(
-            "{format} data was successfully exported to '{file_path}'".format(
-                format=data_format.upper(),
-                file_path=click.format_filename(output_file.name),
-            ), fg='green',
-        )
+    # Metrics are only fetched when any of their columns is shown
+    do_metrics = None
+    if any(header in api.DROPLET_METRICS_HEADERS for header in headers):
+        do_metrics = MetricsClient(ctx.obj, window=metrics_window).fetch(do_droplets)
+
+    # Export to file
+    if output_file and data_format in api.COLUMNAR_FORMATS:
+        droplets_columns = api.create_droplets_columns(do_droplets, columns=headers, metrics=do_metrics)
+        export_dataset(api.columns_to_dataset(droplets_columns), output_file, data_format, columns=droplets_columns)
+    elif output_file:
+        export_rows(headers, api.iter_droplets_rows(do_droplets, headers, metrics=do_metrics), output_file, data_format)
     # Print dataset to stdout
     else:
-        for n, row in enumerate(dataset.dict, start=1):
-            droplet_name = row.pop('Name')
-            droplet_status = row.pop('Status')
+        with Renderer() as renderer:
+            if table:
+                renderer.table(headers, api.iter_droplets_rows(do_droplets, headers, metrics=do_metrics))
+                return
 
-            click.secho(
-                '# {} ({})'.format(droplet_name, droplet_status),
-                fg='yellow', bold=True,
-            )
+            for n, row in enumerate(api.iter_droplets_rows(do_droplets, headers, metrics=do_metrics)):
+                row = OrderedDict(zip(headers, row))
+                droplet_name = row.pop('Name', None)
+                droplet_status = row.pop('Status', None)
 
-            for key, value in row.items():
-                click_echo_kvp(key, value)
+                if n:
+                    renderer.write()  # Print a new line between droplets
 
-            if n != len(dataset.dict):
-                click.echo()  # Print a new line between droplets
+                if droplet_name is not None:
+                    renderer.heading(
+                        '# {} ({})'.format(droplet_name, droplet_status) if droplet_status else
+                        '# {}'.format(droplet_name)
+                    )
+                elif droplet_status is not None:
+                    renderer.kvp('Status', droplet_status)
+
+                for key, value in row.items():
+                    renderer.kvp(key, value)
 
 
 @cli.command()
+@add_options(filter_options)
 @add_options(global_options)
 @click.pass_context
-def domains(ctx, access_token, output_file, data_format, verbose):
+def domains(ctx, tags, regions, statuses, domain_names, access_token, output_file, data_format, verbose, columns,
+            table):
     """List your domains"""
     if not ctx.obj:
         ctx.obj = get_do_manager(access_token)
 
-    do_domains = ctx.obj.get_all_domains()
+    audit_filter = AuditFilter(tags=tags, regions=regions, statuses=statuses, domains=domain_names)
+    records = Auditor(ctx.obj, audit_filter=audit_filter).iter_dns_records(verbose=verbose)
 
-    dataset = api.create_domains_dataset(do_domains, verbose=verbose)
+    headers = api.domains_headers(columns)
+    indexes = [api.DOMAIN_HEADERS.index(header) for header in headers]
+    rows = ([record[index] for index in indexes] for record in records)
 
     # Export to file
     if output_file:
-        export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
-        output_file.write(dataset.export(data_format, **export_kwargs).encode())
-
-        click.secho(
-            "{format} data was successfully exported to '{file_path}'".format(
-                format=data_format.upper(),
-                file_path=click.format_filename(output_file.name),
-            ), fg='green',
-        )
+        export_rows(headers, rows, output_file, data_format)
     # Print dataset to stdout
     else:
-        domain = None
-        for n, row in enumerate(dataset.dict, start=1):
-            # Group the record by the domain
-            if domain != row['Domain']:
-                if n > 1:
-                    click.echo()  # Print a new line between droplets
-
-                domain = row['Domain']
-                click.secho('# {}'.format(domain), fg='yellow', bold=True)
-
-            click.echo(
-                '{subdomain:<35} {record_type:<10} {destination}'.format(
-                    subdomain=row['Subdomain'],
-                    record_type=row['Record type'],
-                    destination=row['Destination'],
-                )
-            )
+        with Renderer() as renderer:
+            if table:
+                renderer.table(headers, rows)
+                return
 
+            domain = None
+            paddings = {'Subdomain': 35, 'Record type': 10}
+            for n, row in enumerate(rows):
+                row = OrderedDict(zip(headers, row))
 
-@cli.command(name='ping-domains')
-@click.option('--timeout', '-t', type=int, default=3, help="How many seconds to wait for the server before giving up.")
+                # Group the record by the domain
+                if 'Domain' in row and domain != row['Domain']:
+                    if n:
+                        renderer.write()  # Print a new line between droplets
+
+                    domain = row['Domain']
+                    renderer.heading('# {}'.format(domain))
+
+                renderer.write(' '.join(
+                    '{value:<{padding}}'.format(value=value, padding=paddings[key]) if key in paddings else value
+                    for key, value in row.items() if key != 'Domain'
+                ))
+
+
+@cli.command()
 @add_options(global_options)
 @click.pass_context
-def ping_domains(ctx, timeout, access_token, output_file, data_format, verbose):
-    """Ping your domains and see what's the response"""
+def orphans(ctx, access_token, output_file, data_format, verbose, columns, table):
+    """Find dangling DNS records and unreferenced droplets"""
     if not ctx.obj:
         ctx.obj = get_do_manager(access_token)
 
+    do_droplets = ctx.obj.get_all_droplets()
+    do_floating_ips = ctx.obj.get_all_floating_ips()
     do_domains = ctx.obj.get_all_domains()
-    do_droplets = {
-        droplet.ip_address: (droplet.name, droplet_url(droplet.id))
-        for droplet in ctx.obj.get_all_droplets()
-    }
 
-    # Create dataset with the data we want
-    headers = ['Domain', 'URL', 'Status code', 'IP', 'Port', 'Droplet', 'Default NGINX', 'Error', 'Exception']
-    dataset = tablib.Dataset(headers=headers)
+    headers = api.select_headers(api.ORPHANS_HEADERS, api.ORPHANS_HEADERS, columns)
+    rows = api.iter_orphans_rows(do_droplets, do_domains, headers, floating_ips=do_floating_ips)
 
+    # Export to file
     if output_file:
-        click.secho('Working...', fg='yellow')
-
-    for n, domain in enumerate(do_domains, start=1):
-        # We could use Digital Ocean domain records API endpoint but parsing the zone file is *much* quicker
-        zone = dns.zone.from_text(domain.zone_file)
-        domain = zone.origin.to_text(omit_final_dot=True)
-
-        if not output_file:
-            click.secho('# {}'.format(domain), fg='yellow', bold=True)
-
-        for record in zone.nodes:
-            absolute_url = record.derelativize(zone.origin).to_text(omit_final_dot=True)
-            url_http = 'http://' + absolute_url
-            url_https = 'https://' + absolute_url
-
-            for url in [url_http, url_https]:
-                # Do our best to specify why the request crashes, if it does
-                try:
-                    error = None
-                    response = requests.get(url, timeout=timeout, stream=True)
-                except requests.exceptions.Timeout as e:
-                    error = ("Request timed out", e)
-                except requests.exceptions.SSLError as e:
-                    error = ("SSL error", e)
-                except requests.exceptions.ConnectionError as e:
-                    error = ("Connection error", e)
-                except requests.exceptions.TooManyRedirects as e:
-                    error = ("Too many redirects", e)
-
-                if error:
-                    row = [domain, url, None, None, None, None, None, error[0], error[1]]
-                else:
-                    # Get the IP address from the underlying request socket
-                    # Source: https://stackoverflow.com/a/36357465
-                    if six.PY2:
-                        ip, port = response.raw._fp.fp._sock.getpeername()
-                    else:
-                        ip, port = response.raw._fp.fp.raw._sock.getpeername()
+        export_rows(headers, rows, output_file, data_format)
+    # Print dataset to stdout
+    else:
+        with Renderer() as renderer:
+            if table:
+                renderer.table(headers, rows)
+                return
 
-                    status_code = '{} ({})'.format(response.status_code, response.reason)
-                    droplet = '{} ({})'.format(do_droplets[ip][0], do_droplets[ip][1]) if ip in do_droplets else '-'
-                    is_nginx = 'nginx' in response.text.lower()
+            issue = None
+            paddings = {'Domain': 25, 'Subdomain': 25, 'Record type': 10, 'Address': 40}
+            for n, row in enumerate(rows):
+                row = OrderedDict(zip(headers, row))
 
-                    row = [domain, url, status_code, ip, port, droplet, yes_no(is_nginx), None, None]
+                # Group the rows by the issue
+                if 'Issue' in row and issue != row['Issue']:
+                    if n:
+                        renderer.write()  # Print a new line between issues
 
-                dataset.append(row)
+                    issue = row['Issue']
+                    renderer.heading('# {}'.format(issue))
 
-                # Let's print it here as we go instead of one large dump at the end of the whole loop
-                if not output_file:
-                    last_row = dataset.dict[-1]
+                renderer.write(' '.join(
+                    '{value:<{padding}}'.format(value=value, padding=paddings[key]) if key in paddings else value
+                    for key, value in row.items() if key != 'Issue' and value is not None
+                ).rstrip())
 
-                    click.secho('- {}'.format(last_row['URL']), bold=True)
 
-                    if last_row['Error']:
-                        click.secho("    {}".format(last_row['Error']), fg='red')
-                        if verbose:
-                            click.echo('    {}'.format(last_row['Exception']))
-                    else:
-                        for key, value in last_row.items():
-                            if value and key not in ['Domain', 'URL']:
-                                click_echo_kvp('    ' + key, value)
+@cli.command()
+@click.option('--type', 'resource_types', multiple=True, type=click.Choice(list(resource_datasets)),
+              help="Only show this resource type, all of them are shown by default.")
+@add_options(global_options)
+@click.pass_context
+def resources(ctx, resource_types, access_token, output_file, data_format, verbose, columns, table):
+    """List your volumes, snapshots, floating IPs, load balancers, firewalls and tags"""
+    resource_types = list(resource_types) or list(resource_datasets)
+    if output_file and len(resource_types) > 1:
+        raise click.UsageError("Exporting to a file requires a single '--type'.")
 
-                    if n != len(do_domains):
-                        click.echo()  # Print a new line between subdomains
+    if not ctx.obj:
+        ctx.obj = get_do_manager(access_token)
+
+    # Droplets are always fetched so the resources can show their names instead of IDs, including the tagged ones
+    snapshot = fetch_resources(ctx.obj, ['droplets'] + resource_types)
+
+    datasets = OrderedDict()
+    for resource_type in resource_types:
+        title, create_dataset = resource_datasets[resource_type]
+        try:
+            datasets[title] = create_dataset(
+                getattr(snapshot, resource_type), verbose=verbose, columns=columns, account=snapshot,
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--columns'")
 
     # Export to file
     if output_file:
-        export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
-        output_file.write(dataset.export(data_format, **export_kwargs).encode())
+        export_dataset(list(datasets.values())[0], output_file, data_format)
+    # Print datasets to stdout
+    else:
+        with Renderer() as renderer:
+            for n, (title, dataset) in enumerate(datasets.items()):
+                if n:
+                    renderer.write()  # Print a new line between resource types
+
+                renderer.heading('# {}'.format(title))
+
+                if table:
+                    renderer.table(dataset.headers, dataset)
+                    continue
+
+                for values in dataset:
+                    row = OrderedDict(zip(dataset.headers, values))
+                    key, value = row.popitem(last=False)
+                    renderer.title('- {}'.format(value))
+
+                    for key, value in row.items():
+                        renderer.kvp('    ' + key, value)
 
-        click.secho(
-            "{format} data was successfully exported to '{file_path}'".format(
-                format=data_format.upper(),
-                file_path=click.format_filename(output_file.name),
-            ), fg='green',
-        )
+
+@cli.command(name='ping-domains')
+@click.option('--timeout', '-t', type=int, default=3, help="How many seconds to wait for the server before giving up.")
+@click.option('--journal', 'journal_path', type=click.Path(dir_okay=False, writable=True),
+              help="Checkpoint journal file path, every completed probe is appended to it.")
+@click.option('--resume', is_flag=True, help="Skip probes already completed in the checkpoint journal.")
+@click.option('--signature', 'signatures', multiple=True, callback=parse_signatures,
+              help="Custom response signature, e.g. 'Grafana=<title>grafana'.")
+@click.option('--workers', type=click.IntRange(min=1), default=8, help="How many probes to send at the same time.")
+@click.option('--probe-mode', type=click.Choice(PROBE_MODES), default='get',
+              help="Only connect to the port (tcp), send a HEAD or a full GET request.")
+@click.option('--escalate', is_flag=True, help="Send a GET request to the targets that passed the cheaper probe.")
+@click.option('--progress', is_flag=True, help="Show live progress on stderr.")
+@click.option('--status-file', type=click.Path(dir_okay=False, writable=True),
+              help="Status file path, live progress is written to it as JSON.")
+@click.option('--stats-json', type=click.Path(dir_okay=False, writable=True),
+              help="Statistics file path, totals, latency percentiles and phase times are written to it at the end.")
+@click.option('--deadline', type=click.IntRange(min=1),
+              help="How many seconds the whole run can take, the targets that weren't probed in time are skipped.")
+@click.option('--cache', 'cache_path', type=click.Path(dir_okay=False, writable=True),
+              help="Probe results cache file path, fresh results are served from it.")
+@click.option('--fresh-ok', default='1h', callback=parse_duration_option,
+              help="How long the healthy cached results are fresh for, e.g. '30m' or '1h'.")
+@click.option('--fresh-fail', default='0', callback=parse_duration_option,
+              help="How long the failed cached results are fresh for, never by default.")
+@add_options(filter_options)
+@add_options(global_options)
+@click.pass_context
+def ping_domains(ctx, timeout, journal_path, resume, signatures, workers, probe_mode, escalate, progress, status_file,
+                 stats_json, deadline, cache_path, fresh_ok, fresh_fail, tags, regions, statuses, domain_names,
+                 access_token, output_file, data_format, verbose, columns, table):
+    """Ping your domains and see what's the response"""
+    # The deadline covers the whole run, including the API requests
+    run_deadline = Deadline(deadline) if deadline else None
+
+    if resume and not journal_path:
+        raise click.UsageError("The '--resume' option requires a '--journal' file path.")
+    if escalate and probe_mode == 'get':
+        raise click.UsageError("The '--escalate' option requires a cheaper '--probe-mode' (tcp or head).")
+
+    # Custom signatures are matched along with the default ones
+    fingerprinter = None
+    try:
+        if signatures:
+            fingerprinter = Fingerprinter(OrderedDict(list(DEFAULT_SIGNATURES.items()) + list(signatures.items())))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--signature'")
+
+    if not ctx.obj:
+        ctx.obj = get_do_manager(access_token)
+
+    cache = ProbeCache(cache_path, fresh_ok=fresh_ok, fresh_fail=fresh_fail) if cache_path else None
+    auditor = Auditor(
+        ctx.obj, audit_filter=AuditFilter(tags=tags, regions=regions, statuses=statuses, domains=domain_names),
+        timeout=timeout, max_workers=workers, fingerprinter=fingerprinter, probe_mode=probe_mode, escalate=escalate,
+        cache=cache,
+    )
+
+    reporters = []
+    if progress:
+        reporters.append(StderrProgress())
+    if status_file:
+        reporters.append(StatusFileProgress(status_file))
+    stats = ProbeStats(reporters) if reporters or stats_json else None
+
+    # Fail early if one of the domains doesn't exist
+    with measure(stats, 'api_fetch'):
+        auditor.get_domains()
+
+    # The 'Cached' column is only shown by default when the cache is used
+    headers = api.select_headers(
+        PING_HEADERS, [header for header in PING_HEADERS if cache or header != 'Cached'], columns,
+    )
+    journal = ProbeJournal(journal_path, resume=resume) if journal_path else None
+    results = (
+        (result.domain, result.url, result.to_row(headers))
+        for result in auditor.probe_domains(headers=headers, journal=journal, stats=stats, deadline=run_deadline)
+    )
+
+    try:
+        # Export to file, as the probes complete when the data format allows it
+        if output_file:
+            if not progress:
+                click.secho('Working...', fg='yellow')
+            export_rows(headers, (row for _, _, row in results), output_file, data_format)
+        # Let's print it here as we go instead of one large dump at the end of the whole loop
+        else:
+            with Renderer(pager=False, autoflush=True) as renderer:
+                if table:
+                    renderer.table(headers, (row for _, _, row in results), widths=ping_table_widths, sample_size=0)
+                    return
+
+                domain = None
+                for n, (row_domain, url, row) in enumerate(results):
+                    row = OrderedDict(zip(headers, row))
+
+                    if n:
+                        renderer.write()  # Print a new line between subdomains
+
+                    if domain != row_domain:
+                        domain = row_domain
+                        renderer.heading('# {}'.format(domain))
+
+                    renderer.title('- {}'.format(url))
+
+                    if row.get('Error'):
+                        renderer.error("    {}".format(row['Error']))
+                        if verbose and 'Exception' in row:
+                            renderer.write('    {}'.format(row['Exception']))
+                    else:
+                        for key, value in row.items():
+                            if value and key not in ['Domain', 'URL']:
+                                renderer.kvp('    ' + key, value)
+    finally:
+        if journal:
+            journal.close()
+        # Failing to write the cache shouldn't hide the results or the error the run failed with
+        if cache:
+            try:
+                cache.close()
+            except (IOError, OSError) as e:
+                click.secho("Warning: unable to write the cache file '{}': {}".format(cache_path, e), fg='yellow',
+                            err=True)
+        if stats:
+            stats.close()
+            if stats_json:
+                stats.write_summary(stats_json)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit droplets and domains filters
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import click
+import digitalocean
+
+from do_audit.api import droplet_addresses
+
+
+DROPLET_STATUSES = ('new', 'active', 'off', 'archive')
+
+
+class AuditFilter(object):
+    """
+    Droplets and domains filters shared by the subcommands
+
+    Filters the DigitalOcean API understands are sent along with the API requests (droplet tags, domain
+    names) and the rest is compiled into a single droplet predicate, so the filtered out resources never get
+    to zone parsing, dataset row building or probing.
+    """
+    def __init__(self, tags=None, regions=None, statuses=None, domains=None):
+        """
+        :param tags: droplet tags, any of them needs to match
+        :type tags: list of str
+        :param regions: droplet region slugs or names, any of them needs to match
+        :type regions: list of str
+        :param statuses: droplet statuses, any of them needs to match
+        :type statuses: list of str
+        :param domains: domain names, any of them needs to match
+        :type domains: list of str
+        """
+        self.tags = tuple(tags or ())
+        self.regions = tuple(regions or ())
+        self.statuses = tuple(statuses or ())
+        self.domains = tuple(domains or ())
+
+        self.droplet_predicate = self.compile_droplet_predicate()
+
+    @property
+    def filters_droplets(self):
+        """
+        If any of the droplet filters was set
+
+        :rtype: bool
+        """
+        return bool(self.tags or self.regions or self.statuses)
+
+    def compile_droplet_predicate(self):
+        """
+        Compile all droplet filters into a single predicate
+
+        :returns: function returning `True` for droplets that match all the filters
+        :rtype: callable
+        """
+        checks = []
+
+        if self.tags:
+            tags = frozenset(self.tags)
+            checks.append(lambda droplet: not tags.isdisjoint(droplet.tags))
+
+        if self.regions:
+            regions = frozenset(region.lower() for region in self.regions)
+            checks.append(lambda droplet: (
+                droplet.region['slug'].lower() in regions or droplet.region['name'].lower() in regions
+            ))
+
+        if self.statuses:
+            statuses = frozenset(self.statuses)
+            checks.append(lambda droplet: droplet.status in statuses)
+
+        if not checks:
+            return lambda droplet: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda droplet: all(check(droplet) for check in checks)
+
+    def get_droplets(self, manager):
+        """
+        Get droplets matching the filters
+
+        :param manager: Digital Ocean manager instance
+        :type manager: digitalocean.Manager
+        :returns: list of DigitalOcean droplets
+        :rtype: list of digitalocean.Droplet.Droplet
+        """
+        if self.tags:
+            # The API can only filter by a single tag so we fetch them one by one and drop the duplicates
+            droplets = OrderedDict()
+            for tag in self.tags:
+                for droplet in manager.get_all_droplets(tag_name=tag):
+                    droplets[droplet.id] = droplet
+            droplets = list(droplets.values())
+        else:
+            droplets = manager.get_all_droplets()
+
+        return [droplet for droplet in droplets if self.droplet_predicate(droplet)]
+
+    def get_droplet_addresses(self, manager, droplets=None):
+        """
+        Get IP addresses of droplets matching the filters
+
+        :param manager: Digital Ocean manager instance
+        :type manager: digitalocean.Manager
+        :param droplets: already fetched droplets matching the filters
+        :type droplets: list of digitalocean.Droplet.Droplet
+        :returns: IP addresses or `None` if no droplet filters were set
+        :rtype: set of str or None
+        """
+        if not self.filters_droplets:
+            return None
+
+        if droplets is None:
+            droplets = self.get_droplets(manager)
+
+        return {address for droplet in droplets for address in droplet_addresses(droplet)}
+
+    def get_domains(self, manager):
+        """
+        Get domains matching the filters
+
+        :param manager: Digital Ocean manager instance
+        :type manager: digitalocean.Manager
+        :returns: list of DigitalOcean domains
+        :rtype: list of digitalocean.Domain.Domain
+        :raises click.ClickException: when one of the domains doesn't exist
+        """
+        if not self.domains:
+            return manager.get_all_domains()
+
+        try:
+            return [manager.get_domain(domain) for domain in self.domains]
+        except digitalocean.Error as e:
+            raise click.ClickException("We were unable to get your domain: '{}'".format(e))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit probe response fingerprinting
+"""
+from __future__ import unicode_literals
+
+import re
+from collections import OrderedDict
+
+
+# How much of the response body is scanned, default pages identify themselves well before that
+BODY_PREFIX_SIZE = 16 * 1024
+
+# Default signatures, keyed by their name, matched against the response headers ('Name: value' lines)
+# and the body prefix, case insensitive
+DEFAULT_SIGNATURES = OrderedDict([
+    ('Default NGINX', r'<title>welcome to nginx|<center>nginx(?:/[\d.]+)?</center>'),
+    ('Default Apache', r'apache2? \w+ default page|<title>test page for the apache|<h1>it works!</h1>'),
+    ('Default IIS', r'<title>iis windows server</title>|<title>iis\d* welcome|<title>internet information services'),
+    ('Parked domain', (
+        r'this domain (?:is|may be) (?:parked|for sale)|buy this domain|sedoparking|parkingcrew|bodis\.com'
+        r'|^x-adblock-key:'
+    )),
+    ('DigitalOcean one-click', (
+        r'digitalocean one-click|one-click (?:app|droplet)|cloud\.digitalocean\.com/marketplace'
+    )),
+])
+
+SIGNATURE_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Backreferences, named groups and conditionals (unless their backslash is escaped) depend on the group numbers and
+# names, which the combined alternation changes
+GROUP_REFERENCES = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?P[=<]|\(\?\()')
+
+
+class Fingerprinter(object):
+    """
+    Multi-signature response matcher
+
+    All the signatures are compiled into a single alternation so each response is scanned once, no matter how
+    many signatures there are. Every time the combined pattern matches, the signatures that weren't found yet
+    are also tried at the same position, so overlapping signatures are all reported. Signatures referring to their
+    own groups (see `GROUP_REFERENCES`) can't be combined, they're matched separately.
+    """
+    def __init__(self, signatures=None, prefix_size=BODY_PREFIX_SIZE):
+        """
+        :param signatures: regular expressions keyed by the signature name, `DEFAULT_SIGNATURES` by default
+        :type signatures: collections.OrderedDict
+        :param prefix_size: how many bytes of the response body to scan
+        :type prefix_size: int
+        :raises ValueError: when one of the signatures isn't a valid regular expression
+        """
+        self.signatures = OrderedDict(DEFAULT_SIGNATURES if signatures is None else signatures)
+        self.prefix_size = prefix_size
+
+        self.names = list(self.signatures)
+        self.groups = ['_signature_{}'.format(n) for n in range(len(self.names))]
+
+        sources = list(self.signatures.values())
+        self.combined = [n for n, pattern in enumerate(sources) if not GROUP_REFERENCES.search(pattern)]
+        self.separate = [n for n in range(len(sources)) if n not in self.combined]
+
+        try:
+            self.patterns = [re.compile(pattern, SIGNATURE_FLAGS) for pattern in sources]
+            self.matcher = re.compile('|'.join(
+                '(?P<{}>{})'.format(self.groups[n], sources[n]) for n in self.combined
+            ), SIGNATURE_FLAGS) if self.combined else None
+        except re.error as e:
+            raise ValueError("Invalid signature: '{}'".format(e))
+
+    def match(self, text):
+        """
+        Find all the signatures matching the text
+
+        :param text: scanned text
+        :type text: str
+        :returns: names of the matching signatures, in the signatures order
+        :rtype: list of str
+        """
+        found = set()
+        position = 0
+
+        while self.matcher and any(n not in found for n in self.combined):
+            match = self.matcher.search(text, position)
+            if not match:
+                break
+
+            for n in self.combined:
+                if n not in found and (match.group(self.groups[n]) is not None or
+                                       self.patterns[n].match(text, match.start())):
+                    found.add(n)
+
+            position = match.start() + 1
+
+        found.update(n for n in self.separate if self.patterns[n].search(text))
+
+        return [name for n, name in enumerate(self.names) if n in found]
+
+    def match_response(self, response, deadline=None):
+        """
+        Find all the signatures matching the response headers and body prefix
+
+        Only the body prefix is downloaded and the response is closed afterwards. With the deadline, the reading
+        stops once it passes and only the part of the prefix read until then is matched.
+
+        :param response: streamed response
+        :type response: requests.Response
+        :param deadline: whole run deadline
+        :type deadline: do_audit.progress.Deadline
+        :returns: names of the matching signatures, in the signatures order
+        :rtype: list of str
+        """
+        # Chunked and compressed bodies are often decoded in chunks much smaller than the prefix
+        body = b''
+        try:
+            for chunk in response.iter_content(self.prefix_size):
+                body += chunk
+                if len(body) >= self.prefix_size or (deadline and deadline.expired):
+                    break
+        finally:
+            response.close()
+
+        body = body[:self.prefix_size]
+
+        try:
+            body = body.decode(response.encoding or 'utf-8', 'replace')
+        except LookupError:
+            body = body.decode('utf-8', 'replace')
+
+        headers = ''.join('{}: {}\n'.format(key, value) for key, value in response.headers.items())
+
+        return self.match(headers + '\n' + body)
+
+
+def parse_signature(value):
+    """
+    Parse custom signature definition
+
+    :param value: signature definition, e.g. 'Grafana=<title>grafana</title>'
+    :type value: str
+    :returns: signature name and regular expression
+    :rtype: tuple
+    :raises ValueError: when the definition isn't in the 'name=regex' format
+    """
+    name, separator, pattern = value.partition('=')
+    if not (name.strip() and separator and pattern):
+        raise ValueError("Signatures need to be in the 'name=regex' format, got '{}'.".format(value))
+
+    return name.strip(), pattern
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit append-only checkpoint journal for long running probes
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+from collections import OrderedDict
+
+import six
+
+
+def zone_digest(zone_file):
+    """
+    Helper function for computing a stable digest of a domain zone file
+
+    :param zone_file: domain zone file contents
+    :type zone_file: str
+    :returns: zone file SHA-1 hex digest
+    :rtype: str
+    """
+    return hashlib.sha1(zone_file.encode('utf-8')).hexdigest()
+
+
+def serialize_row(headers, row):
+    """
+    Helper function for converting a probe row to a JSON serializable dict
+
+    :param headers: dataset headers
+    :type headers: list of str
+    :param row: dataset row
+    :type row: list
+    :returns: row values keyed by their header, numbers are kept and the rest is converted to text
+    :rtype: dict
+    """
+    return {
+        header: value if value is None or isinstance(value, (six.integer_types, float)) else six.text_type(value)
+        for header, value in zip(headers, row)
+    }
+
+
+def is_healthy_row(row):
+    """
+    Helper function for checking if the probe succeeded, i.e. there's no error and no 4xx or 5xx status code
+
+    :param row: probe row values keyed by their header
+    :type row: dict
+    :rtype: bool
+    """
+    return not row.get('Error') and not (row.get('Status code') or '').startswith(('4', '5'))
+
+
+class ProbeJournal(object):
+    """
+    Append-only journal of completed probes
+
+    Every completed probe is written (and flushed) as a single JSON line, so a killed or crashed run loses
+    at most the probe that was in flight. Entries are keyed by the zone file digest and the probed URL which
+    means that changed zones are probed again on resume. They also keep the probe mode, so resuming with a
+    different one probes the URLs again.
+
+    The last probe of every URL in an existing journal is kept as its history even when the run isn't resumed,
+    so the targets that failed last time can be probed first.
+    """
+    def __init__(self, path, resume=False):
+        """
+        :param path: journal file path
+        :type path: str
+        :param resume: if existing journal entries should be loaded instead of truncating the file
+        :type resume: bool
+        """
+        self.path = path
+
+        entries = self.load(path)
+        self.entries = entries if resume else {}
+        self.history = {url: entry['row'] for (_, url), entry in entries.items()}
+
+        self._file = io.open(path, 'a' if resume else 'w', encoding='utf-8')
+
+        # Make sure a partially written last line doesn't swallow the next entry
+        if resume and self._file.tell() and not self._ends_with_newline(path):
+            self._file.write('\n')
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with io.open(path, 'rb') as fp:
+            fp.seek(-1, io.SEEK_END)
+            return fp.read(1) == b'\n'
+
+    @staticmethod
+    def load(path):
+        """
+        Load completed probes from an existing journal file
+
+        Lines that can't be decoded (e.g. a partially written last line) are ignored.
+
+        :param path: journal file path
+        :type path: str
+        :returns: completed probes rows and modes keyed by `(digest, url)`, in the journal order
+        :rtype: collections.OrderedDict
+        """
+        entries = OrderedDict()
+
+        try:
+            with io.open(path, encoding='utf-8') as fp:
+                for line in fp:
+                    try:
+                        entry = json.loads(line)
+                        # Entries journaled before the probe modes were added were all probed with GET requests
+                        entries[(entry['digest'], entry['url'])] = {
+                            'row': entry['row'], 'mode': entry.get('mode', 'get'),
+                        }
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except (IOError, OSError):
+            pass
+
+        return entries
+
+    def is_done(self, digest, url, headers=None, mode='get'):
+        """
+        Check if the URL was already probed against the given zone file digest
+
+        Entries journaled with fewer columns (e.g. when resuming with more `--columns`) aren't done, the URL
+        needs to be probed again to fill in the missing ones.
+
+        :param digest: zone file digest
+        :type digest: str
+        :param url: probed URL
+        :type url: str
+        :param headers: dataset headers the entry needs to have, all of them but 'Cached'
+        :type headers: list of str
+        :param mode: probe mode the entry needs to be probed with, including the escalation
+        :type mode: str
+        :rtype: bool
+        """
+        entry = self.entries.get((digest, url))
+        if entry is None or entry['mode'] != mode:
+            return False
+
+        return all(header in entry['row'] for header in headers or [] if header != 'Cached')
+
+    def is_healthy(self, url):
+        """
+        Check if the last journaled probe of the URL, from this or a previous run, succeeded
+
+        :param url: probed URL
+        :type url: str
+        :returns: `False` if the URL was never probed or its probe failed, see `is_healthy_row`
+        :rtype: bool
+        """
+        row = self.history.get(url)
+        return row is not None and is_healthy_row(row)
+
+    def get_row(self, digest, url, headers):
+        """
+        Get journaled probe row ordered by the given headers
+
+        :param digest: zone file digest
+        :type digest: str
+        :param url: probed URL
+        :type url: str
+        :param headers: dataset headers
+        :type headers: list of str
+        :returns: dataset row
+        :rtype: list
+        """
+        row = self.entries[(digest, url)]['row']
+        return [row.get(header) for header in headers]
+
+    def record(self, digest, url, headers, row, mode='get'):
+        """
+        Append completed probe row to the journal
+
+        :param digest: zone file digest
+        :type digest: str
+        :param url: probed URL
+        :type url: str
+        :param headers: dataset headers
+        :type headers: list of str
+        :param row: dataset row
+        :type row: list
+        :param mode: probe mode, including the escalation
+        :type mode: str
+        """
+        row = serialize_row(headers, row)
+        self.entries[(digest, url)] = {'row': row, 'mode': mode}
+        self.history[url] = row
+
+        line = json.dumps({'digest': digest, 'url': url, 'mode': mode, 'row': row}, sort_keys=True)
+        self._file.write(six.text_type(line) + '\n')
+        self._file.flush()
+
+    def close(self):
+        """Close the underlying journal file"""
+        self._file.close()
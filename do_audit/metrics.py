@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit droplets monitoring metrics
+"""
+from __future__ import unicode_literals
+
+import email.utils
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import requests
+from six.moves.urllib.parse import urljoin
+
+from do_audit.progress import percentile, timer
+
+
+# Monitoring API series needed for each summary, keyed by the metric name
+# Source: https://developers.digitalocean.com/documentation/v2/#monitoring
+METRICS_SERIES = OrderedDict([
+    ('cpu', ('monitoring/metrics/droplet/cpu', {})),
+    ('memory_total', ('monitoring/metrics/droplet/memory_total', {})),
+    ('memory_available', ('monitoring/metrics/droplet/memory_available', {})),
+    ('inbound', ('monitoring/metrics/droplet/bandwidth', {'interface': 'public', 'direction': 'inbound'})),
+    ('outbound', ('monitoring/metrics/droplet/bandwidth', {'interface': 'public', 'direction': 'outbound'})),
+])
+
+METRICS_HEADERS = [
+    'CPU avg', 'CPU p95', 'Memory avg', 'Memory p95', 'Inbound avg', 'Inbound p95', 'Outbound avg', 'Outbound p95',
+]
+
+
+class RateLimiter(object):
+    """
+    Thread safe limiter spacing the requests evenly, so bursts never go over the API rate limit
+    """
+    def __init__(self, rate):
+        """
+        :param rate: maximum number of requests per second
+        :type rate: float
+        """
+        self.interval = 1.0 / rate
+        self._next_at = timer()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next request can be sent"""
+        with self._lock:
+            now = timer()
+            wait_for = self._next_at - now
+            self._next_at = max(self._next_at, now) + self.interval
+
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+def retry_after(value, default=1.0):
+    """
+    Helper function for parsing the 'Retry-After' header, it's either a number of seconds or an HTTP date
+
+    :param value: header value
+    :type value: str
+    :param default: number of seconds used when the header is missing or invalid
+    :type default: float
+    :returns: how many seconds to wait
+    :rtype: float
+    """
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+
+    parsed = email.utils.parsedate_tz(value) if value else None
+    if parsed is None:
+        return default
+    return max(email.utils.mktime_tz(parsed) - time.time(), 0.0)
+
+
+def series_columns(results):
+    """
+    Helper function for aligning Prometheus style series by their timestamps
+
+    :param results: monitoring API 'matrix' results, each with the 'metric' labels and '[timestamp, value]' pairs
+    :type results: list of dict
+    :returns: shared timestamps and a column of values for every series, in the results order
+    :rtype: tuple
+    """
+    series = [{timestamp: float(value) for timestamp, value in result['values']} for result in results]
+    if not series:
+        return [], []
+
+    timestamps = sorted(set.intersection(*[set(values) for values in series]))
+    return timestamps, [[values[timestamp] for timestamp in timestamps] for values in series]
+
+
+def cpu_utilization(results):
+    """
+    Get CPU utilization series from the cumulative per-mode CPU time series
+
+    :param results: monitoring API 'cpu' results, one for every CPU mode
+    :type results: list of dict
+    :returns: CPU utilization percentages between the consecutive samples
+    :rtype: list of float
+    """
+    modes = [result['metric'].get('mode') for result in results]
+    _, columns = series_columns(results)
+    if len(columns) < 1 or len(columns[0]) < 2:
+        return []
+
+    # CPU times are counters so only the differences between the samples matter
+    deltas = [[b - a for a, b in zip(column, column[1:])] for column in columns]
+    totals = [sum(values) for values in zip(*deltas)]
+    idle = deltas[modes.index('idle')] if 'idle' in modes else [0.0] * len(totals)
+
+    return [100.0 * (total - idle) / total for total, idle in zip(totals, idle) if total > 0]
+
+
+def memory_utilization(total_results, available_results):
+    """
+    Get memory utilization series
+
+    :param total_results: monitoring API 'memory_total' results
+    :type total_results: list of dict
+    :param available_results: monitoring API 'memory_available' results
+    :type available_results: list of dict
+    :returns: used memory percentages
+    :rtype: list of float
+    """
+    if not total_results or not available_results:
+        return []
+
+    _, (totals, available) = series_columns([total_results[0], available_results[0]])
+    return [100.0 * (total - free) / total for total, free in zip(totals, available) if total > 0]
+
+
+def summarize(values):
+    """
+    Reduce the series to its average and 95th percentile
+
+    :param values: series values
+    :type values: list of float
+    :returns: average and 95th percentile, `None` if there are no values
+    :rtype: tuple
+    """
+    if not values:
+        return None, None
+    return sum(values) / len(values), percentile(sorted(values), 95)
+
+
+class MetricsClient(object):
+    """
+    DigitalOcean monitoring API client
+
+    Series of all the droplets are fetched concurrently, but never faster than the rate limit allows, and each
+    droplet is reduced to the `METRICS_HEADERS` summary straight away.
+
+    The API allows 250 requests per minute but also only 5000 requests per hour for the whole token. The default
+    `rate` is tuned to the per minute limit, so the hourly one is what limits long runs: every droplet needs one
+    request per `METRICS_SERIES`, and runs that would need more than `hourly_budget` requests are refused up
+    front (retries of the rate limited requests aren't counted, hence some room is left for them and the other
+    API requests).
+    """
+    def __init__(self, manager, window=3600, max_workers=8, rate=4.0, session=None, retries=3, timeout=30,
+                 hourly_budget=4000):
+        """
+        :param manager: Digital Ocean manager instance, its access token and API end point are used
+        :type manager: digitalocean.Manager
+        :param window: how many seconds of the most recent metrics to fetch
+        :type window: int
+        :param max_workers: how many requests to send at the same time
+        :type max_workers: int
+        :param rate: maximum number of requests per second, the API allows 250 requests per minute
+        :type rate: float
+        :param session: session used for sending the requests
+        :type session: requests.Session
+        :param retries: how many times to retry rate limited requests
+        :type retries: int
+        :param timeout: how many seconds to wait for the API before giving up
+        :type timeout: int
+        :param hourly_budget: maximum number of requests a single fetch can send
+        :type hourly_budget: int
+        """
+        self.token = manager.token
+        self.end_point = manager.end_point
+        self.window = window
+        self.max_workers = max_workers
+        self.session = session or requests.Session()
+        self.retries = retries
+        self.timeout = timeout
+        self.hourly_budget = hourly_budget
+
+        self.rate_limiter = RateLimiter(rate)
+
+    def get_series(self, metric, droplet_id, start, end):
+        """
+        Fetch one of the `METRICS_SERIES` for the droplet
+
+        :param metric: metric name
+        :type metric: str
+        :param droplet_id: droplet ID
+        :type droplet_id: int
+        :param start: series start UNIX timestamp
+        :type start: int
+        :param end: series end UNIX timestamp
+        :type end: int
+        :returns: monitoring API 'matrix' results
+        :rtype: list of dict
+        :raises click.ClickException: when the API request fails
+        """
+        path, params = METRICS_SERIES[metric]
+        params = dict(params, host_id=droplet_id, start=start, end=end)
+
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait()
+            try:
+                response = self.session.get(
+                    urljoin(self.end_point, path), params=params, headers={'Authorization': 'Bearer ' + self.token},
+                    timeout=self.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                raise click.ClickException("We were unable to fetch droplet {} {} metrics: '{}'".format(
+                    droplet_id, metric, e,
+                ))
+
+            # Back off when we're rate limited anyway, e.g. by other clients using the same token
+            if response.status_code == 429 and attempt < self.retries:
+                time.sleep(retry_after(response.headers.get('Retry-After')))
+                continue
+            break
+
+        if not response.ok:
+            raise click.ClickException("We were unable to fetch droplet {} {} metrics: '{} {}'".format(
+                droplet_id, metric, response.status_code, response.reason,
+            ))
+
+        return response.json().get('data', {}).get('result', [])
+
+    def get_summary(self, droplet_id, start, end):
+        """
+        Fetch the droplet metrics and reduce them to their summary
+
+        :param droplet_id: droplet ID
+        :type droplet_id: int
+        :param start: series start UNIX timestamp
+        :type start: int
+        :param end: series end UNIX timestamp
+        :type end: int
+        :returns: summary values keyed by `METRICS_HEADERS`
+        :rtype: dict
+        """
+        results = {metric: self.get_series(metric, droplet_id, start, end) for metric in METRICS_SERIES}
+        return summarize_metrics(results)
+
+    def fetch(self, droplets):
+        """
+        Fetch the metrics summaries of all the droplets concurrently
+
+        Droplets whose metrics can't be fetched are left out with a warning, so the rest of the summaries
+        aren't lost, unless none of them could be fetched.
+
+        :param droplets: DigitalOcean droplets
+        :type droplets: list of digitalocean.Droplet.Droplet
+        :returns: summary values keyed by the droplet ID and `METRICS_HEADERS`
+        :rtype: dict
+        :raises click.ClickException: when the fetch would go over the hourly budget or no metrics were fetched
+        """
+        droplets = list(droplets)
+        needed = len(droplets) * len(METRICS_SERIES)
+        if needed > self.hourly_budget:
+            raise click.ClickException(
+                "Fetching the metrics of {} droplets needs {} API requests, more than the {} the hourly API rate "
+                "limit leaves for them. Use '--tag' or '--region' to pick fewer droplets.".format(
+                    len(droplets), needed, self.hourly_budget,
+                )
+            )
+
+        end = int(time.time())
+        start = end - self.window
+
+        summaries, errors = {}, []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                (droplet.id, executor.submit(self.get_summary, droplet.id, start, end)) for droplet in droplets
+            ]
+            for droplet_id, future in futures:
+                try:
+                    summaries[droplet_id] = future.result()
+                except click.ClickException as e:
+                    errors.append(e)
+
+        if errors and not summaries:
+            raise errors[0]
+        if errors:
+            click.secho("Warning: metrics of {} droplets are missing. {}".format(len(errors), errors[0].message),
+                        fg='yellow', err=True)
+
+        return summaries
+
+
+def summarize_metrics(results):
+    """
+    Reduce the droplet monitoring API results to their summary
+
+    :param results: monitoring API results keyed by the `METRICS_SERIES` name
+    :type results: dict
+    :returns: summary values keyed by `METRICS_HEADERS`
+    :rtype: dict
+    """
+    summary = {}
+
+    series = OrderedDict([
+        ('CPU', cpu_utilization(results['cpu'])),
+        ('Memory', memory_utilization(results['memory_total'], results['memory_available'])),
+        ('Inbound', series_columns(results['inbound'][:1])[1][0] if results['inbound'] else []),
+        ('Outbound', series_columns(results['outbound'][:1])[1][0] if results['outbound'] else []),
+    ])
+    for name, values in series.items():
+        summary['{} avg'.format(name)], summary['{} p95'.format(name)] = summarize(values)
+
+    return summary
@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit domain probing related code
+"""
+from __future__ import unicode_literals
+
+import socket
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.rdatatype
+import dns.zone
+import requests
+import six
+from six.moves.urllib.parse import urlparse
+
+from do_audit.api import normalize_address
+from do_audit.cache import probe_state, resolve_url
+from do_audit.fingerprint import Fingerprinter
+from do_audit.journal import zone_digest
+from do_audit.progress import timer
+
+
+PING_HEADERS = [
+    'Domain', 'URL', 'Probe', 'Status code', 'IP', 'Port', 'Droplet', 'Signatures', 'Cached', 'Error', 'Exception',
+]
+
+# Probe tiers, from the cheapest to the most expensive one
+PROBE_MODES = ('tcp', 'head', 'get')
+
+# Error of the targets that weren't probed, or were cut short, because the run deadline passed
+DEADLINE_ERROR = "Skipped (deadline)"
+
+default_fingerprinter = Fingerprinter()
+
+
+class ProbeResult(namedtuple('ProbeResult', [
+    'domain', 'url', 'probe', 'status_code', 'ip', 'port', 'droplet', 'signatures', 'cached', 'error', 'exception',
+])):
+    """
+    Typed `ping-domains` probe result, the fields follow `PING_HEADERS` and the ones that weren't requested
+    are `None`
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, domain, url, headers, row):
+        """
+        Create probe result from a `ping-domains` dataset row
+
+        :param domain: domain name
+        :type domain: str
+        :param url: probed URL
+        :type url: str
+        :param headers: row headers
+        :type headers: list of str
+        :param row: `ping-domains` dataset row
+        :type row: list
+        :rtype: ProbeResult
+        """
+        values = dict(zip(headers, row), Domain=domain, URL=url)
+        return cls(*[values.get(header) for header in PING_HEADERS])
+
+    def to_row(self, headers):
+        """
+        Get `ping-domains` dataset row
+
+        :param headers: requested `PING_HEADERS`, in order
+        :type headers: list of str
+        :rtype: list
+        """
+        return [self[PING_HEADERS.index(header)] for header in headers]
+
+
+def probe_url(domain, url, timeout, do_droplets, headers=None, fingerprinter=None, session=None, mode='get',
+              escalate=False, deadline=None):
+    """
+    Probe the URL and describe the result
+
+    The 'tcp' mode only connects to the URL port, 'head' sends a HEAD request and 'get' a full GET request. The
+    response body prefix is only read by GET requests, when the 'Signatures' column is requested. With
+    escalation, targets that passed the cheaper probe are probed again with a GET request.
+
+    With the deadline, every request waits for the server at most until the deadline, the body prefix reading
+    stops once it passes and no request is sent when there's no time left. If that's the first one, the row gets
+    the `DEADLINE_ERROR`, if it's the escalation one the cheaper probe result is kept.
+
+    :param domain: domain name
+    :type domain: str
+    :param url: probed URL
+    :type url: str
+    :param timeout: how many seconds to wait for the server before giving up
+    :type timeout: int
+    :param do_droplets: droplet names and URLs keyed by their IP address
+    :type do_droplets: dict
+    :param headers: requested `PING_HEADERS`, in order
+    :type headers: list of str
+    :param fingerprinter: response signatures matcher, the default signatures are used if not passed
+    :type fingerprinter: do_audit.fingerprint.Fingerprinter
+    :param session: session used for sending the request, e.g. with connection pooling or custom headers
+    :type session: requests.Session
+    :param mode: one of `PROBE_MODES`
+    :type mode: str
+    :param escalate: if targets that passed the cheaper probe should be probed with a GET request too
+    :type escalate: bool
+    :param deadline: whole run deadline
+    :type deadline: do_audit.progress.Deadline
+    :returns: `ping-domains` dataset row
+    :rtype: list
+    """
+    headers = headers or PING_HEADERS
+
+    def capped_timeout():
+        return timeout if deadline is None else min(timeout, deadline.remaining())
+
+    # The time left is only checked once per request, zero timeouts aren't accepted by urllib3 and make the
+    # sockets non-blocking
+    request_timeout = capped_timeout()
+    if request_timeout <= 0:
+        result = {'Error': DEADLINE_ERROR}
+    elif mode == 'tcp':
+        result = connect_url(url, request_timeout)
+    else:
+        result = request_url(url, request_timeout, mode, headers, fingerprinter=fingerprinter, session=session,
+                             deadline=deadline)
+
+    if escalate and mode != 'get' and not result.get('Error'):
+        request_timeout = capped_timeout()
+        if request_timeout > 0:
+            result = request_url(url, request_timeout, 'get', headers, fingerprinter=fingerprinter,
+                                 session=session, deadline=deadline)
+
+    result['Domain'] = domain
+    result['URL'] = url
+
+    if 'Droplet' in headers and not result.get('Error'):
+        ip = result['IP']
+        result['Droplet'] = '{} ({})'.format(do_droplets[ip][0], do_droplets[ip][1]) if ip in do_droplets else '-'
+
+    return [result.get(header) for header in headers]
+
+
+def connect_url(url, timeout):
+    """
+    Open a TCP connection to the URL host and port
+
+    :param url: probed URL
+    :type url: str
+    :param timeout: how many seconds to wait for the server before giving up
+    :type timeout: int
+    :returns: probe result keyed by `PING_HEADERS`
+    :rtype: dict
+    """
+    parsed_url = urlparse(url)
+    address = (parsed_url.hostname, parsed_url.port or (443 if parsed_url.scheme == 'https' else 80))
+
+    try:
+        connection = socket.create_connection(address, timeout=timeout)
+    except socket.timeout as e:
+        return {'Probe': 'tcp', 'Error': "Request timed out", 'Exception': e}
+    except socket.error as e:
+        return {'Probe': 'tcp', 'Error': "Connection error", 'Exception': e}
+
+    try:
+        ip, port = connection.getpeername()[:2]
+    finally:
+        connection.close()
+
+    return {'Probe': 'tcp', 'Status code': 'Connected', 'IP': ip, 'Port': port}
+
+
+def request_url(url, timeout, mode, headers, fingerprinter=None, session=None, deadline=None):
+    """
+    Send a HEAD or GET request to the URL
+
+    :param url: probed URL
+    :type url: str
+    :param timeout: how many seconds to wait for the server before giving up
+    :type timeout: int
+    :param mode: 'head' or 'get'
+    :type mode: str
+    :param headers: requested `PING_HEADERS`
+    :type headers: list of str
+    :param fingerprinter: response signatures matcher, the default signatures are used if not passed
+    :type fingerprinter: do_audit.fingerprint.Fingerprinter
+    :param session: session used for sending the request
+    :type session: requests.Session
+    :param deadline: whole run deadline the body prefix reading stops at
+    :type deadline: do_audit.progress.Deadline
+    :returns: probe result keyed by `PING_HEADERS`
+    :rtype: dict
+    """
+    result = {'Probe': mode}
+
+    # Do our best to specify why the request crashes, if it does
+    try:
+        error = None
+        if mode == 'head':
+            # Unlike the rest of the methods, HEAD requests don't follow redirects by default
+            response = (session or requests).head(url, timeout=timeout, stream=True, allow_redirects=True)
+        else:
+            response = (session or requests).get(url, timeout=timeout, stream=True)
+    except requests.exceptions.Timeout as e:
+        error = ("Request timed out", e)
+    except requests.exceptions.SSLError as e:
+        error = ("SSL error", e)
+    except requests.exceptions.ConnectionError as e:
+        error = ("Connection error", e)
+    except requests.exceptions.TooManyRedirects as e:
+        error = ("Too many redirects", e)
+
+    if error:
+        result['Error'], result['Exception'] = error
+        return result
+
+    # Get the IP address from the underlying request socket
+    # Source: https://stackoverflow.com/a/36357465
+    if six.PY2:
+        ip, port = response.raw._fp.fp._sock.getpeername()[:2]
+    else:
+        ip, port = response.raw._fp.fp.raw._sock.getpeername()[:2]
+
+    result['Status code'] = '{} ({})'.format(response.status_code, response.reason)
+    result['IP'] = ip
+    result['Port'] = port
+
+    # HEAD responses don't have a body but the headers signatures can still match
+    if 'Signatures' in headers:
+        result['Signatures'] = ', '.join((fingerprinter or default_fingerprinter).match_response(
+            response, deadline=deadline,
+        )) or '-'
+    else:
+        response.close()
+
+    return result
+
+
+def iter_zone_urls(zone, addresses=None):
+    """
+    Get URLs of all the zone records
+
+    :param zone: parsed domain zone
+    :type zone: dns.zone.Zone
+    :param addresses: only include records with A and AAAA records pointing at these IP addresses
+    :type addresses: set of str
+    :returns: HTTP and HTTPS URLs
+    :rtype: generator of str
+    """
+    for record, node in zone.nodes.items():
+        # Only probe the records pointing at the matching droplets
+        if addresses is not None and not addresses.intersection(
+            normalize_address(str(address))
+            for rd in node.rdatasets if rd.rdtype in [dns.rdatatype.A, dns.rdatatype.AAAA]
+            for address in rd
+        ):
+            continue
+
+        absolute_url = record.derelativize(zone.origin).to_text(omit_final_dot=True)
+
+        yield 'http://' + absolute_url
+        yield 'https://' + absolute_url
+
+
+def iter_ping_targets(domains, addresses=None):
+    """
+    Lazily get all the URLs to probe
+
+    Each zone is only parsed when all the previous zone URLs were consumed.
+
+    :param domains: iterable of DigitalOcean domains
+    :type domains: iterable of digitalocean.Domain.Domain
+    :param addresses: only include records with A and AAAA records pointing at these IP addresses
+    :type addresses: set of str
+    :returns: zone file digest, domain name and URL
+    :rtype: generator of tuple
+    """
+    for domain in domains:
+        digest = zone_digest(domain.zone_file)
+
+        # We could use Digital Ocean domain records API endpoint but parsing the zone file is *much* quicker
+        zone = dns.zone.from_text(domain.zone_file)
+        domain = zone.origin.to_text(omit_final_dot=True)
+
+        for url in iter_zone_urls(zone, addresses=addresses):
+            yield digest, domain, url
+
+
+def iter_ping_rows(domains, headers, timeout, do_droplets, addresses=None, journal=None, fingerprinter=None,
+                   session=None, max_workers=1, mode='get', escalate=False, stats=None, deadline=None, cache=None):
+    """
+    Lazily probe the domains records
+
+    Zones are parsed as the probes are sent, so the first results are available straight away, unless the
+    statistics are collected (all the targets need to be known for the ETA) or the targets are prioritized. With
+    more than one worker, up to `max_workers` probes are in flight at the same time and at most twice as many
+    results are kept ahead of the consumer, the results are still yielded in the order the targets are probed.
+
+    With the deadline and the journal, the targets that were never probed or failed last time are probed
+    first. They're sent through the same bounded window, so the results are yielded in that priority order
+    rather than in the zone records order, which keeps the memory bounded (only the targets themselves need
+    to be listed up front to be sorted). Every request timeout, including the escalation one, is capped to the
+    time left, the body prefix reading stops at the deadline and the targets that weren't probed in time get the
+    `DEADLINE_ERROR`, so the partial results can still be exported. The timeouts apply to every socket
+    operation, so a probe in flight can still overrun the deadline by a fraction of the time that was left when
+    it started.
+
+    With the cache, fresh results of the targets that still resolve to the same IP address are served from it
+    (marked in the 'Cached' column) and only the rest is probed. The host lookups are capped to the time left as
+    well, past the deadline the hosts aren't resolved and the fresh results cached at the last IP address of
+    the URL are served instead.
+
+    :param domains: iterable of DigitalOcean domains
+    :type domains: iterable of digitalocean.Domain.Domain
+    :param headers: requested `PING_HEADERS`, in order
+    :type headers: list of str
+    :param timeout: how many seconds to wait for the server before giving up
+    :type timeout: int
+    :param do_droplets: droplet names and URLs keyed by their IP address
+    :type do_droplets: dict
+    :param addresses: only probe records with A and AAAA records pointing at these IP addresses
+    :type addresses: set of str
+    :param journal: checkpoint journal the completed probes are read from and written to
+    :type journal: do_audit.journal.ProbeJournal
+    :param fingerprinter: response signatures matcher
+    :type fingerprinter: do_audit.fingerprint.Fingerprinter
+    :param session: session used for sending the requests
+    :type session: requests.Session
+    :param max_workers: how many probes can be in flight at the same time
+    :type max_workers: int
+    :param mode: one of `PROBE_MODES`
+    :type mode: str
+    :param escalate: if targets that passed the cheaper probe should be probed with a GET request too
+    :type escalate: bool
+    :param stats: progress and statistics the probes are counted in
+    :type stats: do_audit.progress.ProbeStats
+    :param deadline: whole run deadline
+    :type deadline: do_audit.progress.Deadline
+    :param cache: probe results cache the fresh results are read from and the new ones written to
+    :type cache: do_audit.cache.ProbeCache
+    :returns: domain name, probed URL and `ping-domains` dataset row
+    :rtype: generator of tuple
+    """
+    # Errors are always needed for the statistics, the deadline and the journal history, even if they
+    # aren't requested
+    probe_headers = headers if 'Error' in headers else headers + ['Error']
+    error_index = probe_headers.index('Error')
+
+    # Both the journaled and the cached probes are only reused for the same probe mode
+    probe_mode = mode + ('+get' if escalate else '')
+
+    def skipped(domain, url):
+        return [{'Domain': domain, 'URL': url, 'Error': DEADLINE_ERROR}.get(header) for header in probe_headers]
+
+    def probe(digest, domain, url):
+        ip = None
+        if cache:
+            lookup_timeout = timeout if deadline is None else min(timeout, deadline.remaining())
+            if lookup_timeout > 0:
+                ip = resolve_url(url, lookup_timeout)
+            else:
+                # There's no time left to resolve the host, fresh cached results are still served for the IP
+                # address the URL was last cached at
+                ip = cache.last_ip(url)
+        if ip:
+            state = probe_state(digest, do_droplets.get(ip), probe_mode)
+            row = cache.get(url, ip, state, probe_headers)
+            if row is not None:
+                if stats:
+                    stats.cache_probe()
+                return row
+
+        if deadline and deadline.expired:
+            if stats:
+                stats.skip_probe()
+            return skipped(domain, url)
+
+        if stats:
+            stats.start_probe()
+            started_at = timer()
+
+        row = probe_url(domain, url, timeout, do_droplets, headers=probe_headers, fingerprinter=fingerprinter,
+                        session=session, mode=mode, escalate=escalate, deadline=deadline)
+
+        # The probe wasn't sent in time or was cut short by the deadline rather than by the server
+        if deadline and (row[error_index] == DEADLINE_ERROR or
+                         row[error_index] == "Request timed out" and deadline.expired):
+            if stats:
+                stats.skip_probe(started=True)
+            return skipped(domain, url)
+
+        if stats:
+            stats.finish_probe(timer() - started_at, error=row[error_index])
+        if ip:
+            cache.store(url, ip, state, probe_headers, row)
+        return row
+
+    def reuse(digest, url):
+        if not journal or not journal.is_done(digest, url, headers, probe_mode):
+            return None
+
+        if stats:
+            stats.resume_probe()
+        return journal.get_row(digest, url, headers)
+
+    def record(digest, domain, url, row):
+        # New probes are only recorded from the consuming thread, the skipped ones are probed again on resume
+        if journal and row[error_index] != DEADLINE_ERROR:
+            journal.record(digest, url, probe_headers, row, probe_mode)
+        return domain, url, row[:len(headers)]
+
+    targets = iter_ping_targets(domains, addresses=addresses)
+
+    if deadline and journal:
+        # Targets that are known to be healthy can wait, `sorted` keeps the zone records order otherwise
+        targets = sorted(targets, key=lambda target: journal.is_healthy(target[2]))
+
+    if stats is None:
+        for result in _iter_probes(targets, probe, reuse, record, max_workers):
+            yield result
+        return
+
+    with stats.phase('zone_parse'):
+        targets = list(targets)
+    stats.plan(len(targets))
+
+    with stats.phase('probe'):
+        for result in _iter_probes(targets, probe, reuse, record, max_workers):
+            yield result
+
+
+def _iter_probes(targets, probe, reuse, record, max_workers):
+    def complete(digest, domain, url, future, row):
+        return (domain, url, row) if future is None else record(digest, domain, url, future.result())
+
+    if max_workers <= 1:
+        for digest, domain, url in targets:
+            row = reuse(digest, url)
+            if row is not None:
+                yield domain, url, row
+            else:
+                yield record(digest, domain, url, probe(digest, domain, url))
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        for digest, domain, url in targets:
+            row = reuse(digest, url)
+            if row is not None:
+                pending.append((digest, domain, url, None, row))
+            else:
+                pending.append((digest, domain, url, executor.submit(probe, digest, domain, url), None))
+
+            # Keep the workers busy but don't run too far ahead of the consumer
+            while len(pending) > max_workers * 2:
+                yield complete(*pending.popleft())
+
+        while pending:
+            yield complete(*pending.popleft())
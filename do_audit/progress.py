@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit long running probes progress and statistics
+"""
+from __future__ import unicode_literals
+
+import abc
+import io
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+
+import click
+import six
+
+from do_audit.utils import write_json_atomic
+
+
+# Monotonic timer, where available
+timer = getattr(time, 'perf_counter', time.time)
+
+PHASES = ('api_fetch', 'zone_parse', 'probe')
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, percent):
+    """
+    Helper function for getting the nearest-rank percentile
+
+    :param values: sorted values
+    :type values: list of float
+    :param percent: percentile, between 0 and 100
+    :type percent: int
+    :returns: percentile value or `None` if there are no values
+    :rtype: float
+    """
+    if not values:
+        return None
+
+    rank = int(math.ceil(percent / 100.0 * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class Deadline(object):
+    """
+    Whole run deadline, counted from its creation
+    """
+    def __init__(self, seconds):
+        """
+        :param seconds: how many seconds the run can take
+        :type seconds: float
+        """
+        self.seconds = seconds
+        self.expires_at = timer() + seconds
+
+    def remaining(self):
+        """
+        Get how many seconds are left
+
+        :rtype: float
+        """
+        return max(self.expires_at - timer(), 0.0)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+@contextmanager
+def measure(stats, name):
+    """
+    Helper function for measuring time spent in one of the `PHASES`, if the statistics are collected
+
+    :param stats: progress and statistics
+    :type stats: ProbeStats or None
+    :param name: phase name
+    :type name: str
+    """
+    if stats is None:
+        yield
+    else:
+        with stats.phase(name):
+            yield
+
+
+class ProbeStats(object):
+    """
+    Thread safe probes progress and statistics
+
+    Probes are counted as they start and finish (from the workers threads) and the reporters are notified
+    about every change, it's up to them how often they show it. The rate and the ETA are counted from the first
+    planned targets, so the API requests and the zones parsing don't skew them.
+    """
+    def __init__(self, reporters=()):
+        """
+        :param reporters: progress reporters, e.g. `StderrProgress` or `StatusFileProgress`
+        :type reporters: list
+        """
+        self.reporters = list(reporters)
+
+        self.started_at = timer()
+        self.probing_since = None
+        self.planned = 0
+        self.done = 0
+        self.resumed = 0
+        self.cached = 0
+        self.skipped = 0
+        self.in_flight = 0
+        self.errors = Counter()
+        self.latencies = []
+        self.phases = OrderedDict((phase, 0.0) for phase in PHASES)
+
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measure time spent in one of the `PHASES`
+
+        :param name: phase name
+        :type name: str
+        """
+        started_at = timer()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] += timer() - started_at
+
+    def plan(self, count):
+        """Add targets to probe"""
+        with self._lock:
+            if self.probing_since is None:
+                self.probing_since = timer()
+            self.planned += count
+        self.report()
+
+    def start_probe(self):
+        """Count probe that was just sent"""
+        with self._lock:
+            self.in_flight += 1
+
+    def finish_probe(self, latency, error=None):
+        """
+        Count completed probe
+
+        :param latency: how many seconds the probe took
+        :type latency: float
+        :param error: probe error class, if it failed
+        :type error: str
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.done += 1
+            self.latencies.append(latency)
+            if error:
+                self.errors[error] += 1
+        self.report()
+
+    def skip_probe(self, started=False):
+        """
+        Count probe skipped because the run deadline passed
+
+        :param started: if the probe was already in flight when it was cut short
+        :type started: bool
+        """
+        with self._lock:
+            if started:
+                self.in_flight -= 1
+            self.done += 1
+            self.skipped += 1
+        self.report()
+
+    def cache_probe(self):
+        """Count probe served from the probe results cache"""
+        with self._lock:
+            self.done += 1
+            self.cached += 1
+        self.report()
+
+    def resume_probe(self):
+        """Count probe reused from the checkpoint journal"""
+        with self._lock:
+            self.done += 1
+            self.resumed += 1
+        self.report()
+
+    def snapshot(self):
+        """
+        Get the current progress
+
+        :rtype: collections.OrderedDict
+        """
+        with self._lock:
+            elapsed = timer() - (self.probing_since if self.probing_since is not None else self.started_at)
+            probed = self.done - self.resumed - self.cached - self.skipped
+            rate = probed / elapsed if elapsed > 0 else 0.0
+            remaining = max(self.planned - self.done, 0)
+
+            return OrderedDict([
+                ('planned', self.planned),
+                ('done', self.done),
+                ('in_flight', self.in_flight),
+                ('probes_per_second', round(rate, 2)),
+                ('eta', round(remaining / rate, 1) if rate else None),
+                ('errors', OrderedDict(self.errors.most_common())),
+            ])
+
+    def summary(self):
+        """
+        Get the whole run statistics
+
+        :rtype: collections.OrderedDict
+        """
+        summary = self.snapshot()
+        del summary['in_flight'], summary['eta']
+
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary['resumed'] = self.resumed
+            summary['cached'] = self.cached
+            summary['skipped'] = self.skipped
+            summary['elapsed'] = round(timer() - self.started_at, 3)
+            summary['latency'] = OrderedDict(
+                [('min', latencies[0] if latencies else None)] +
+                [('p{}'.format(percent), percentile(latencies, percent)) for percent in LATENCY_PERCENTILES] +
+                [('max', latencies[-1] if latencies else None)]
+            )
+            summary['phases'] = OrderedDict((phase, round(seconds, 3)) for phase, seconds in self.phases.items())
+
+        for key, value in summary['latency'].items():
+            summary['latency'][key] = round(value, 3) if value is not None else None
+
+        return summary
+
+    def report(self, final=False):
+        """Let the reporters know about the progress"""
+        if not self.reporters:
+            return
+
+        snapshot = self.snapshot()
+        for reporter in self.reporters:
+            reporter.report(snapshot, final=final)
+
+    def close(self):
+        """Send the final progress to the reporters"""
+        self.report(final=True)
+
+    def write_summary(self, path):
+        """
+        Write the whole run statistics to a JSON file
+
+        :param path: JSON file path
+        :type path: str
+        """
+        with io.open(path, 'w', encoding='utf-8') as fp:
+            fp.write(six.text_type(json.dumps(self.summary(), indent=2)))
+
+
+@six.add_metaclass(abc.ABCMeta)
+class ProgressReporter(object):
+    """
+    Base progress reporter, only shows the progress once every `interval` seconds
+
+    Subclasses need to implement `write`.
+    """
+    def __init__(self, interval=0.5):
+        """
+        :param interval: minimum number of seconds between the updates
+        :type interval: float
+        """
+        self.interval = interval
+        self._reported_at = None
+        self._lock = threading.Lock()
+
+    def report(self, snapshot, final=False):
+        """
+        Show the progress, if enough time has passed since the last update
+
+        :param snapshot: progress, see `ProbeStats.snapshot`
+        :type snapshot: collections.OrderedDict
+        :param final: if it's the last update
+        :type final: bool
+        """
+        with self._lock:
+            now = timer()
+            if not final and self._reported_at is not None and now - self._reported_at < self.interval:
+                return
+            self._reported_at = now
+
+            self.write(snapshot, final)
+
+    @abc.abstractmethod
+    def write(self, snapshot, final):
+        """
+        Show the progress
+
+        :param snapshot: progress, see `ProbeStats.snapshot`
+        :type snapshot: collections.OrderedDict
+        :param final: if it's the last update
+        :type final: bool
+        """
+
+
+def format_progress(snapshot):
+    """
+    Helper function for formatting the progress as a single line
+
+    :param snapshot: progress, see `ProbeStats.snapshot`
+    :type snapshot: collections.OrderedDict
+    :rtype: str
+    """
+    line = 'Probed {done}/{planned} ({in_flight} in flight), {probes_per_second:.1f}/s, ETA {eta}'.format(**dict(
+        snapshot, eta=timedelta(seconds=int(snapshot['eta'])) if snapshot['eta'] is not None else '-',
+    ))
+
+    if snapshot['errors']:
+        line += ', errors: ' + ', '.join('{} {}'.format(error, count) for error, count in snapshot['errors'].items())
+
+    return line
+
+
+class StderrProgress(ProgressReporter):
+    """
+    Show the progress on stderr, redrawing a single line on a terminal and adding a new line otherwise
+    """
+    def __init__(self, interval=None):
+        """
+        :param interval: minimum number of seconds between the updates, less often when not on a terminal
+        :type interval: float
+        """
+        self.isatty = sys.stderr.isatty()
+        super(StderrProgress, self).__init__(interval or (0.5 if self.isatty else 10))
+
+    def write(self, snapshot, final):
+        line = format_progress(snapshot)
+
+        if self.isatty:
+            click.echo('\r\033[K' + line, nl=final, err=True)
+        else:
+            click.echo(line, err=True)
+
+
+class StatusFileProgress(ProgressReporter):
+    """
+    Write the progress to a JSON status file, replacing it atomically so readers never see a partial file
+    """
+    def __init__(self, path, interval=1.0):
+        """
+        :param path: status file path
+        :type path: str
+        :param interval: minimum number of seconds between the updates
+        :type interval: float
+        """
+        super(StatusFileProgress, self).__init__(interval)
+        self.path = path
+
+    def write(self, snapshot, final):
+        write_json_atomic(self.path, OrderedDict(snapshot, finished=final))
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit buffered terminal output
+"""
+from __future__ import unicode_literals
+
+import itertools
+import shutil
+import sys
+import threading
+
+import click
+import six
+from six.moves import queue
+
+
+def terminal_height():
+    """
+    Helper function for getting the terminal height
+
+    :returns: number of lines
+    :rtype: int
+    """
+    # `shutil.get_terminal_size` is Python 3 only and `click.get_terminal_size` was removed in click 8.1
+    get_terminal_size = getattr(shutil, 'get_terminal_size', None) or click.get_terminal_size
+    return get_terminal_size()[1]
+
+
+class Renderer(object):
+    """
+    Buffered terminal renderer
+
+    Output is collected and written in large chunks instead of one `click.echo` call per line. Styling is
+    skipped altogether when the output isn't a terminal and long output is shown through a pager when it is.
+
+    The pager is only started once the output is taller than the terminal, and the output is streamed to it
+    from a background thread through a bounded queue, so it's never held in memory as a whole.
+    """
+    def __init__(self, color=None, pager=None, buffer_size=64 * 1024, autoflush=False, pager_queue_size=16):
+        """
+        :param color: if the output should be styled, only when writing to a terminal by default
+        :type color: bool
+        :param pager: if the output should be shown through a pager, only when writing to a terminal by default
+        :type pager: bool
+        :param buffer_size: how many characters to collect before writing them out
+        :type buffer_size: int
+        :param autoflush: if every line should be written out right away, for output produced as slow as probes
+        :type autoflush: bool
+        :param pager_queue_size: how many flushed chunks can wait for the pager
+        :type pager_queue_size: int
+        """
+        isatty = sys.stdout.isatty()
+
+        self.color = isatty if color is None else color
+        self.pager = isatty if pager is None else pager
+        self.buffer_size = buffer_size
+        self.autoflush = autoflush
+
+        self._buffer = []
+        self._buffer_length = 0
+
+        # Output held until it's clear if it fits the terminal
+        self._held = []
+        self._held_lines = 0
+
+        self._pager_queue = queue.Queue(maxsize=pager_queue_size)
+        self._pager_thread = None
+        self._pager_done = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def style(self, text, **styles):
+        """
+        Style the text, if styling is enabled
+
+        :param text: text to style
+        :type text: str
+        :param styles: `click.style` keyword arguments
+        :returns: styled text
+        :rtype: str
+        """
+        return click.style(text, **styles) if self.color else text
+
+    def write(self, text=''):
+        """
+        Add a line to the output buffer
+
+        :param text: line of text, without the new line character
+        :type text: str
+        """
+        self._buffer.append(text)
+        self._buffer.append('\n')
+        self._buffer_length += len(text) + 1
+
+        if self.autoflush or self._buffer_length >= self.buffer_size:
+            self.flush()
+
+    def heading(self, text):
+        """Add a heading line to the output buffer"""
+        self.write(self.style(text, fg='yellow', bold=True))
+
+    def title(self, text):
+        """Add a bold line to the output buffer"""
+        self.write(self.style(text, bold=True))
+
+    def error(self, text):
+        """Add an error line to the output buffer"""
+        self.write(self.style(text, fg='red'))
+
+    def kvp(self, key, value, padding=20, color='green'):
+        """
+        Add a key value pair line to the output buffer, same as `do_audit.utils.click_echo_kvp`
+
+        :param key: item key
+        :type key: str
+        :param value: item value
+        :type value: any
+        :param padding: key padding
+        :type padding: int
+        :param color: key color (ANSI compliant)
+        :type color: str
+        """
+        self.write(self.style('{key:<{padding}}'.format(key=key + ':', padding=padding), fg=color) + str(value))
+
+    def table(self, headers, rows, widths=None, sample_size=1000):
+        """
+        Add a compact table to the output buffer
+
+        Column widths are computed once, up front, from the headers and the first `sample_size` rows. Longer
+        values in the rest of the rows aren't truncated, they only push the following columns to the right.
+
+        :param headers: table headers
+        :type headers: list of str
+        :param rows: table rows
+        :type rows: iterable of list
+        :param widths: precomputed minimum column widths keyed by their header
+        :type widths: dict
+        :param sample_size: how many rows to use for computing the column widths
+        :type sample_size: int
+        """
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, sample_size))
+
+        column_widths = [max(len(header), (widths or {}).get(header, 0)) for header in headers]
+        for row in sample:
+            column_widths = [
+                max(width, len(self._cell(value))) for width, value in zip(column_widths, row)
+            ]
+
+        self.title('  '.join(header.ljust(width) for header, width in zip(headers, column_widths)).rstrip())
+        self.write('  '.join('-' * width for width in column_widths))
+
+        for row in itertools.chain(sample, rows):
+            self.write('  '.join(
+                self._cell(value).ljust(width) for value, width in zip(row, column_widths)
+            ).rstrip())
+
+    @staticmethod
+    def _cell(value):
+        return '' if value is None else six.text_type(value)
+
+    def flush(self):
+        """Write the buffered output out, or send it to the pager"""
+        if not self._buffer:
+            return
+
+        text = ''.join(self._buffer)
+        self._buffer = []
+        self._buffer_length = 0
+
+        if not self.pager:
+            click.echo(text, nl=False, color=self.color)
+        elif self._pager_thread:
+            self._page(text)
+        else:
+            self._held.append(text)
+            self._held_lines += text.count('\n')
+
+            if self._held_lines > terminal_height():
+                self._start_pager()
+
+    def _start_pager(self):
+        self._pager_thread = threading.Thread(target=self._run_pager)
+        self._pager_thread.daemon = True
+        self._pager_thread.start()
+
+        held, self._held = self._held, []
+        for text in held:
+            self._page(text)
+
+    def _run_pager(self):
+        def chunks():
+            while True:
+                text = self._pager_queue.get()
+                if text is None:
+                    return
+                yield text
+
+        try:
+            click.echo_via_pager(chunks(), color=self.color)
+        finally:
+            self._pager_done.set()
+
+    def _page(self, text):
+        # Output is dropped once the pager is closed, e.g. when the user quits it early
+        while not self._pager_done.is_set():
+            try:
+                self._pager_queue.put(text, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        """Write all the remaining output out, waiting for the pager if it was started"""
+        self.flush()
+
+        if self._pager_thread:
+            self._page(None)
+            self._pager_thread.join()
+            self._pager_thread = None
+        elif self._held:
+            # Output that fits the terminal doesn't need the pager
+            click.echo(''.join(self._held), nl=False, color=self.color)
+            self._held = []
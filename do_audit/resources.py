@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+do-audit concurrent DigitalOcean resources fetching
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import digitalocean
+
+
+# Manager methods used for fetching each of the resource types
+RESOURCE_FETCHERS = OrderedDict([
+    ('droplets', lambda manager: manager.get_all_droplets()),
+    ('domains', lambda manager: manager.get_all_domains()),
+    ('volumes', lambda manager: manager.get_all_volumes()),
+    ('snapshots', lambda manager: manager.get_all_snapshots()),
+    ('floating_ips', lambda manager: manager.get_all_floating_ips()),
+    ('load_balancers', lambda manager: manager.get_all_load_balancers()),
+    ('firewalls', lambda manager: manager.get_all_firewalls()),
+    ('tags', lambda manager: manager.get_all_tags()),
+])
+RESOURCE_TYPES = tuple(RESOURCE_FETCHERS)
+
+
+def fetch_resources(manager, resource_types=None, max_workers=8):
+    """
+    Fetch all the resource types concurrently into a single snapshot
+
+    Each resource type is a separate (paginated) API listing so fetching them at the same time makes
+    the total run time as long as the slowest listing instead of the sum of all of them.
+
+    :param manager: Digital Ocean manager instance
+    :type manager: digitalocean.Manager
+    :param resource_types: resource types to fetch, all of them by default
+    :type resource_types: list of str
+    :param max_workers: how many listings to fetch at the same time
+    :type max_workers: int
+    :returns: resources snapshot
+    :rtype: ResourceSnapshot
+    :raises click.ClickException: when one of the listings fails
+    """
+    resource_types = resource_types or RESOURCE_TYPES
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(resource_types)))) as executor:
+        futures = OrderedDict(
+            (resource_type, executor.submit(RESOURCE_FETCHERS[resource_type], manager))
+            for resource_type in resource_types
+        )
+
+        try:
+            resources = {resource_type: future.result() for resource_type, future in futures.items()}
+        except digitalocean.Error as e:
+            raise click.ClickException("We were unable to fetch your resources: '{}'".format(e))
+
+    return ResourceSnapshot(**resources)
+
+
+class ResourceSnapshot(object):
+    """
+    All the fetched DigitalOcean resources with cross reference indexes
+
+    Resource types that weren't fetched are empty lists.
+    """
+    def __init__(self, **resources):
+        for resource_type in RESOURCE_TYPES:
+            setattr(self, resource_type, list(resources.get(resource_type) or []))
+
+        self.droplets_by_id = {droplet.id: droplet for droplet in self.droplets}
+        self.droplets_by_tag = defaultdict(list)
+        for droplet in self.droplets:
+            for tag in droplet.tags:
+                self.droplets_by_tag[tag].append(droplet.id)
+
+        self.volumes_by_droplet = self._index(self.volumes, lambda volume: volume.droplet_ids)
+        self.snapshots_by_droplet = self._index(self.snapshots, lambda snapshot: (
+            [int(snapshot.resource_id)] if snapshot.resource_type == 'droplet' and snapshot.resource_id else []
+        ))
+        self.floating_ips_by_droplet = self._index(self.floating_ips, lambda floating_ip: (
+            [floating_ip.droplet['id']] if floating_ip.droplet else []
+        ))
+        self.load_balancers_by_droplet = self._index(self.load_balancers, lambda load_balancer: (
+            self.tagged_droplet_ids(load_balancer.droplet_ids, [load_balancer.tag] if load_balancer.tag else [])
+        ))
+        self.firewalls_by_droplet = self._index(self.firewalls, lambda firewall: (
+            self.tagged_droplet_ids(firewall.droplet_ids, firewall.tags)
+        ))
+
+    def tagged_droplet_ids(self, droplet_ids, tags):
+        """
+        Get IDs of the droplets directly referenced or tagged with one of the tags
+
+        :param droplet_ids: directly referenced droplet IDs
+        :type droplet_ids: list of int
+        :param tags: tag names
+        :type tags: list of str
+        :returns: droplet IDs
+        :rtype: list of int
+        """
+        droplet_ids = list(droplet_ids or [])
+        for tag in tags or []:
+            droplet_ids += [
+                droplet_id for droplet_id in self.droplets_by_tag.get(tag, []) if droplet_id not in droplet_ids
+            ]
+        return droplet_ids
+
+    @staticmethod
+    def _index(resources, get_droplet_ids):
+        index = defaultdict(list)
+        for resource in resources:
+            for droplet_id in get_droplet_ids(resource):
+                index[droplet_id].append(resource)
+        return index
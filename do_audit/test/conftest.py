@@ -4,8 +4,11 @@ do-audit py.test config
 """
 from __future__ import unicode_literals
 
+import digitalocean
 import pytest
 
+from do_audit.resources import RESOURCE_TYPES
+
 
 @pytest.fixture
 def vcr_config():
@@ -29,3 +32,37 @@ def vcr_cassette_name(request):
         return f.__self__.__class__.__name__
 
     return request.node.name
+
+
+@pytest.fixture
+def make_droplet():
+    """
+    Get fake DigitalOcean droplets factory, the keyword arguments override the default attributes
+    """
+    def factory(**kwargs):
+        attrs = {
+            'id': 1, 'name': 'droplet', 'status': 'active', 'ip_address': '192.168.0.1', 'ip_v6_address': None,
+            'private_ip_address': None, 'vcpus': 1, 'memory': 512, 'disk': 20, 'tags': [], 'backups': False,
+            'locked': False, 'monitoring': False, 'features': [], 'region': {'slug': 'lon1', 'name': 'London 1'},
+            'kernel': None, 'created_at': '2017-05-08T12:52:22Z',
+            'image': {'distribution': 'Ubuntu', 'name': '16.04.2x 64'},
+        }
+        attrs.update(kwargs)
+        return digitalocean.Droplet(**attrs)
+
+    return factory
+
+
+@pytest.fixture
+def manager(mocker):
+    """
+    Mock Digital Ocean manager without any resources, also used by the command line interface
+
+    Tests override it to add their resources, e.g. `manager.get_all_droplets.return_value = [...]`.
+    """
+    manager = mocker.Mock(token='token', end_point='https://api.digitalocean.com/v2/')
+    for resource_type in RESOURCE_TYPES:
+        getattr(manager, 'get_all_' + resource_type).return_value = []
+
+    mocker.patch('do_audit.command_line.get_do_manager', return_value=manager)
+    return manager
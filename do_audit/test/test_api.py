@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.api' file
+"""
+from __future__ import unicode_literals
+
+import datetime
+import io
+import os
+
+import dateutil.tz
+import digitalocean
+import pytest
+import tablib
+
+from do_audit import api
+from do_audit.resources import ResourceSnapshot
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('2017-05-08T12:52:22Z', datetime.datetime(2017, 5, 8, 12, 52, 22, tzinfo=dateutil.tz.tzutc())),
+    ('2017-05-08T12:52:22.123Z', datetime.datetime(2017, 5, 8, 12, 52, 22, 123000, tzinfo=dateutil.tz.tzutc())),
+    ('2017-05-08 12:52:22+01:00', datetime.datetime(2017, 5, 8, 11, 52, 22, tzinfo=dateutil.tz.tzutc())),
+])
+def test_parse_created_at(value, expected):
+    """
+    Test 'do_audit.api.parse_created_at'
+    """
+    assert api.parse_created_at(value) == expected
+
+
+def test_guess_droplet_os(make_droplet):
+    """
+    Test 'do_audit.api.guess_droplet_os'
+    """
+    assert api.guess_droplet_os(make_droplet(kernel={'name': 'kernel'})) == 'kernel'
+    assert api.guess_droplet_os(make_droplet()) == 'Ubuntu 16.04.2x 64'
+    assert api.guess_droplet_os(make_droplet(image=None)) == 'unknown'
+
+
+def test_create_droplets_columns(mocker, make_droplet):
+    """
+    Test 'do_audit.api.create_droplets_columns'
+    """
+    droplets = [make_droplet(), make_droplet(id=2, name='other', tags=['a', 'b'])]
+
+    columns = api.create_droplets_columns(droplets)
+
+    assert list(columns) == ['Name', 'Status', 'OS', 'IP', 'CPU', 'Memory', 'Disk', 'URL', 'Created at']
+    assert columns['Name'] == ['droplet', 'other']
+    assert columns['Memory'] == ['512 MB', '512 MB']
+
+    columns = api.create_droplets_columns(droplets, verbose=True)
+
+    assert columns['Tags'] == ['', 'a, b']
+    assert columns['Region'] == ['London 1', 'London 1']
+
+    dataset = api.columns_to_dataset(columns)
+
+    assert dataset.headers == list(columns)
+    assert api.dataset_to_columns(dataset) == columns
+
+    # Only the requested columns are computed
+    parse_created_at = mocker.patch.object(api, 'parse_created_at')
+    columns = api.create_droplets_columns(droplets, columns=['IP', 'Name'])
+
+    assert columns == {'IP': ['192.168.0.1', '192.168.0.1'], 'Name': ['droplet', 'other']}
+    assert list(columns) == ['IP', 'Name']
+    assert not parse_created_at.called
+
+    with pytest.raises(ValueError):
+        api.create_droplets_columns(droplets, columns=['Name', 'Unknown'])
+
+    # Empty account
+    assert api.create_droplets_dataset([]).headers == list(api.create_droplets_columns([]))
+
+
+@pytest.mark.parametrize('data_format', api.COLUMNAR_FORMATS)
+def test_export_columns(data_format, make_droplet):
+    """
+    Test 'do_audit.api.export_columns'
+    """
+    pyarrow = pytest.importorskip('pyarrow')
+
+    columns = api.create_droplets_columns([make_droplet()])
+    output_file = io.BytesIO()
+
+    api.export_columns(columns, output_file, data_format)
+
+    output_file.seek(0)
+    if data_format == 'parquet':
+        table = pyarrow.parquet.read_table(output_file)
+    else:
+        table = pyarrow.ipc.open_file(output_file).read_all()
+
+    assert table.to_pydict() == dict(columns)
+
+
+def test_export_columns_without_pyarrow(mocker):
+    """
+    Test 'do_audit.api.export_columns' when 'pyarrow' isn't installed
+    """
+    mocker.patch.object(api, 'pyarrow', None)
+
+    with pytest.raises(ImportError):
+        api.export_columns(api.create_droplets_columns([]), io.BytesIO(), 'parquet')
+
+
+def test_create_domains_dataset_addresses():
+    """
+    Test 'do_audit.api.create_domains_dataset' with addresses filter
+    """
+    zone_file = (
+        '$ORIGIN example.com.\n'
+        '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+        '@ 1800 IN NS ns1.digitalocean.com.\n'
+        '@ 1800 IN A 192.168.0.1\n'
+        'www 1800 IN CNAME example.com.\n'
+        'blog 1800 IN A 192.168.0.2\n'
+        'ipv6 1800 IN AAAA ::1\n'
+    )
+    domains = [digitalocean.Domain(zone_file=zone_file)]
+
+    assert api.zone_addresses(zone_file) == {'192.168.0.1', '192.168.0.2', '::1'}
+
+    assert len(api.create_domains_dataset(domains)) == 3
+    assert api.create_domains_dataset(domains, addresses={'192.168.0.2', '::1'}).dict == [
+        {'Domain': 'example.com', 'Subdomain': 'blog', 'Record type': 'A', 'Destination': '192.168.0.2'},
+    ]
+    assert len(api.create_domains_dataset(domains, verbose=True, addresses={'192.168.0.2', '::1'})) == 2
+
+    assert api.create_domains_dataset(domains, columns=['Destination', 'Subdomain']).dict == [
+        {'Destination': '192.168.0.1', 'Subdomain': '@'},
+        {'Destination': '@', 'Subdomain': 'www'},
+        {'Destination': '192.168.0.2', 'Subdomain': 'blog'},
+    ]
+
+
+def test_create_accounts_dataset_columns():
+    """
+    Test 'do_audit.api.create_accounts_dataset' with columns
+    """
+    account = digitalocean.Account(
+        email='user@example.com', email_verified=False, status='active', status_message='', droplet_limit=25,
+        floating_ip_limit=3, uuid='uuid',
+    )
+
+    assert api.create_accounts_dataset(account).dict == [
+        {'Email': 'user@example.com (unverified)', 'Status': 'active', 'Droplet limit': 25},
+    ]
+    assert api.create_accounts_dataset(account, columns=['UUID', 'Email']).dict == [
+        {'UUID': 'uuid', 'Email': 'user@example.com (unverified)'},
+    ]
+
+
+def test_iter_droplets_rows(make_droplet):
+    """
+    Test 'do_audit.api.iter_droplets_rows'
+    """
+    droplets = [make_droplet(id=n, name='droplet-{}'.format(n)) for n in range(5)]
+    headers = api.droplets_headers(verbose=True)
+
+    rows = api.iter_droplets_rows(iter(droplets), headers, chunk_size=2)
+
+    assert [tuple(row) for row in rows] == api.create_droplets_dataset(droplets, verbose=True)[:]
+
+    # Droplets are only pulled when the rows are consumed, one chunk at a time
+    pulled = []
+
+    def droplets_source():
+        for droplet in droplets:
+            pulled.append(droplet)
+            yield droplet
+
+    rows = api.iter_droplets_rows(droplets_source(), ['Name'], chunk_size=2)
+    assert not pulled
+
+    assert next(rows) == ['droplet-0']
+    assert len(pulled) == 2
+
+
+@pytest.mark.parametrize('data_format', api.STREAMING_FORMATS)
+def test_stream_rows(data_format):
+    """
+    Test 'do_audit.api.stream_rows'
+    """
+    headers = ['Name', 'CPU', 'Tags']
+    rows = [['droplet', 1, 'a, b'], ['"other"', None, '\t']]
+    output_file = io.BytesIO()
+
+    api.stream_rows(headers, iter(rows), output_file, data_format, chunk_size=1)
+
+    # Output is the same as the tablib export
+    export_kwargs = {'lineterminator': os.linesep} if data_format == 'csv' else {}
+    assert output_file.getvalue().decode() == tablib.Dataset(*rows, headers=headers).export(
+        data_format, **export_kwargs
+    )
+
+    with pytest.raises(ValueError):
+        api.stream_rows(headers, rows, output_file, 'xlsx')
+
+
+def test_normalize_address():
+    """
+    Test 'do_audit.api.normalize_address'
+    """
+    assert api.normalize_address('192.168.0.1') == '192.168.0.1'
+    assert api.normalize_address('2A03:B0C0:0003:00D0:0000:0000:01C6:F001') == '2a03:b0c0:3:d0::1c6:f001'
+
+
+def test_create_orphans_dataset(make_droplet):
+    """
+    Test 'do_audit.api.create_orphans_dataset'
+    """
+    zone_file = (
+        '$ORIGIN example.com.\n'
+        '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+        '@ 1800 IN NS ns1.digitalocean.com.\n'
+        '@ 1800 IN A 192.168.0.1\n'
+        '@ 1800 IN AAAA 2a03:b0c0:3:d0::1c6:f001\n'
+        'www 1800 IN CNAME example.com.\n'
+        'blog 1800 IN A 10.0.0.1\n'
+        'old 1800 IN A 203.0.113.1\n'
+        'floating 1800 IN A 192.168.100.1\n'
+    )
+    droplets = [
+        make_droplet(id=1, name='web', ip_address='192.168.0.1'),
+        make_droplet(id=2, name='ipv6', ip_address='192.168.0.2', ip_v6_address='2A03:B0C0:3:D0:0:0:1C6:F001'),
+        make_droplet(id=3, name='private', ip_address='192.168.0.3', private_ip_address='10.0.0.1'),
+        make_droplet(id=4, name='floating', ip_address='192.168.0.4'),
+        make_droplet(id=5, name='forgotten', ip_address='192.168.0.5'),
+    ]
+    floating_ips = [
+        digitalocean.FloatingIP(ip='192.168.100.1', droplet={'id': 4}),
+        digitalocean.FloatingIP(ip='192.168.100.2', droplet=None),
+    ]
+
+    dataset = api.create_orphans_dataset(droplets, [digitalocean.Domain(zone_file=zone_file)], floating_ips)
+
+    assert dataset.dict == [
+        {
+            'Issue': 'Dangling record', 'Domain': 'example.com', 'Subdomain': 'old', 'Record type': 'A',
+            'Address': '203.0.113.1', 'Droplet': None,
+        },
+        {
+            'Issue': 'Unreferenced droplet', 'Domain': None, 'Subdomain': None, 'Record type': None,
+            'Address': '192.168.0.5', 'Droplet': 'forgotten (https://cloud.digitalocean.com/droplets/5/graphs)',
+        },
+    ]
+
+    # Without the floating IPs the record pointing at one is dangling and the droplet is unreferenced
+    dataset = api.create_orphans_dataset(
+        droplets, [digitalocean.Domain(zone_file=zone_file)], columns=['Issue', 'Address'],
+    )
+
+    assert dataset.dict == [
+        {'Issue': 'Dangling record', 'Address': '203.0.113.1'},
+        {'Issue': 'Dangling record', 'Address': '192.168.100.1'},
+        {'Issue': 'Unreferenced droplet', 'Address': '192.168.0.4'},
+        {'Issue': 'Unreferenced droplet', 'Address': '192.168.0.5'},
+    ]
+
+
+def test_create_resources_datasets(make_droplet):
+    """
+    Test 'do_audit.api.create_*_dataset' resources datasets
+    """
+    droplets = [make_droplet(id=1, name='web'), make_droplet(id=2, name='db')]
+
+    volumes = [digitalocean.Volume(
+        id='v', name='data', region={'name': 'London 1', 'slug': 'lon1'}, size_gigabytes=10, droplet_ids=[2, 3],
+        filesystem_type='ext4', tags=[], created_at='2017-05-08T12:52:22Z',
+    )]
+    assert api.create_volumes_dataset(volumes, droplets=droplets).dict == [{
+        'Name': 'data', 'Region': 'London 1', 'Size': '10 GB', 'Droplets': 'db, 3', 'Filesystem': 'ext4',
+        'Created at': 'Mon, 05/08/17 12:52:22',
+    }]
+
+    floating_ips = [
+        digitalocean.FloatingIP(ip='192.168.100.1', region={'name': 'London 1'}, droplet={'id': 1}),
+        digitalocean.FloatingIP(ip='192.168.100.2', region={'name': 'London 1'}, droplet=None),
+    ]
+    assert api.create_floating_ips_dataset(floating_ips, droplets=droplets)['Droplet'] == ['web', '-']
+
+    tags = [digitalocean.Tag(name='web', resources={'count': 3, 'droplets': {'count': 2}})]
+    assert api.create_tags_dataset(tags, columns=['Droplets', 'Name']).dict == [{'Droplets': 2, 'Name': 'web'}]
+
+    assert api.create_firewalls_dataset([], verbose=True).headers == list(api.FIREWALL_COLUMNS)
+
+    # Droplets targeted by their tags are included
+    account = ResourceSnapshot(droplets=[make_droplet(id=1, name='web', tags=['web']), make_droplet(id=2, name='db')])
+    firewalls = [digitalocean.Firewall(droplet_ids=[2], tags=['web'])]
+    assert api.create_firewalls_dataset(firewalls, columns=['Droplets'], account=account)['Droplets'] == ['db, web']
+
+    load_balancers = [digitalocean.LoadBalancer(droplet_ids=[], tag='web')]
+    assert api.create_load_balancers_dataset(load_balancers, columns=['Droplets'], account=account)['Droplets'] == [
+        'web',
+    ]
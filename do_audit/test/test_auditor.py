@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.auditor' file
+"""
+from __future__ import unicode_literals
+
+import digitalocean
+import pytest
+import six
+
+from do_audit import Auditor, probe
+from do_audit.auditor import DNSRecord
+from do_audit.filters import AuditFilter
+from do_audit.probe import ProbeResult
+
+
+ZONE_FILE = (
+    '$ORIGIN example.com.\n'
+    '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+    '@ 1800 IN NS ns1.digitalocean.com.\n'
+    '@ 1800 IN A 192.168.0.1\n'
+    'blog 1800 IN A 192.168.0.2\n'
+    'www 1800 IN CNAME @\n'
+)
+
+
+@pytest.fixture
+def manager(manager, make_droplet):
+    """Mock Digital Ocean manager with droplets and a domain"""
+    manager.get_all_droplets.return_value = [
+        make_droplet(id=1, name='web', tags=['web'], ip_address='192.168.0.1'),
+        make_droplet(id=2, name='blog', tags=['blog'], ip_address='192.168.0.2'),
+        make_droplet(id=3, name='other', ip_address='192.168.0.3'),
+    ]
+    manager.get_all_domains.return_value = [digitalocean.Domain(name='example.com', zone_file=ZONE_FILE)]
+    manager.get_domain.return_value = digitalocean.Domain(name='example.com', zone_file=ZONE_FILE)
+    return manager
+
+
+def test_auditor_iter_droplets(manager):
+    """
+    Test 'do_audit.auditor.Auditor.iter_droplets'
+    """
+    assert [droplet.id for droplet in Auditor(manager).iter_droplets()] == [1, 2, 3]
+
+    # Only droplets the domain records point at
+    auditor = Auditor(manager, audit_filter=AuditFilter(domains=['example.com']))
+    assert [droplet.id for droplet in auditor.iter_droplets()] == [1, 2]
+
+    # Droplets are only fetched once
+    list(auditor.iter_droplets())
+    assert manager.get_all_droplets.call_count == 2
+
+
+def test_auditor_iter_dns_records(manager):
+    """
+    Test 'do_audit.auditor.Auditor.iter_dns_records'
+    """
+    assert list(Auditor(manager).iter_dns_records()) == [
+        DNSRecord('example.com', '@', 'A', '192.168.0.1'),
+        DNSRecord('example.com', 'blog', 'A', '192.168.0.2'),
+        DNSRecord('example.com', 'www', 'CNAME', '@'),
+    ]
+    assert not manager.get_all_droplets.called
+
+    # Only records pointing at the filtered droplets
+    auditor = Auditor(manager, audit_filter=AuditFilter(tags=['blog']))
+    assert [record.subdomain for record in auditor.iter_dns_records()] == ['blog']
+
+
+def test_auditor_probe_domains(manager, mocker):
+    """
+    Test 'do_audit.auditor.Auditor.probe_domains'
+    """
+    session = mocker.Mock()
+    probe_url = mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, timeout, do_droplets, headers,
+                                    **kwargs: [url, '200 (OK)', do_droplets.get('192.168.0.1')])
+
+    auditor = Auditor(manager, session=session, timeout=5, max_workers=4)
+    results = list(auditor.probe_domains(headers=['URL', 'Status code', 'Droplet']))
+
+    assert [result.url for result in results] == [
+        'http://example.com', 'https://example.com',
+        'http://blog.example.com', 'https://blog.example.com',
+        'http://www.example.com', 'https://www.example.com',
+    ]
+    assert results[0] == ProbeResult(
+        domain='example.com', url='http://example.com', probe=None, status_code='200 (OK)', ip=None, port=None,
+        droplet=('web', 'https://cloud.digitalocean.com/droplets/1/graphs'), signatures=None, cached=None,
+        error=None, exception=None,
+    )
+
+    _, kwargs = probe_url.call_args
+    assert kwargs['session'] is session
+    assert probe_url.call_args[0][2] == 5
+
+    # Droplets aren't fetched when they aren't needed
+    manager.get_all_droplets.reset_mock()
+    list(Auditor(manager).probe_domains(headers=['URL']))
+    assert not manager.get_all_droplets.called
+
+    # Unless the cached probes depend on them
+    iter_ping_rows = mocker.patch('do_audit.auditor.iter_ping_rows', return_value=[])
+    list(Auditor(manager, cache=mocker.Mock()).probe_domains(headers=['URL']))
+    assert iter_ping_rows.call_args[0][3]['192.168.0.1'] == ('web', 'https://cloud.digitalocean.com/droplets/1/graphs')
+
+
+@pytest.mark.skipif(six.PY2, reason="asyncio requires Python 3")
+def test_auditor_async(manager, mocker):
+    """
+    Test 'do_audit.auditor.Auditor' asynchronous iterators
+    """
+    import asyncio
+
+    mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, *args, **kwargs: [url])
+    auditor = Auditor(manager)
+
+    loop = asyncio.new_event_loop()
+
+    # `async for` syntax can't be used in the Python 2 compatible test files
+    def collect(iterator):
+        items = []
+        while True:
+            try:
+                items.append(loop.run_until_complete(iterator.__anext__()))
+            except StopAsyncIteration:
+                return items
+
+    try:
+        droplets = collect(auditor.iter_droplets_async(loop=loop))
+        records = collect(auditor.iter_dns_records_async(loop=loop))
+        results = collect(auditor.probe_domains_async(headers=['URL'], loop=loop))
+    finally:
+        loop.close()
+
+    assert [droplet.id for droplet in droplets] == [1, 2, 3]
+    assert len(records) == 3
+    assert [result.url for result in results][:2] == ['http://example.com', 'https://example.com']
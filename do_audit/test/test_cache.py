@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.cache' file
+"""
+from __future__ import unicode_literals
+
+import json
+import socket
+import time
+
+from do_audit import cache
+
+
+HEADERS = ['URL', 'Status code', 'Cached', 'Error']
+
+
+def test_resolve_url(mocker):
+    """
+    Test 'do_audit.cache.resolve_url'
+    """
+    getaddrinfo = mocker.patch('socket.getaddrinfo', return_value=[
+        (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('192.168.0.1', 443)),
+    ])
+
+    assert cache.resolve_url('https://example.com') == '192.168.0.1'
+    getaddrinfo.assert_called_once_with('example.com', 443, 0, socket.SOCK_STREAM)
+
+    getaddrinfo.side_effect = socket.gaierror('error')
+    assert cache.resolve_url('http://example.com') is None
+
+    # Slow lookups are given up on after the timeout
+    getaddrinfo.side_effect = lambda *args: time.sleep(0.5) or getaddrinfo.return_value
+    assert cache.resolve_url('http://example.com', timeout=0.01) is None
+
+
+def test_probe_state():
+    """
+    Test 'do_audit.cache.probe_state'
+    """
+    state = cache.probe_state('digest', ('web', 'url'), 'get')
+
+    assert state == cache.probe_state('digest', ['web', 'url'], 'get')
+    assert state != cache.probe_state('changed digest', ('web', 'url'), 'get')
+    assert state != cache.probe_state('digest', ('other', 'url'), 'get')
+    assert state != cache.probe_state('digest', ('web', 'url'), 'tcp')
+
+
+def test_probe_cache(tmpdir, mocker):
+    """
+    Test 'do_audit.cache.ProbeCache'
+    """
+    time = mocker.patch('time.time', return_value=1000.0)
+    path = str(tmpdir.join('cache.json'))
+
+    probe_cache = cache.ProbeCache(path, fresh_ok=3600, fresh_fail=60)
+    probe_cache.store('http://example.com', '192.168.0.1', 'state', HEADERS, [
+        'http://example.com', '200 (OK)', None, None,
+    ])
+    probe_cache.store('https://example.com', '192.168.0.1', 'state', HEADERS, [
+        'https://example.com', None, None, "SSL error",
+    ])
+    probe_cache.close()
+
+    probe_cache = cache.ProbeCache(path, fresh_ok=3600, fresh_fail=60)
+    time.return_value = 1030.0
+
+    assert probe_cache.get('http://example.com', '192.168.0.1', 'state', HEADERS) == [
+        'http://example.com', '200 (OK)', 'Yes', None,
+    ]
+    assert probe_cache.get('https://example.com', '192.168.0.1', 'state', ['URL', 'Error']) == [
+        'https://example.com', "SSL error",
+    ]
+
+    # Moved records, changed zones or droplets and columns that weren't probed always miss
+    assert probe_cache.get('http://example.com', '192.168.0.2', 'state', HEADERS) is None
+    assert probe_cache.get('http://example.com', '192.168.0.1', 'changed state', HEADERS) is None
+    assert probe_cache.get('http://example.com', '192.168.0.1', 'state', ['URL', 'Signatures']) is None
+
+    # Failed results expire sooner
+    time.return_value = 1060.0
+    assert probe_cache.get('http://example.com', '192.168.0.1', 'state', HEADERS) is not None
+    assert probe_cache.get('https://example.com', '192.168.0.1', 'state', HEADERS) is None
+
+    time.return_value = 4600.0
+    assert probe_cache.get('http://example.com', '192.168.0.1', 'state', HEADERS) is None
+
+    # Entries that can't be fresh anymore aren't written
+    probe_cache.close()
+    with open(path) as fp:
+        assert json.load(fp) == {'entries': []}
+
+
+def test_probe_cache_corrupted(tmpdir):
+    """
+    Test 'do_audit.cache.ProbeCache' treats corrupted cache files as empty
+    """
+    path = tmpdir.join('cache.json')
+    path.write('{"entries": [{"url"')
+
+    assert cache.ProbeCache(str(path)).entries == {}
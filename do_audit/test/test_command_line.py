@@ -4,6 +4,9 @@ Test 'do_audit.command_line' file
 """
 from __future__ import unicode_literals
 
+import json
+
+import digitalocean
 import pytest
 from click.testing import CliRunner
 
@@ -221,6 +224,107 @@ class TestDropletsSubcommand(object):
             'ubuntu-512mb-lon1-01,active,Ubuntu 16.04.2x 64,192.168.1.0,1,512 MB,20 GB,"test-tag-1, test-tag-2",No,No,No,,London 1,https://cloud.digitalocean.com/droplets/2/graphs,"Mon, 05/08/17 12:52:22"\n'  # noqa
         )
 
+    def test_droplets_subcommand_filter(self, runner):
+        """
+        Test invoking the script 'droplets' subcommand with filter options
+        """
+        result = runner.invoke(
+            cli, args=['droplets', '--status', 'active', '--region', 'lon1', '-t', 'token'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '# ubuntu-512mb-lon1-01 (active)\n'
+            'OS:                 Ubuntu 16.04.2x 64\n'
+            'IP:                 192.168.1.0\n'
+            'CPU:                1\n'
+            'Memory:             512 MB\n'
+            'Disk:               20 GB\n'
+            'URL:                https://cloud.digitalocean.com/droplets/2/graphs\n'
+            'Created at:         Mon, 05/08/17 12:52:22\n'
+        )
+
+    def test_droplets_subcommand_columns(self, runner):
+        """
+        Test invoking the script 'droplets' subcommand with columns option
+        """
+        result = runner.invoke(
+            cli, args=['droplets', '-c', 'Name,IP,Region', '-t', 'token'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '# test-centos\n'
+            'IP:                 192.169.1.0\n'
+            'Region:             Amsterdam 2\n'
+            '\n'
+            '# ubuntu-512mb-lon1-01\n'
+            'IP:                 192.168.1.0\n'
+            'Region:             London 1\n'
+        )
+
+    def test_droplets_subcommand_metrics(self, runner, mocker):
+        """
+        Test invoking the script 'droplets' subcommand with metrics columns
+        """
+        fetch = mocker.patch('do_audit.command_line.MetricsClient.fetch', return_value={
+            1: {'CPU avg': 12.345, 'CPU p95': 50.0, 'Inbound avg': 0.5},
+        })
+
+        result = runner.invoke(
+            cli, args=['droplets', '-c', 'Name,CPU avg,CPU p95,Inbound avg', '-t', 'token'],
+        )
+
+        assert result.exit_code == 0
+        assert fetch.call_count == 1
+        assert result.output == (
+            '# test-centos\n'
+            'CPU avg:            12.3%\n'
+            'CPU p95:            50.0%\n'
+            'Inbound avg:        0.50 Mbps\n'
+            '\n'
+            '# ubuntu-512mb-lon1-01\n'
+            'CPU avg:            -\n'
+            'CPU p95:            -\n'
+            'Inbound avg:        -\n'
+        )
+
+        # Metrics aren't fetched when none of their columns are shown
+        runner.invoke(cli, args=['droplets', '-t', 'token'])
+        assert fetch.call_count == 1
+
+    def test_droplets_subcommand_unknown_columns(self, runner):
+        """
+        Test invoking the script 'droplets' subcommand with unknown columns
+        """
+        result = runner.invoke(
+            cli, args=['droplets', '-c', 'Name,Unknown', '-t', 'token'],
+        )
+
+        assert result.exit_code == 2
+        assert 'Unknown column(s): Unknown' in result.output
+
+    def test_droplets_subcommand_export_parquet(self, tmpdir, runner):
+        """
+        Test invoking the script 'droplets' subcommand with parquet export option
+        """
+        parquet = pytest.importorskip('pyarrow.parquet')
+
+        filepath = tmpdir.mkdir('do-audit').join('output_file')
+
+        result = runner.invoke(
+            cli, args=['droplets', '-o', str(filepath), '-f', 'parquet', '-t', 'token'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == "PARQUET data was successfully exported to '{}'\n".format(str(filepath))
+
+        table = parquet.read_table(str(filepath))
+
+        assert table.column_names == ['Name', 'Status', 'OS', 'IP', 'CPU', 'Memory', 'Disk', 'URL', 'Created at']
+        assert table.column('Name').to_pylist() == ['test-centos', 'ubuntu-512mb-lon1-01']
+        assert table.column('CPU').to_pylist() == [1, 1]
+
 
 @pytest.mark.vcr
 class TestDomainsSubcommand(object):
@@ -344,4 +448,379 @@ class TestDomainsSubcommand(object):
         )
 
 
-# TODO: Add tests for `ping_domains` subcommand
+class TestOrphansSubcommand(object):
+    """
+    Test 'orphans' subcommand
+    """
+    zone_file = (
+        '$ORIGIN example.com.\n'
+        '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+        '@ 1800 IN NS ns1.digitalocean.com.\n'
+        '@ 1800 IN A 192.168.0.1\n'
+        'old 1800 IN A 203.0.113.1\n'
+    )
+
+    @pytest.fixture
+    def manager(self, manager, make_droplet):
+        """Mock Digital Ocean manager with a domain and droplets"""
+        manager.get_all_domains.return_value = [digitalocean.Domain(name='example.com', zone_file=self.zone_file)]
+        manager.get_all_droplets.return_value = [
+            make_droplet(id=1, name='web', ip_address='192.168.0.1'),
+            make_droplet(id=2, name='forgotten', ip_address='192.168.0.2'),
+        ]
+        return manager
+
+    def test_orphans_subcommand(self, runner, manager, mocker):
+        """
+        Test invoking the script 'orphans' subcommand
+        """
+        requests_get = mocker.patch('requests.get')
+
+        result = runner.invoke(
+            cli, args=['orphans'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '# Dangling record\n'
+            'example.com               old                       A          203.0.113.1\n'
+            '\n'
+            '# Unreferenced droplet\n'
+            '192.168.0.2                              forgotten (https://cloud.digitalocean.com/droplets/2/graphs)\n'
+        )
+
+        # No probes are sent
+        assert not requests_get.called
+
+    def test_orphans_subcommand_table(self, runner, manager):
+        """
+        Test invoking the script 'orphans' subcommand with table option
+        """
+        result = runner.invoke(
+            cli, args=['orphans', '--table', '-c', 'Issue,Address,Droplet'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            'Issue                 Address      Droplet\n'
+            '--------------------  -----------  {}\n'.format('-' * 60) +
+            'Dangling record       203.0.113.1\n'
+            'Unreferenced droplet  192.168.0.2  forgotten (https://cloud.digitalocean.com/droplets/2/graphs)\n'
+        )
+
+    def test_orphans_subcommand_export(self, tmpdir, runner, manager):
+        """
+        Test invoking the script 'orphans' subcommand with export option
+        """
+        filepath = tmpdir.join('output_file')
+
+        result = runner.invoke(
+            cli, args=['orphans', '-o', str(filepath)],
+        )
+
+        assert result.exit_code == 0
+        assert filepath.read() == (
+            'Issue,Domain,Subdomain,Record type,Address,Droplet\n'
+            'Dangling record,example.com,old,A,203.0.113.1,\n'
+            'Unreferenced droplet,,,,192.168.0.2,forgotten (https://cloud.digitalocean.com/droplets/2/graphs)\n'
+        )
+
+
+class TestResourcesSubcommand(object):
+    """
+    Test 'resources' subcommand
+    """
+    @pytest.fixture
+    def manager(self, manager, make_droplet):
+        """Mock Digital Ocean manager with a droplet, a floating IP and a tag"""
+        manager.get_all_droplets.return_value = [make_droplet(id=1, name='web')]
+        manager.get_all_floating_ips.return_value = [
+            digitalocean.FloatingIP(ip='192.168.100.1', region={'name': 'London 1'}, droplet={'id': 1}),
+        ]
+        manager.get_all_tags.return_value = [
+            digitalocean.Tag(name='web', resources={'count': 1, 'droplets': {'count': 1}}),
+        ]
+        return manager
+
+    def test_resources_subcommand(self, runner, manager):
+        """
+        Test invoking the script 'resources' subcommand
+        """
+        result = runner.invoke(
+            cli, args=['resources', '--type', 'floating_ips', '--type', 'tags'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '# Floating IPs\n'
+            '- 192.168.100.1\n'
+            '    Region:         London 1\n'
+            '    Droplet:        web\n'
+            '\n'
+            '# Tags\n'
+            '- web\n'
+            '    Resources:      1\n'
+            '    Droplets:       1\n'
+        )
+        assert not manager.get_all_volumes.called
+
+    def test_resources_subcommand_export(self, tmpdir, runner, manager):
+        """
+        Test invoking the script 'resources' subcommand with export option
+        """
+        filepath = tmpdir.join('output_file')
+
+        result = runner.invoke(
+            cli, args=['resources', '--type', 'floating_ips', '-o', str(filepath)],
+        )
+
+        assert result.exit_code == 0
+        assert filepath.read() == (
+            'IP,Region,Droplet\n'
+            '192.168.100.1,London 1,web\n'
+        )
+
+        # Only a single resource type can be exported to a file
+        result = runner.invoke(
+            cli, args=['resources', '-o', str(filepath)],
+        )
+
+        assert result.exit_code == 2
+
+
+class TestPingDomainsSubcommand(object):
+    """
+    Test 'ping-domains' subcommand
+    """
+    zone_file = (
+        '$ORIGIN example.com.\n'
+        '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+        '@ 1800 IN NS ns1.digitalocean.com.\n'
+        '@ 1800 IN A 192.168.0.1\n'
+    )
+
+    @pytest.fixture
+    def manager(self, manager):
+        """Mock Digital Ocean manager with a domain"""
+        manager.get_all_domains.return_value = [digitalocean.Domain(name='example.com', zone_file=self.zone_file)]
+        return manager
+
+    @pytest.fixture
+    def probe_url(self, mocker):
+        """Mock probing the URLs"""
+        def fake_probe_url(domain, url, timeout, do_droplets, headers, **kwargs):
+            return [{'Domain': domain, 'URL': url, 'Status code': '200 (OK)'}.get(header) for header in headers]
+
+        return mocker.patch('do_audit.probe.probe_url', side_effect=fake_probe_url)
+
+    def test_ping_domains_subcommand(self, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '-c', 'URL,Status code'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '# example.com\n'
+            '- http://example.com\n'
+            '    Status code:    200 (OK)\n'
+            '\n'
+            '- https://example.com\n'
+            '    Status code:    200 (OK)\n'
+        )
+
+    def test_ping_domains_subcommand_table(self, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand with table option
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--table', '-c', 'URL,Status code'],
+        )
+
+        assert result.exit_code == 0
+        assert result.output == (
+            '{:<40}  Status code\n'.format('URL') +
+            '{}  -----------\n'.format('-' * 40) +
+            '{:<40}  200 (OK)\n'.format('http://example.com') +
+            '{:<40}  200 (OK)\n'.format('https://example.com')
+        )
+
+    def test_ping_domains_subcommand_journal(self, tmpdir, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand with journal and resume options
+        """
+        journal_path = str(tmpdir.join('journal.jsonl'))
+        filepath = tmpdir.join('output_file')
+
+        result = runner.invoke(
+            cli, args=['ping-domains', '--journal', journal_path, '-o', str(filepath), '-f', 'json'],
+        )
+
+        assert result.exit_code == 0
+        assert probe_url.call_count == 2
+
+        output = filepath.read()
+
+        result = runner.invoke(
+            cli, args=['ping-domains', '--journal', journal_path, '--resume', '-o', str(filepath), '-f', 'json'],
+        )
+
+        assert result.exit_code == 0
+        assert probe_url.call_count == 2
+        assert filepath.read() == output
+
+    def test_ping_domains_subcommand_signatures(self, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand with custom signatures
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--signature', 'Grafana=<title>grafana', '-c', 'URL'],
+        )
+
+        assert result.exit_code == 0
+
+        fingerprinter = probe_url.call_args[1]['fingerprinter']
+        assert list(fingerprinter.signatures)[-1] == 'Grafana'
+        assert len(fingerprinter.signatures) == 6
+
+    @pytest.mark.parametrize('signature', ['Grafana', 'Grafana=(unclosed'])
+    def test_ping_domains_subcommand_invalid_signature(self, runner, signature):
+        """
+        Test invoking the script 'ping-domains' subcommand with invalid custom signatures
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--signature', signature],
+        )
+
+        assert result.exit_code == 2
+        assert "Invalid value for '--signature'" in result.output
+
+    def test_ping_domains_subcommand_probe_mode(self, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand with probe mode and escalation options
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--probe-mode', 'tcp', '--escalate', '-c', 'URL'],
+        )
+
+        assert result.exit_code == 0
+        assert probe_url.call_args[1]['mode'] == 'tcp'
+        assert probe_url.call_args[1]['escalate'] is True
+
+    def test_ping_domains_subcommand_escalate_get(self, runner):
+        """
+        Test invoking the script 'ping-domains' subcommand escalating full GET probes
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--escalate'],
+        )
+
+        assert result.exit_code == 2
+        assert "The '--escalate' option requires a cheaper '--probe-mode'" in result.output
+
+    def test_ping_domains_subcommand_stats(self, tmpdir, runner, manager, probe_url):
+        """
+        Test invoking the script 'ping-domains' subcommand with progress and statistics options
+        """
+        status_path = tmpdir.join('status.json')
+        stats_path = tmpdir.join('stats.json')
+        filepath = tmpdir.join('output_file')
+
+        result = runner.invoke(
+            cli, args=[
+                'ping-domains', '--progress', '--status-file', str(status_path), '--stats-json', str(stats_path),
+                '-o', str(filepath), '-c', 'URL',
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert 'Working...' not in result.output
+        assert 'Probed 2/2 (0 in flight)' in result.output
+
+        assert json.loads(status_path.read())['finished'] is True
+
+        stats = json.loads(stats_path.read())
+        assert stats['planned'] == stats['done'] == 2
+        assert set(stats['phases']) == {'api_fetch', 'zone_parse', 'probe'}
+
+    def test_ping_domains_subcommand_deadline(self, tmpdir, runner, manager, probe_url, mocker):
+        """
+        Test invoking the script 'ping-domains' subcommand with deadline option
+        """
+        deadline = mocker.patch('do_audit.command_line.Deadline')
+        deadline.return_value.remaining.return_value = 0
+        filepath = tmpdir.join('output_file')
+
+        result = runner.invoke(
+            cli, args=['ping-domains', '--deadline', '60', '-o', str(filepath), '-c', 'URL,Status code,Error'],
+        )
+
+        assert result.exit_code == 0
+        deadline.assert_called_once_with(60)
+        assert not probe_url.called
+
+        # The partial results are still exported
+        assert filepath.read() == (
+            'URL,Status code,Error\n'
+            'http://example.com,,Skipped (deadline)\n'
+            'https://example.com,,Skipped (deadline)\n'
+        )
+
+    def test_ping_domains_subcommand_cache(self, tmpdir, runner, manager, probe_url, mocker):
+        """
+        Test invoking the script 'ping-domains' subcommand with cache options
+        """
+        mocker.patch('do_audit.probe.resolve_url', return_value='192.168.0.1')
+        cache_path = tmpdir.join('cache.json')
+        args = [
+            'ping-domains', '--cache', str(cache_path), '--fresh-ok', '1h', '-c', 'URL,Status code,Cached', '--table',
+        ]
+
+        result = runner.invoke(cli, args=args)
+        assert result.exit_code == 0
+        assert probe_url.call_count == 2
+        assert len(json.loads(cache_path.read())['entries']) == 2
+
+        result = runner.invoke(cli, args=args)
+        assert result.exit_code == 0
+        assert probe_url.call_count == 2
+        assert [line.split() for line in result.output.splitlines()[2:]] == [
+            ['http://example.com', '200', '(OK)', 'Yes'],
+            ['https://example.com', '200', '(OK)', 'Yes'],
+        ]
+
+    def test_ping_domains_subcommand_cache_unwritable(self, tmpdir, runner, manager, probe_url, mocker):
+        """
+        Test invoking the script 'ping-domains' subcommand with a cache file that can't be written
+        """
+        mocker.patch('do_audit.probe.resolve_url', return_value='192.168.0.1')
+        cache_path = tmpdir.join('missing', 'cache.json')
+
+        result = runner.invoke(cli, args=['ping-domains', '--cache', str(cache_path), '-c', 'URL', '--table'])
+        assert result.exit_code == 0
+        assert 'http://example.com' in result.output
+        assert "Warning: unable to write the cache file '{}'".format(cache_path) in result.output
+
+    def test_ping_domains_subcommand_invalid_duration(self, runner):
+        """
+        Test invoking the script 'ping-domains' subcommand with invalid cache duration
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--cache', 'cache.json', '--fresh-ok', 'soon'],
+        )
+
+        assert result.exit_code == 2
+        assert "Invalid duration 'soon'" in result.output
+
+    def test_ping_domains_subcommand_resume_without_journal(self, runner):
+        """
+        Test invoking the script 'ping-domains' subcommand with resume option but no journal
+        """
+        result = runner.invoke(
+            cli, args=['ping-domains', '--resume'],
+        )
+
+        assert result.exit_code == 2
+        assert "requires a '--journal' file path" in result.output
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.filters' file
+"""
+from __future__ import unicode_literals
+
+import click
+import digitalocean
+import pytest
+
+from do_audit.filters import AuditFilter
+
+
+def test_droplet_predicate(make_droplet):
+    """
+    Test 'do_audit.filters.AuditFilter.droplet_predicate'
+    """
+    droplet = make_droplet(tags=['web'])
+
+    assert AuditFilter().droplet_predicate(droplet)
+    assert not AuditFilter().filters_droplets
+
+    assert AuditFilter(tags=['web', 'db']).droplet_predicate(droplet)
+    assert not AuditFilter(tags=['db']).droplet_predicate(droplet)
+
+    assert AuditFilter(regions=['LON1']).droplet_predicate(droplet)
+    assert AuditFilter(regions=['london 1']).droplet_predicate(droplet)
+    assert not AuditFilter(regions=['ams2']).droplet_predicate(droplet)
+
+    assert AuditFilter(tags=['web'], statuses=['active', 'off']).droplet_predicate(droplet)
+    assert not AuditFilter(tags=['web'], statuses=['off']).droplet_predicate(droplet)
+
+
+def test_get_droplets(mocker, manager, make_droplet):
+    """
+    Test 'do_audit.filters.AuditFilter.get_droplets'
+    """
+    web = make_droplet(id=1, tags=['web'])
+    both = make_droplet(id=2, tags=['web', 'db'], status='off')
+    db = make_droplet(id=3, tags=['db'], ip_v6_address='::1')
+
+    manager.get_all_droplets.side_effect = lambda tag_name=None: [
+        droplet for droplet in [web, both, db] if tag_name is None or tag_name in droplet.tags
+    ]
+
+    assert AuditFilter().get_droplets(manager) == [web, both, db]
+    manager.get_all_droplets.assert_called_once_with()
+
+    # Tags are pushed down to the API
+    manager.reset_mock()
+    assert AuditFilter(tags=['web', 'db']).get_droplets(manager) == [web, both, db]
+    manager.get_all_droplets.assert_has_calls([mocker.call(tag_name='web'), mocker.call(tag_name='db')])
+
+    assert AuditFilter(tags=['db'], statuses=['active']).get_droplets(manager) == [db]
+
+    assert AuditFilter().get_droplet_addresses(manager) is None
+    assert AuditFilter(tags=['db'], statuses=['active']).get_droplet_addresses(manager) == {'192.168.0.1', '::1'}
+
+
+def test_get_domains(manager):
+    """
+    Test 'do_audit.filters.AuditFilter.get_domains'
+    """
+    AuditFilter().get_domains(manager)
+    manager.get_all_domains.assert_called_once_with()
+
+    # Domain names are pushed down to the API
+    AuditFilter(domains=['example.com']).get_domains(manager)
+    manager.get_domain.assert_called_once_with('example.com')
+    assert not manager.get_all_domains.call_count > 1
+
+    manager.get_domain.side_effect = digitalocean.NotFoundError('The resource you were accessing could not be found.')
+    with pytest.raises(click.ClickException):
+        AuditFilter(domains=['example.org']).get_domains(manager)
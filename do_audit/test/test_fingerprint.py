@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.fingerprint' file
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import pytest
+
+from do_audit import fingerprint
+
+
+@pytest.mark.parametrize('text,signatures', [
+    ('<html><head><title>Welcome to nginx!</title></head></html>', ['Default NGINX']),
+    ('<hr><center>nginx/1.10.3</center>', ['Default NGINX']),
+    ('<title>Apache2 Ubuntu Default Page: It works</title>', ['Default Apache']),
+    ('<title>IIS Windows Server</title>', ['Default IIS']),
+    ('Server: nginx\nX-Adblock-Key: abc\n\n<html></html>', ['Parked domain']),
+    ('<p>This domain is for sale!</p>', ['Parked domain']),
+    ('<p>Welcome to your DigitalOcean One-Click App</p>', ['DigitalOcean one-click']),
+    ('<title>Welcome to nginx</title><p>Buy this domain</p>', ['Default NGINX', 'Parked domain']),
+    ('<title>My blog</title>', []),
+])
+def test_fingerprinter_default_signatures(text, signatures):
+    """
+    Test 'do_audit.fingerprint.Fingerprinter' default signatures
+    """
+    assert fingerprint.Fingerprinter().match(text) == signatures
+
+
+def test_fingerprinter_overlapping_signatures():
+    """
+    Test 'do_audit.fingerprint.Fingerprinter' reports signatures matching at the same position
+    """
+    fingerprinter = fingerprint.Fingerprinter(OrderedDict([
+        ('Short', r'welcome'),
+        ('Long', r'welcome to grafana'),
+        ('Missing', r'kibana'),
+    ]))
+
+    assert fingerprinter.match('Welcome to Grafana') == ['Short', 'Long']
+
+
+def test_fingerprinter_group_references():
+    """
+    Test 'do_audit.fingerprint.Fingerprinter' matches signatures referring to their own groups separately
+    """
+    fingerprinter = fingerprint.Fingerprinter(OrderedDict([
+        ('Heading', r'<(h\d)>.*</\1>'),
+        ('Named', r'(?P<tag>b|i)>.*</(?P=tag)>'),
+        ('Also named', r'(?P<tag>em)>'),
+        ('Grafana', r'<title>grafana'),
+    ]))
+
+    assert fingerprinter.combined == [3]
+    assert fingerprinter.match('<title>Grafana</title><h2>Title</h2><i>text</i><em>') == [
+        'Heading', 'Named', 'Also named', 'Grafana',
+    ]
+    assert fingerprinter.match('<h2>Title</h3><i>text</b>') == []
+
+
+def test_fingerprinter_no_signatures():
+    """
+    Test 'do_audit.fingerprint.Fingerprinter' without any signatures
+    """
+    assert fingerprint.Fingerprinter(OrderedDict()).match('Welcome to nginx') == []
+
+
+def test_fingerprinter_invalid_signature():
+    """
+    Test 'do_audit.fingerprint.Fingerprinter' with invalid signature
+    """
+    with pytest.raises(ValueError):
+        fingerprint.Fingerprinter({'Broken': r'(unclosed'})
+
+
+def test_fingerprinter_match_response(mocker):
+    """
+    Test 'do_audit.fingerprint.Fingerprinter.match_response'
+    """
+    response = mocker.Mock(encoding=None, headers={'X-Adblock-Key': 'key'})
+    response.iter_content.return_value = iter(['<title>Welcome to nginx!</title>'.encode('utf-8')])
+
+    assert fingerprint.Fingerprinter(prefix_size=512).match_response(response) == ['Default NGINX', 'Parked domain']
+
+    response.iter_content.assert_called_once_with(512)
+    response.close.assert_called_once_with()
+
+
+def test_fingerprinter_match_response_chunks(mocker):
+    """
+    Test 'do_audit.fingerprint.Fingerprinter.match_response' reads the whole prefix from small chunks
+    """
+    body = ('x' * 100 + '<title>Welcome to nginx!</title>' + 'y' * 1000).encode('utf-8')
+    chunks = [body[n:n + 10] for n in range(0, len(body), 10)]
+    consumed = []
+
+    def iter_content(chunk_size):
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    response = mocker.Mock(encoding=None, headers={})
+    response.iter_content.side_effect = iter_content
+
+    assert fingerprint.Fingerprinter(prefix_size=200).match_response(response) == ['Default NGINX']
+
+    # Reading stops once the prefix is complete
+    assert len(consumed) == 20
+    response.close.assert_called_once_with()
+
+
+def test_fingerprinter_match_response_deadline(mocker):
+    """
+    Test 'do_audit.fingerprint.Fingerprinter.match_response' stops reading once the deadline passes
+    """
+    response = mocker.Mock(encoding=None, headers={})
+    response.iter_content.return_value = iter([b'<title>', b'Welcome to nginx!</title>'])
+    deadline = mocker.Mock(expired=True)
+
+    assert fingerprint.Fingerprinter(prefix_size=512).match_response(response, deadline=deadline) == []
+    response.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize('value,signature', [
+    ('Grafana=<title>grafana', ('Grafana', '<title>grafana')),
+    (' Jenkins = a=b', ('Jenkins', ' a=b')),
+])
+def test_parse_signature(value, signature):
+    """
+    Test 'do_audit.fingerprint.parse_signature'
+    """
+    assert fingerprint.parse_signature(value) == signature
+
+
+@pytest.mark.parametrize('value', ['Grafana', '=grafana', 'Grafana='])
+def test_parse_signature_invalid(value):
+    """
+    Test 'do_audit.fingerprint.parse_signature' with invalid values
+    """
+    with pytest.raises(ValueError):
+        fingerprint.parse_signature(value)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.journal' file
+"""
+from __future__ import unicode_literals
+
+import json
+
+import pytest
+
+from do_audit import journal
+
+
+HEADERS = ['Domain', 'URL', 'Status code', 'Error', 'Exception']
+
+
+def test_zone_digest():
+    """
+    Test 'do_audit.journal.zone_digest'
+    """
+    assert journal.zone_digest('zone') == journal.zone_digest('zone')
+    assert journal.zone_digest('zone') != journal.zone_digest('changed zone')
+
+
+@pytest.mark.parametrize('row,healthy', [
+    ({'Status code': '200 (OK)', 'Error': None}, True),
+    ({'Status code': 'Connected'}, True),
+    ({'Error': None}, True),
+    ({'Status code': '404 (Not Found)', 'Error': None}, False),
+    ({'Status code': '502 (Bad Gateway)', 'Error': None}, False),
+    ({'Status code': None, 'Error': "Connection error"}, False),
+])
+def test_is_healthy_row(row, healthy):
+    """
+    Test 'do_audit.journal.is_healthy_row'
+    """
+    assert journal.is_healthy_row(row) is healthy
+
+
+def test_probe_journal_record(tmpdir):
+    """
+    Test 'do_audit.journal.ProbeJournal.record'
+    """
+    filepath = tmpdir.join('journal.jsonl')
+
+    probe_journal = journal.ProbeJournal(str(filepath))
+    probe_journal.record('digest', 'http://example.com', HEADERS, [
+        'example.com', 'http://example.com', None, 'Connection error', ValueError('error'),
+    ])
+
+    assert probe_journal.is_done('digest', 'http://example.com')
+    assert not probe_journal.is_done('other-digest', 'http://example.com')
+
+    # Entries are flushed straight away so they survive a crash
+    assert json.loads(filepath.read()) == {
+        'digest': 'digest',
+        'url': 'http://example.com',
+        'mode': 'get',
+        'row': {
+            'Domain': 'example.com',
+            'URL': 'http://example.com',
+            'Status code': None,
+            'Error': 'Connection error',
+            'Exception': 'error',
+        },
+    }
+
+    probe_journal.close()
+
+
+def test_probe_journal_resume(tmpdir):
+    """
+    Test resuming from an existing 'do_audit.journal.ProbeJournal'
+    """
+    filepath = tmpdir.join('journal.jsonl')
+
+    probe_journal = journal.ProbeJournal(str(filepath))
+    probe_journal.record('digest', 'http://example.com', HEADERS, [
+        'example.com', 'http://example.com', '200 (OK)', None, None,
+    ])
+    probe_journal.close()
+
+    # Simulate a partially written line of a killed run
+    with filepath.open('a') as fp:
+        fp.write('{"digest": "digest", "url": "https://exa')
+
+    probe_journal = journal.ProbeJournal(str(filepath), resume=True)
+
+    assert probe_journal.is_done('digest', 'http://example.com')
+    assert not probe_journal.is_done('digest', 'https://example.com')
+    assert probe_journal.is_done('digest', 'http://example.com', ['URL', 'Status code', 'Cached'])
+
+    # Entries journaled with fewer columns or with another probe mode are probed again
+    assert not probe_journal.is_done('digest', 'http://example.com', ['URL', 'Status code', 'Droplet'])
+    assert not probe_journal.is_done('digest', 'http://example.com', mode='tcp+get')
+    assert probe_journal.get_row('digest', 'http://example.com', ['URL', 'Status code', 'Droplet']) == [
+        'http://example.com', '200 (OK)', None,
+    ]
+
+    probe_journal.record('digest', 'https://example.com', HEADERS, [
+        'example.com', 'https://example.com', '200 (OK)', None, None,
+    ])
+    probe_journal.close()
+
+    assert len(journal.ProbeJournal.load(str(filepath))) == 2
+
+    # Entries journaled before the probe modes were added were probed with GET requests
+    with filepath.open('a') as fp:
+        fp.write('{"digest": "digest", "url": "http://blog.example.com", "row": {"URL": "http://blog.example.com"}}\n')
+
+    probe_journal = journal.ProbeJournal(str(filepath), resume=True)
+    assert probe_journal.is_done('digest', 'http://blog.example.com', ['URL'], 'get')
+    assert not probe_journal.is_done('digest', 'http://blog.example.com', ['URL'], 'head')
+    probe_journal.close()
+
+    # Starting a new run truncates the journal
+    probe_journal = journal.ProbeJournal(str(filepath))
+    probe_journal.close()
+
+    assert filepath.read() == ''
+
+
+def test_probe_journal_history(tmpdir):
+    """
+    Test 'do_audit.journal.ProbeJournal.is_healthy' uses the previous run even when it isn't resumed
+    """
+    filepath = tmpdir.join('journal.jsonl')
+
+    probe_journal = journal.ProbeJournal(str(filepath))
+    probe_journal.record('old digest', 'http://example.com', HEADERS, [
+        'example.com', 'http://example.com', None, "Connection error", None,
+    ])
+    probe_journal.record('digest', 'http://example.com', HEADERS, [
+        'example.com', 'http://example.com', '200 (OK)', None, None,
+    ])
+    probe_journal.record('digest', 'https://example.com', HEADERS, [
+        'example.com', 'https://example.com', None, "SSL error", None,
+    ])
+    probe_journal.close()
+
+    probe_journal = journal.ProbeJournal(str(filepath))
+
+    assert not probe_journal.is_done('digest', 'http://example.com')
+    assert probe_journal.is_healthy('http://example.com')
+    assert not probe_journal.is_healthy('https://example.com')
+    assert not probe_journal.is_healthy('http://blog.example.com')
+
+    # Error responses failed too
+    probe_journal.record('digest', 'http://www.example.com', HEADERS, [
+        'example.com', 'http://www.example.com', '500 (Internal Server Error)', None, None,
+    ])
+    assert not probe_journal.is_healthy('http://www.example.com')
+
+    probe_journal.close()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.metrics' file
+"""
+from __future__ import unicode_literals
+
+import json
+import threading
+
+import click
+import pytest
+import requests
+from six.moves import BaseHTTPServer
+from six.moves.urllib.parse import parse_qs, urlparse
+
+from do_audit import metrics
+
+
+def matrix(values, **labels):
+    """Create fake monitoring API series"""
+    return {'metric': labels, 'values': [[timestamp, str(value)] for timestamp, value in values]}
+
+
+SERIES = {
+    'cpu': [
+        matrix([(0, 0), (60, 30), (120, 90)], mode='user'),
+        matrix([(0, 0), (60, 30), (120, 30)], mode='idle'),
+    ],
+    'memory_total': [matrix([(0, 1000), (60, 1000)])],
+    'memory_available': [matrix([(0, 750), (60, 250)])],
+    'bandwidth': [matrix([(0, 1.0), (60, 3.0)], direction='inbound')],
+}
+
+
+class StubMonitoringHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Serve the `SERIES` from the monitoring API paths, rate limiting the first `server.throttle` requests"""
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append((url.path, parse_qs(url.query), self.headers.get('Authorization')))
+
+        if self.server.throttle:
+            self.server.throttle -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+
+        name = url.path.rstrip('/').rsplit('/', 1)[-1]
+        if name not in SERIES:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps({'status': 'success', 'data': {'resultType': 'matrix', 'result': SERIES[name]}})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Local stub monitoring API server"""
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), StubMonitoringHandler)
+    server.requests = []
+    server.throttle = 0
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def manager(manager, server):
+    """Mock Digital Ocean manager pointing at the stub server"""
+    manager.end_point = 'http://127.0.0.1:{}/v2/'.format(server.server_address[1])
+    return manager
+
+
+def test_cpu_utilization():
+    """
+    Test 'do_audit.metrics.cpu_utilization'
+    """
+    assert metrics.cpu_utilization(SERIES['cpu']) == [50.0, 100.0]
+    assert metrics.cpu_utilization([]) == []
+    assert metrics.cpu_utilization([matrix([(0, 10)], mode='idle')]) == []
+
+
+def test_memory_utilization():
+    """
+    Test 'do_audit.metrics.memory_utilization'
+    """
+    assert metrics.memory_utilization(SERIES['memory_total'], SERIES['memory_available']) == [25.0, 75.0]
+    assert metrics.memory_utilization([], SERIES['memory_available']) == []
+
+
+def test_series_columns():
+    """
+    Test 'do_audit.metrics.series_columns' only keeps the shared timestamps
+    """
+    timestamps, columns = metrics.series_columns([
+        matrix([(0, 1), (60, 2), (120, 3)]),
+        matrix([(60, 20), (120, 30), (180, 40)]),
+    ])
+
+    assert timestamps == [60, 120]
+    assert columns == [[2.0, 3.0], [20.0, 30.0]]
+
+
+def test_summarize():
+    """
+    Test 'do_audit.metrics.summarize'
+    """
+    assert metrics.summarize([float(value) for value in range(1, 21)]) == (10.5, 19.0)
+    assert metrics.summarize([]) == (None, None)
+
+
+def test_retry_after(mocker):
+    """
+    Test 'do_audit.metrics.retry_after'
+    """
+    mocker.patch('time.time', return_value=1494247942.0)
+
+    assert metrics.retry_after('3') == 3.0
+    assert metrics.retry_after('Mon, 08 May 2017 12:52:32 GMT') == 10.0
+    assert metrics.retry_after('Mon, 08 May 2017 12:52:02 GMT') == 0.0
+    assert metrics.retry_after('soon') == 1.0
+    assert metrics.retry_after(None) == 1.0
+
+
+def test_rate_limiter(mocker):
+    """
+    Test 'do_audit.metrics.RateLimiter' spaces the requests evenly
+    """
+    sleep = mocker.patch('time.sleep')
+    mocker.patch.object(metrics, 'timer', return_value=100.0)
+
+    limiter = metrics.RateLimiter(rate=4)
+    for _ in range(3):
+        limiter.wait()
+
+    assert [call[0][0] for call in sleep.call_args_list] == [0.25, 0.5]
+
+
+def test_metrics_client_fetch(manager, server, mocker):
+    """
+    Test 'do_audit.metrics.MetricsClient.fetch'
+    """
+    client = metrics.MetricsClient(manager, window=600, rate=1000)
+    droplets = [mocker.Mock(id=1), mocker.Mock(id=2)]
+
+    summaries = client.fetch(droplets)
+
+    assert list(summaries) == [1, 2]
+    assert summaries[1] == {
+        'CPU avg': 75.0, 'CPU p95': 100.0, 'Memory avg': 50.0, 'Memory p95': 75.0,
+        'Inbound avg': 2.0, 'Inbound p95': 3.0, 'Outbound avg': 2.0, 'Outbound p95': 3.0,
+    }
+
+    # Every series of every droplet is requested once
+    assert len(server.requests) == 2 * len(metrics.METRICS_SERIES)
+
+    path, params, authorization = [request for request in server.requests if 'outbound' in request[1].get(
+        'direction', [])][0]
+    assert path == '/v2/monitoring/metrics/droplet/bandwidth'
+    assert params['interface'] == ['public']
+    assert int(params['end'][0]) - int(params['start'][0]) == 600
+    assert authorization == 'Bearer token'
+
+
+def test_metrics_client_rate_limited(manager, server):
+    """
+    Test 'do_audit.metrics.MetricsClient.get_series' retries rate limited requests
+    """
+    server.throttle = 2
+    client = metrics.MetricsClient(manager, rate=1000, retries=2)
+
+    assert client.get_series('memory_total', 1, 0, 60) == SERIES['memory_total']
+    assert len(server.requests) == 3
+
+    server.throttle = 2
+    client.retries = 1
+
+    with pytest.raises(click.ClickException) as excinfo:
+        client.get_series('memory_total', 1, 0, 60)
+    assert 'unable to fetch droplet 1 memory_total metrics' in excinfo.value.message
+
+
+def test_metrics_client_request_error(manager, mocker):
+    """
+    Test 'do_audit.metrics.MetricsClient.get_series' when the API can't be reached
+    """
+    session = mocker.Mock()
+    session.get.side_effect = requests.exceptions.Timeout('timed out')
+    client = metrics.MetricsClient(manager, rate=1000, session=session, timeout=5)
+
+    with pytest.raises(click.ClickException) as excinfo:
+        client.get_series('cpu', 1, 0, 60)
+    assert "unable to fetch droplet 1 cpu metrics: 'timed out'" in excinfo.value.message
+    assert session.get.call_args[1]['timeout'] == 5
+
+
+def test_metrics_client_fetch_partial(manager, mocker):
+    """
+    Test 'do_audit.metrics.MetricsClient.fetch' keeps the summaries fetched before one of the droplets failed
+    """
+    client = metrics.MetricsClient(manager, rate=1000)
+    mocker.patch.object(client, 'get_summary', side_effect=lambda droplet_id, start, end: (
+        {'CPU avg': 1.0} if droplet_id == 1 else client.get_series('missing', droplet_id, start, end)
+    ))
+    mocker.patch.object(client, 'get_series', side_effect=click.ClickException('error'))
+    secho = mocker.patch('click.secho')
+
+    assert client.fetch([mocker.Mock(id=1), mocker.Mock(id=2)]) == {1: {'CPU avg': 1.0}}
+    assert 'metrics of 1 droplets are missing' in secho.call_args[0][0]
+
+    # Unless none of them could be fetched
+    with pytest.raises(click.ClickException):
+        client.fetch([mocker.Mock(id=2)])
+
+
+def test_metrics_client_hourly_budget(manager, server, mocker):
+    """
+    Test 'do_audit.metrics.MetricsClient.fetch' refuses to go over the hourly budget
+    """
+    client = metrics.MetricsClient(manager, rate=1000, hourly_budget=len(metrics.METRICS_SERIES))
+
+    with pytest.raises(click.ClickException) as excinfo:
+        client.fetch([mocker.Mock(id=1), mocker.Mock(id=2)])
+    assert 'needs 10 API requests' in excinfo.value.message
+    assert not server.requests
+
+    assert list(client.fetch([mocker.Mock(id=1)])) == [1]
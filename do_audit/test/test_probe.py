@@ -0,0 +1,554 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.probe' file
+"""
+from __future__ import unicode_literals
+
+import socket
+import time
+from collections import OrderedDict
+
+import digitalocean
+import pytest
+import requests
+import six
+
+from do_audit import fingerprint, probe
+from do_audit.cache import ProbeCache
+from do_audit.journal import ProbeJournal, zone_digest
+from do_audit.progress import ProbeStats
+
+
+ZONE_FILE = (
+    '$ORIGIN example.com.\n'
+    '@ 1800 IN SOA ns1.digitalocean.com. hostmaster 0 0 0 0 0\n'
+    '@ 1800 IN NS ns1.digitalocean.com.\n'
+    '@ 1800 IN A 192.168.0.1\n'
+    'blog 1800 IN A 192.168.0.2\n'
+)
+
+
+def mock_response(mocker, text='', ip='192.168.0.1', port=80, headers=None):
+    """Create fake streamed `requests` response"""
+    response = mocker.Mock(status_code=200, reason='OK', encoding='utf-8', headers=headers or {})
+    response.iter_content.return_value = iter([text.encode('utf-8')])
+
+    if six.PY2:
+        response.raw._fp.fp._sock.getpeername.return_value = (ip, port)
+    else:
+        response.raw._fp.fp.raw._sock.getpeername.return_value = (ip, port)
+
+    return response
+
+
+def test_probe_url(mocker):
+    """
+    Test 'do_audit.probe.probe_url'
+    """
+    response = mock_response(mocker, text='<html><title>Welcome to nginx!</title></html>')
+    mocker.patch('requests.get', return_value=response)
+
+    do_droplets = {'192.168.0.1': ('droplet', 'https://cloud.digitalocean.com/droplets/1/graphs')}
+    row = probe.probe_url('example.com', 'http://example.com', 3, do_droplets)
+
+    assert row == [
+        'example.com', 'http://example.com', 'get', '200 (OK)', '192.168.0.1', 80,
+        'droplet (https://cloud.digitalocean.com/droplets/1/graphs)', 'Default NGINX', None, None, None,
+    ]
+    requests.get.assert_called_once_with('http://example.com', timeout=3, stream=True)
+
+    # Only the body prefix is read
+    response.iter_content.assert_called_once_with(fingerprint.BODY_PREFIX_SIZE)
+    response.close.assert_called_once_with()
+
+
+def test_probe_url_signatures(mocker):
+    """
+    Test 'do_audit.probe.probe_url' with custom signatures
+    """
+    fingerprinter = fingerprint.Fingerprinter(OrderedDict([('Parked', r'for sale'), ('Grafana', r'grafana')]))
+
+    mocker.patch('requests.get', return_value=mock_response(mocker, text='Nothing to see here'))
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, ['Signatures'], fingerprinter=fingerprinter)
+    assert row == ['-']
+
+    mocker.patch('requests.get', return_value=mock_response(mocker, text='Grafana, this domain is for sale'))
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, ['Signatures'], fingerprinter=fingerprinter)
+    assert row == ['Parked, Grafana']
+
+
+def test_probe_url_columns(mocker):
+    """
+    Test 'do_audit.probe.probe_url' with only some of the columns requested
+    """
+    response = mock_response(mocker)
+    mocker.patch('requests.get', return_value=response)
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=['URL', 'Status code'])
+
+    assert row == ['http://example.com', '200 (OK)']
+
+    # Body is never read when the 'Signatures' column isn't requested
+    assert not response.iter_content.called
+    response.close.assert_called_once_with()
+
+
+@pytest.mark.parametrize('exception,error', [
+    (requests.exceptions.Timeout, "Request timed out"),
+    (requests.exceptions.SSLError, "SSL error"),
+    (requests.exceptions.ConnectionError, "Connection error"),
+    (requests.exceptions.TooManyRedirects, "Too many redirects"),
+])
+def test_probe_url_error(exception, error, mocker):
+    """
+    Test 'do_audit.probe.probe_url' when the request fails
+    """
+    e = exception('error')
+    mocker.patch('requests.get', side_effect=e)
+
+    row = probe.probe_url('example.com', 'https://example.com', 3, {})
+
+    assert row == ['example.com', 'https://example.com', 'get', None, None, None, None, None, None, error, e]
+
+
+def test_probe_url_tcp(mocker):
+    """
+    Test 'do_audit.probe.probe_url' in the TCP connect mode
+    """
+    connection = mocker.Mock()
+    connection.getpeername.return_value = ('192.168.0.1', 443)
+    create_connection = mocker.patch('socket.create_connection', return_value=connection)
+    requests_get = mocker.patch('requests.get')
+
+    headers = ['URL', 'Probe', 'Status code', 'IP', 'Port', 'Signatures']
+    row = probe.probe_url('example.com', 'https://example.com', 3, {}, headers=headers, mode='tcp')
+
+    assert row == ['https://example.com', 'tcp', 'Connected', '192.168.0.1', 443, None]
+    create_connection.assert_called_once_with(('example.com', 443), timeout=3)
+    connection.close.assert_called_once_with()
+    assert not requests_get.called
+
+    # Plain HTTP URLs use port 80
+    probe.probe_url('example.com', 'http://example.com', 3, {}, headers=headers, mode='tcp')
+    create_connection.assert_called_with(('example.com', 80), timeout=3)
+
+
+@pytest.mark.parametrize('exception,error', [
+    (socket.timeout, "Request timed out"),
+    (socket.error, "Connection error"),
+    (socket.gaierror, "Connection error"),
+])
+def test_probe_url_tcp_error(exception, error, mocker):
+    """
+    Test 'do_audit.probe.probe_url' in the TCP connect mode when the connection fails
+    """
+    e = exception('error')
+    mocker.patch('socket.create_connection', side_effect=e)
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=['Probe', 'Error', 'Exception'],
+                          mode='tcp')
+
+    assert row == ['tcp', error, e]
+
+
+def test_probe_url_head(mocker):
+    """
+    Test 'do_audit.probe.probe_url' in the HEAD request mode
+    """
+    response = mock_response(mocker, headers={'X-Adblock-Key': 'key'})
+    mocker.patch('requests.head', return_value=response)
+    requests_get = mocker.patch('requests.get')
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=['Probe', 'Status code', 'Signatures'],
+                          mode='head')
+
+    # Only the headers signatures can match
+    assert row == ['head', '200 (OK)', 'Parked domain']
+    requests.head.assert_called_once_with('http://example.com', timeout=3, stream=True, allow_redirects=True)
+    assert not requests_get.called
+
+
+def test_probe_url_escalate(mocker):
+    """
+    Test 'do_audit.probe.probe_url' escalating to a GET request
+    """
+    connection = mocker.Mock()
+    connection.getpeername.return_value = ('192.168.0.1', 80)
+    mocker.patch('socket.create_connection', return_value=connection)
+    mocker.patch('requests.get', return_value=mock_response(mocker, text='<title>Welcome to nginx!</title>'))
+
+    headers = ['Probe', 'Status code', 'Signatures', 'Error']
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=headers, mode='tcp', escalate=True)
+
+    assert row == ['get', '200 (OK)', 'Default NGINX', None]
+    requests.get.assert_called_once_with('http://example.com', timeout=3, stream=True)
+
+    # Targets that failed the cheaper probe aren't escalated
+    requests.get.reset_mock()
+    mocker.patch('socket.create_connection', side_effect=socket.error('error'))
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=headers, mode='tcp', escalate=True)
+
+    assert row == ['tcp', None, None, 'Connection error']
+    assert not requests.get.called
+
+
+def test_probe_url_deadline(mocker):
+    """
+    Test 'do_audit.probe.probe_url' never waits for the server past the deadline
+    """
+    connection = mocker.Mock()
+    connection.getpeername.return_value = ('192.168.0.1', 80)
+    create_connection = mocker.patch('socket.create_connection', return_value=connection)
+    mocker.patch('requests.get', return_value=mock_response(mocker))
+
+    deadline = mocker.Mock()
+    deadline.remaining.side_effect = [2, 1, 1]
+
+    headers = ['Probe', 'Status code']
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=headers, mode='tcp', escalate=True,
+                          deadline=deadline)
+
+    # Timeouts are capped again before the escalation request
+    assert row == ['get', '200 (OK)']
+    create_connection.assert_called_once_with(('example.com', 80), timeout=2)
+    requests.get.assert_called_once_with('http://example.com', timeout=1, stream=True)
+
+    # The escalation request isn't sent when there's no time left
+    requests.get.reset_mock()
+    deadline.remaining.side_effect = [1, 0]
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=headers, mode='tcp', escalate=True,
+                          deadline=deadline)
+
+    assert row == ['tcp', 'Connected']
+    assert not requests.get.called
+
+    # Nothing is sent when the deadline has already passed
+    create_connection.reset_mock()
+    deadline.remaining.side_effect = [0]
+
+    row = probe.probe_url('example.com', 'http://example.com', 3, {}, headers=['Probe', 'Error'], mode='tcp',
+                          escalate=True, deadline=deadline)
+
+    assert row == [None, "Skipped (deadline)"]
+    assert not create_connection.called
+    assert not requests.get.called
+
+
+def test_iter_ping_rows(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows'
+    """
+    # Errors are always probed, for the journal history
+    probe_url = mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, *args, **kwargs: [url, None])
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+
+    results = probe.iter_ping_rows(domains, ['URL'], 3, {})
+    assert not probe_url.called
+
+    assert list(results) == [
+        ('example.com', 'http://example.com', ['http://example.com']),
+        ('example.com', 'https://example.com', ['https://example.com']),
+        ('example.com', 'http://blog.example.com', ['http://blog.example.com']),
+        ('example.com', 'https://blog.example.com', ['https://blog.example.com']),
+    ]
+
+    # Only records pointing at the given addresses are probed
+    results = probe.iter_ping_rows(domains, ['URL'], 3, {}, addresses={'192.168.0.2'})
+    assert [url for _, url, _ in results] == ['http://blog.example.com', 'https://blog.example.com']
+
+    # Journaled probes aren't sent again
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    journal.record(zone_digest(ZONE_FILE), 'http://example.com', ['URL'], ['http://example.com'])
+    probe_url.reset_mock()
+
+    assert len(list(probe.iter_ping_rows(domains, ['URL'], 3, {}, journal=journal))) == 4
+    assert probe_url.call_count == 3
+    assert journal.is_done(zone_digest(ZONE_FILE), 'https://blog.example.com')
+
+    # Unless they're missing some of the requested columns
+    probe_url.reset_mock()
+    probe_url.side_effect = lambda domain, url, *args, **kwargs: [url, 'example.com', None]
+
+    results = list(probe.iter_ping_rows(domains, ['URL', 'Domain'], 3, {}, journal=journal))
+    assert results[0] == ('example.com', 'http://example.com', ['http://example.com', 'example.com'])
+    assert probe_url.call_count == 4
+
+    # Or they were probed with another probe mode
+    probe_url.reset_mock()
+
+    assert len(list(probe.iter_ping_rows(domains, ['URL', 'Domain'], 3, {}, journal=journal, mode='tcp'))) == 4
+    assert probe_url.call_count == 4
+    assert journal.is_done(zone_digest(ZONE_FILE), 'http://example.com', ['URL'], 'tcp')
+
+    journal.close()
+
+
+def test_iter_ping_rows_workers(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' with concurrent probes
+    """
+    def slow_probe_url(domain, url, *args, **kwargs):
+        # The first probes complete last
+        time.sleep(0.05 if 'blog' not in url else 0)
+        return [url, None]
+
+    mocker.patch.object(probe, 'probe_url', side_effect=slow_probe_url)
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    journal.record(zone_digest(ZONE_FILE), 'https://example.com', ['URL'], ['journaled'])
+
+    results = probe.iter_ping_rows(domains, ['URL'], 3, {}, journal=journal, max_workers=4)
+
+    # Results are still in the zone records order
+    assert [row for _, _, row in results] == [
+        ['http://example.com'], ['journaled'], ['http://blog.example.com'], ['https://blog.example.com'],
+    ]
+    assert probe.probe_url.call_count == 3
+    assert journal.is_done(zone_digest(ZONE_FILE), 'http://blog.example.com')
+
+    journal.close()
+
+
+def test_iter_ping_rows_stats(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' collecting statistics
+    """
+    mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, timeout, do_droplets, headers, **kwargs: [
+        url, "Connection error" if 'blog' in url else None,
+    ][:len(headers)])
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    journal.record(zone_digest(ZONE_FILE), 'http://example.com', ['URL'], ['http://example.com'])
+
+    stats = ProbeStats()
+    results = list(probe.iter_ping_rows(domains, ['URL'], 3, {}, journal=journal, stats=stats, max_workers=2))
+
+    # Errors are counted even when they aren't requested
+    assert [row for _, _, row in results] == [
+        ['http://example.com'], ['https://example.com'], ['http://blog.example.com'], ['https://blog.example.com'],
+    ]
+    assert probe.probe_url.call_args[1]['headers'] == ['URL', 'Error']
+
+    summary = stats.summary()
+    assert summary['planned'] == 4
+    assert summary['done'] == 4
+    assert summary['resumed'] == 1
+    assert summary['errors'] == {"Connection error": 2}
+    assert summary['latency']['max'] is not None
+
+    journal.close()
+
+
+def test_iter_ping_rows_deadline_priority(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' probes the new and previously failed targets first with the deadline
+    """
+    probe_url = mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, *args, **kwargs: [url, None])
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+    deadline = mocker.Mock(expired=False)
+    deadline.remaining.return_value = 60
+
+    # Previous run, 'https://blog.example.com' was never probed
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    journal.record('old digest', 'http://example.com', ['URL', 'Error'], ['http://example.com', None])
+    journal.record('old digest', 'https://example.com', ['URL', 'Error'], ['https://example.com', "SSL error"])
+    journal.record('old digest', 'http://blog.example.com', ['URL', 'Error'], ['http://blog.example.com', None])
+    journal.close()
+
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    results = list(probe.iter_ping_rows(domains, ['URL'], 3, {}, journal=journal, deadline=deadline))
+
+    assert [call[0][1] for call in probe_url.call_args_list] == [
+        'https://example.com', 'https://blog.example.com', 'http://example.com', 'http://blog.example.com',
+    ]
+
+    # Results are yielded in the priority order, as they're probed
+    assert [url for _, url, _ in results] == [
+        'https://example.com', 'https://blog.example.com', 'http://example.com', 'http://blog.example.com',
+    ]
+
+    journal.close()
+
+
+def test_iter_ping_rows_deadline_expired(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' skips the targets once the deadline passes
+    """
+    def fake_probe_url(domain, url, timeout, do_droplets, headers, **kwargs):
+        # The probe in flight is cut short by the deadline
+        deadline.expired = True
+        deadline.remaining.return_value = 0
+        return [url, "Request timed out"]
+
+    probe_url = mocker.patch.object(probe, 'probe_url', side_effect=fake_probe_url)
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+    deadline = mocker.Mock(expired=False)
+    deadline.remaining.return_value = 1
+
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    stats = ProbeStats()
+    results = list(probe.iter_ping_rows(
+        domains, ['URL', 'Error'], 3, {}, journal=journal, stats=stats, deadline=deadline,
+    ))
+
+    # The probes after the deadline aren't sent at all
+    assert probe_url.call_count == 1
+    assert probe_url.call_args[1]['deadline'] is deadline
+
+    assert [row for _, _, row in results] == [
+        ['http://example.com', "Skipped (deadline)"],
+        ['https://example.com', "Skipped (deadline)"],
+        ['http://blog.example.com', "Skipped (deadline)"],
+        ['https://blog.example.com', "Skipped (deadline)"],
+    ]
+
+    summary = stats.summary()
+    assert summary['done'] == 4
+    assert summary['skipped'] == 4
+    assert summary['errors'] == {}
+
+    # Skipped targets are probed again on resume
+    assert not journal.entries
+
+    journal.close()
+
+
+def test_iter_ping_rows_deadline_race(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' skips the targets when the deadline passes right before the request
+    """
+    mocker.patch('requests.get')
+    mocker.patch.object(probe, 'resolve_url', return_value='192.168.0.1')
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+
+    # The deadline passes between the `expired` check and the request
+    deadline = mocker.Mock(expired=False)
+    deadline.remaining.return_value = 0.0
+
+    journal = ProbeJournal(str(tmpdir.join('journal.jsonl')))
+    probe_cache = ProbeCache(str(tmpdir.join('cache.json')))
+    stats = ProbeStats()
+    results = list(probe.iter_ping_rows(
+        domains, ['URL', 'Error'], 3, {}, journal=journal, stats=stats, deadline=deadline, cache=probe_cache,
+        max_workers=2,
+    ))
+
+    assert not requests.get.called
+    assert [row for _, _, row in results] == [
+        ['http://example.com', "Skipped (deadline)"],
+        ['https://example.com', "Skipped (deadline)"],
+        ['http://blog.example.com', "Skipped (deadline)"],
+        ['https://blog.example.com', "Skipped (deadline)"],
+    ]
+    assert stats.summary()['skipped'] == 4
+    assert stats.snapshot()['in_flight'] == 0
+
+    # Neither journaled nor cached
+    assert not journal.entries
+    assert not probe_cache.entries
+
+    journal.close()
+
+
+def test_iter_ping_rows_cache(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' serving fresh results from the cache
+    """
+    probe_url = mocker.patch.object(probe, 'probe_url', side_effect=lambda domain, url, *args, **kwargs: [
+        url, '200 (OK)' if 'blog' not in url else None, None, "Connection error" if 'blog' in url else None,
+    ])
+    resolve_url = mocker.patch.object(probe, 'resolve_url', side_effect=lambda url, timeout: (
+        '192.168.0.2' if 'blog' in url else '192.168.0.1'
+    ))
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+    headers = ['URL', 'Status code', 'Cached']
+
+    probe_cache = ProbeCache(str(tmpdir.join('cache.json')))
+    assert [row for _, _, row in probe.iter_ping_rows(domains, headers, 3, {}, cache=probe_cache)] == [
+        ['http://example.com', '200 (OK)', None],
+        ['https://example.com', '200 (OK)', None],
+        ['http://blog.example.com', None, None],
+        ['https://blog.example.com', None, None],
+    ]
+    probe_cache.close()
+
+    # Only the failed targets are probed again
+    probe_url.reset_mock()
+    probe_cache = ProbeCache(str(tmpdir.join('cache.json')))
+    stats = ProbeStats()
+    results = list(probe.iter_ping_rows(domains, headers, 3, {}, cache=probe_cache, stats=stats))
+
+    assert [call[0][1] for call in probe_url.call_args_list] == ['http://blog.example.com', 'https://blog.example.com']
+    assert [row for _, _, row in results][:2] == [
+        ['http://example.com', '200 (OK)', 'Yes'],
+        ['https://example.com', '200 (OK)', 'Yes'],
+    ]
+    assert stats.summary()['cached'] == 2
+
+    # Changed zone files or droplets aren't served from the cache
+    probe_url.reset_mock()
+    do_droplets = {'192.168.0.1': ('web', 'https://cloud.digitalocean.com/droplets/1/graphs')}
+    list(probe.iter_ping_rows(domains, headers, 3, do_droplets, cache=probe_cache))
+    assert probe_url.call_count == 4
+
+    probe_url.reset_mock()
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE + 'www 1800 IN CNAME @\n')]
+    list(probe.iter_ping_rows(domains, headers, 3, {}, cache=probe_cache))
+    assert probe_url.call_count == 6
+
+    # The lookups are capped to the time left
+    resolve_url.reset_mock()
+    deadline = mocker.Mock(expired=False)
+    deadline.remaining.return_value = 1.5
+    list(probe.iter_ping_rows(domains, headers, 3, {}, cache=probe_cache, deadline=deadline))
+    assert resolve_url.call_args_list[0] == mocker.call('http://example.com', 1.5)
+
+    probe_cache.close()
+
+
+def test_iter_ping_rows_deadline_cache(tmpdir, mocker):
+    """
+    Test 'do_audit.probe.iter_ping_rows' still serves fresh cached results after the deadline
+    """
+    probe_url = mocker.patch.object(probe, 'probe_url')
+    resolve_url = mocker.patch.object(probe, 'resolve_url', return_value='192.168.0.1')
+    domains = [digitalocean.Domain(zone_file=ZONE_FILE)]
+    headers = ['URL', 'Cached', 'Error']
+    deadline = mocker.Mock(expired=True)
+    deadline.remaining.return_value = 0
+
+    probe_cache = ProbeCache(str(tmpdir.join('cache.json')))
+    probe_cache.store('https://example.com', '192.168.0.1', probe.probe_state(zone_digest(ZONE_FILE), None, 'get'),
+                      headers, ['https://example.com', None, None])
+    stats = ProbeStats()
+
+    results = list(probe.iter_ping_rows(domains, headers, 3, {}, cache=probe_cache, stats=stats, deadline=deadline))
+
+    assert [row for _, _, row in results] == [
+        ['http://example.com', None, "Skipped (deadline)"],
+        ['https://example.com', 'Yes', None],
+        ['http://blog.example.com', None, "Skipped (deadline)"],
+        ['https://blog.example.com', None, "Skipped (deadline)"],
+    ]
+    assert not probe_url.called
+
+    # The hosts aren't resolved past the deadline, the URLs last cached IP address is used instead
+    assert not resolve_url.called
+    assert stats.summary()['cached'] == 1
+    assert stats.summary()['skipped'] == 3
+
+
+def test_probe_result():
+    """
+    Test 'do_audit.probe.ProbeResult'
+    """
+    result = probe.ProbeResult.from_row('example.com', 'http://example.com', ['Status code', 'IP'], ['200 (OK)', '::1'])
+
+    assert result.domain == 'example.com'
+    assert result.status_code == '200 (OK)'
+    assert result.port is None
+    assert result.to_row(['IP', 'URL']) == ['::1', 'http://example.com']
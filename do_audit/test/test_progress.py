@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.progress' file
+"""
+from __future__ import unicode_literals
+
+import io
+import json
+
+import pytest
+
+from do_audit import progress
+
+
+@pytest.mark.parametrize('percent,value', [
+    (0, 1),
+    (50, 5),
+    (90, 9),
+    (99, 10),
+    (100, 10),
+])
+def test_percentile(percent, value):
+    """
+    Test 'do_audit.progress.percentile'
+    """
+    assert progress.percentile(list(range(1, 11)), percent) == value
+    assert progress.percentile([], percent) is None
+
+
+def test_probe_stats(mocker):
+    """
+    Test 'do_audit.progress.ProbeStats'
+    """
+    reporter = mocker.Mock()
+    stats = progress.ProbeStats([reporter])
+
+    stats.plan(4)
+    stats.resume_probe()
+    stats.start_probe()
+    stats.start_probe()
+    stats.finish_probe(0.2)
+    stats.finish_probe(0.4, error="Request timed out")
+    stats.start_probe()
+
+    snapshot = stats.snapshot()
+    assert snapshot['planned'] == 4
+    assert snapshot['done'] == 3
+    assert snapshot['in_flight'] == 1
+    assert snapshot['probes_per_second'] > 0
+    assert snapshot['eta'] is not None
+    assert snapshot['errors'] == {"Request timed out": 1}
+
+    # Reporters are notified about every change
+    assert reporter.report.call_count == 4
+
+    stats.close()
+    reporter.report.assert_called_with(mocker.ANY, final=True)
+
+
+def test_probe_stats_rate(mocker):
+    """
+    Test 'do_audit.progress.ProbeStats.snapshot' counts the rate from the first planned targets
+    """
+    timer = mocker.patch.object(progress, 'timer', return_value=100.0)
+    stats = progress.ProbeStats()
+
+    # Fetching the domains and parsing the zones took a minute
+    timer.return_value = 160.0
+    stats.plan(4)
+    for _ in range(2):
+        stats.start_probe()
+        stats.finish_probe(0.1)
+
+    timer.return_value = 170.0
+    snapshot = stats.snapshot()
+    assert snapshot['probes_per_second'] == 0.2
+    assert snapshot['eta'] == 10.0
+
+    # The whole run is still timed
+    assert stats.summary()['elapsed'] == 70.0
+
+
+def test_probe_stats_summary(tmpdir, mocker):
+    """
+    Test 'do_audit.progress.ProbeStats.summary'
+    """
+    stats = progress.ProbeStats()
+
+    with stats.phase('zone_parse'):
+        pass
+    with progress.measure(stats, 'probe'):
+        for latency in [0.1, 0.3, 0.2]:
+            stats.start_probe()
+            stats.finish_probe(latency)
+
+    summary = stats.summary()
+
+    assert summary['planned'] == 0
+    assert summary['done'] == 3
+    assert summary['resumed'] == 0
+    assert summary['latency'] == {'min': 0.1, 'p50': 0.2, 'p90': 0.3, 'p95': 0.3, 'p99': 0.3, 'max': 0.3}
+    assert list(summary['phases']) == ['api_fetch', 'zone_parse', 'probe']
+    assert summary['phases']['api_fetch'] == 0
+    assert summary['phases']['probe'] >= 0
+
+    path = str(tmpdir.join('stats.json'))
+    stats.write_summary(path)
+    with io.open(path, encoding='utf-8') as fp:
+        assert json.load(fp)['latency']['max'] == 0.3
+
+
+def test_probe_stats_skip_probe():
+    """
+    Test 'do_audit.progress.ProbeStats.skip_probe'
+    """
+    stats = progress.ProbeStats()
+
+    stats.plan(3)
+    stats.start_probe()
+    stats.skip_probe(started=True)
+    stats.skip_probe()
+
+    snapshot = stats.snapshot()
+    assert snapshot['done'] == 2
+    assert snapshot['in_flight'] == 0
+    assert snapshot['probes_per_second'] == 0
+
+    summary = stats.summary()
+    assert summary['skipped'] == 2
+    assert summary['latency']['max'] is None
+
+
+def test_deadline(mocker):
+    """
+    Test 'do_audit.progress.Deadline'
+    """
+    timer = mocker.patch.object(progress, 'timer', return_value=100.0)
+    deadline = progress.Deadline(30)
+
+    timer.return_value = 110.0
+    assert deadline.remaining() == 20
+    assert not deadline.expired
+
+    timer.return_value = 140.0
+    assert deadline.remaining() == 0
+    assert deadline.expired
+
+
+def test_format_progress():
+    """
+    Test 'do_audit.progress.format_progress'
+    """
+    snapshot = {
+        'planned': 400, 'done': 120, 'in_flight': 8, 'probes_per_second': 35.24, 'eta': 7.9,
+        'errors': {"Connection error": 3},
+    }
+
+    assert progress.format_progress(snapshot) == (
+        'Probed 120/400 (8 in flight), 35.2/s, ETA 0:00:07, errors: Connection error 3'
+    )
+    assert progress.format_progress(dict(snapshot, eta=None, errors={})) == (
+        'Probed 120/400 (8 in flight), 35.2/s, ETA -'
+    )
+
+
+def test_progress_reporter_interval(mocker):
+    """
+    Test 'do_audit.progress.ProgressReporter' only shows the progress once every interval
+    """
+    class Reporter(progress.ProgressReporter):
+        write = mocker.Mock()
+
+    # Reporters need to implement `write`
+    with pytest.raises(TypeError):
+        progress.ProgressReporter()
+
+    reporter = Reporter(interval=60)
+    write = reporter.write
+
+    reporter.report({})
+    reporter.report({})
+    assert write.call_count == 1
+
+    # The final progress is always shown
+    reporter.report({}, final=True)
+    assert write.call_count == 2
+
+
+def test_stderr_progress(mocker):
+    """
+    Test 'do_audit.progress.StderrProgress'
+    """
+    click_echo = mocker.patch('click.echo')
+    snapshot = {'planned': 2, 'done': 1, 'in_flight': 1, 'probes_per_second': 1.0, 'eta': 1.0, 'errors': {}}
+
+    reporter = progress.StderrProgress()
+    reporter.isatty = False
+    reporter.report(snapshot)
+    click_echo.assert_called_once_with('Probed 1/2 (1 in flight), 1.0/s, ETA 0:00:01', err=True)
+
+    # The line is redrawn on a terminal
+    reporter.isatty = True
+    reporter.report(snapshot, final=True)
+    click_echo.assert_called_with('\r\033[KProbed 1/2 (1 in flight), 1.0/s, ETA 0:00:01', nl=True, err=True)
+
+
+def test_status_file_progress(tmpdir):
+    """
+    Test 'do_audit.progress.StatusFileProgress'
+    """
+    path = tmpdir.join('status.json')
+    reporter = progress.StatusFileProgress(str(path))
+
+    reporter.report({'planned': 2, 'done': 1})
+    assert json.loads(path.read()) == {'planned': 2, 'done': 1, 'finished': False}
+
+    reporter.report({'planned': 2, 'done': 2}, final=True)
+    assert json.loads(path.read()) == {'planned': 2, 'done': 2, 'finished': True}
+    assert tmpdir.listdir() == [path]
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.render' file
+"""
+from __future__ import unicode_literals
+
+import click
+import pytest
+
+from do_audit.render import Renderer
+
+
+def test_renderer_buffers_output(mocker):
+    """
+    Test 'do_audit.render.Renderer' writes the output in large chunks
+    """
+    click_echo = mocker.patch('click.echo')
+
+    with Renderer(color=False, pager=False) as renderer:
+        for n in range(100):
+            renderer.kvp('Key {}'.format(n), n)
+
+        assert not click_echo.called
+
+    click_echo.assert_called_once_with(
+        ''.join('{:<20}{}\n'.format('Key {}:'.format(n), n) for n in range(100)), nl=False, color=False,
+    )
+
+
+def test_renderer_buffer_size(mocker):
+    """
+    Test 'do_audit.render.Renderer' flushes the buffer once it's full
+    """
+    click_echo = mocker.patch('click.echo')
+
+    renderer = Renderer(color=False, pager=False, buffer_size=10)
+    renderer.write('12345')
+    assert not click_echo.called
+
+    renderer.write('67890')
+    click_echo.assert_called_once_with('12345\n67890\n', nl=False, color=False)
+
+    renderer.close()
+    assert click_echo.call_count == 1
+
+
+def test_renderer_autoflush(mocker):
+    """
+    Test 'do_audit.render.Renderer' writes every line right away with autoflush
+    """
+    click_echo = mocker.patch('click.echo')
+
+    renderer = Renderer(color=False, pager=False, autoflush=True)
+    renderer.write('first')
+    renderer.write('second')
+
+    assert click_echo.call_args_list == [
+        mocker.call('first\n', nl=False, color=False),
+        mocker.call('second\n', nl=False, color=False),
+    ]
+
+
+def test_renderer_style():
+    """
+    Test 'do_audit.render.Renderer' only styles the output when it's enabled
+    """
+    assert Renderer(color=False).style('text', fg='red') == 'text'
+    assert Renderer(color=True).style('text', fg='red') == click.style('text', fg='red')
+
+
+def test_renderer_pager(mocker):
+    """
+    Test 'do_audit.render.Renderer' streams output taller than the terminal through the pager
+    """
+    click_echo = mocker.patch('click.echo')
+    mocker.patch('do_audit.render.terminal_height', return_value=2)
+
+    paged = []
+    echo_via_pager = mocker.patch('click.echo_via_pager', side_effect=lambda chunks, color: paged.extend(chunks))
+
+    with Renderer(color=False, pager=True, buffer_size=1, pager_queue_size=1) as renderer:
+        for n in range(10):
+            renderer.write('line {}'.format(n))
+
+    assert not click_echo.called
+    assert echo_via_pager.call_count == 1
+    assert ''.join(paged) == ''.join('line {}\n'.format(n) for n in range(10))
+
+
+def test_renderer_pager_short_output(mocker):
+    """
+    Test 'do_audit.render.Renderer' doesn't start the pager for output that fits the terminal
+    """
+    click_echo = mocker.patch('click.echo')
+    echo_via_pager = mocker.patch('click.echo_via_pager')
+    mocker.patch('do_audit.render.terminal_height', return_value=24)
+
+    with Renderer(color=False, pager=True, buffer_size=1) as renderer:
+        renderer.write('first')
+        renderer.write('second')
+
+    assert not echo_via_pager.called
+    click_echo.assert_called_once_with('first\nsecond\n', nl=False, color=False)
+
+
+def test_renderer_pager_closed(mocker):
+    """
+    Test 'do_audit.render.Renderer' drops the rest of the output when the pager is closed early
+    """
+    mocker.patch('do_audit.render.terminal_height', return_value=0)
+
+    # The user quits the pager straight away
+    mocker.patch('click.echo_via_pager', side_effect=lambda chunks, color: next(iter(chunks)))
+
+    with Renderer(color=False, pager=True, buffer_size=1, pager_queue_size=1) as renderer:
+        for n in range(100):
+            renderer.write('line {}'.format(n))
+
+
+@pytest.mark.parametrize('isatty', [True, False])
+def test_renderer_defaults(isatty, mocker):
+    """
+    Test 'do_audit.render.Renderer' only styles and pages the output when it's a terminal
+    """
+    mocker.patch('sys.stdout.isatty', return_value=isatty)
+    renderer = Renderer()
+
+    assert renderer.color is isatty
+    assert renderer.pager is isatty
+
+
+def test_renderer_table(mocker):
+    """
+    Test 'do_audit.render.Renderer.table'
+    """
+    click_echo = mocker.patch('click.echo')
+
+    with Renderer(color=False, pager=False) as renderer:
+        renderer.table(['Name', 'IP', 'Port'], [
+            ['web', '192.168.0.1', 80],
+            ['database', None, 5432],
+        ])
+
+    click_echo.assert_called_once_with(
+        'Name      IP           Port\n'
+        '--------  -----------  ----\n'
+        'web       192.168.0.1  80\n'
+        'database               5432\n',
+        nl=False, color=False,
+    )
+
+
+def test_renderer_table_widths(mocker):
+    """
+    Test 'do_audit.render.Renderer.table' with precomputed widths and without sampling the rows
+    """
+    click_echo = mocker.patch('click.echo')
+
+    with Renderer(color=False, pager=False) as renderer:
+        renderer.table(['Name', 'IP'], iter([['web', '192.168.0.1'], ['database-primary', '10.0.0.1']]),
+                       widths={'Name': 8}, sample_size=0)
+
+    click_echo.assert_called_once_with(
+        'Name      IP\n'
+        '--------  --\n'
+        'web       192.168.0.1\n'
+        'database-primary  10.0.0.1\n',
+        nl=False, color=False,
+    )
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Test 'do_audit.resources' file
+"""
+from __future__ import unicode_literals
+
+import threading
+
+import click
+import digitalocean
+import pytest
+
+from do_audit import resources
+
+
+@pytest.fixture
+def manager(manager, make_droplet):
+    """Mock Digital Ocean manager with every resource type"""
+    manager.get_all_droplets.return_value = [
+        make_droplet(id=1, name='web-1', tags=['web']),
+        make_droplet(id=2, name='web-2', tags=['web']),
+        make_droplet(id=3, name='db'),
+    ]
+    manager.get_all_volumes.return_value = [digitalocean.Volume(id='v', droplet_ids=[3])]
+    manager.get_all_snapshots.return_value = [
+        digitalocean.Snapshot(id='s', resource_type='droplet', resource_id='1'),
+        digitalocean.Snapshot(id='vs', resource_type='volume', resource_id='v'),
+    ]
+    manager.get_all_floating_ips.return_value = [
+        digitalocean.FloatingIP(ip='192.168.100.1', droplet={'id': 2}),
+        digitalocean.FloatingIP(ip='192.168.100.2', droplet=None),
+    ]
+    manager.get_all_load_balancers.return_value = [digitalocean.LoadBalancer(id='lb', tag='web')]
+    manager.get_all_firewalls.return_value = [digitalocean.Firewall(id='fw', droplet_ids=[3], tags=['web'])]
+    manager.get_all_tags.return_value = [digitalocean.Tag(name='web')]
+    return manager
+
+
+def test_fetch_resources_concurrently(manager):
+    """
+    Test 'do_audit.resources.fetch_resources' fetches the listings at the same time
+    """
+    condition = threading.Condition()
+    started = []
+
+    def fetcher(name):
+        def fetch(*args, **kwargs):
+            # Every listing waits for all the others to start, which only finishes when they run concurrently
+            with condition:
+                started.append(name)
+                condition.notify_all()
+                while len(started) < len(resources.RESOURCE_TYPES):
+                    if not condition.wait(timeout=5):
+                        raise RuntimeError('Listings were not fetched concurrently')
+            return []
+        return fetch
+
+    for resource_type in resources.RESOURCE_TYPES:
+        getattr(manager, 'get_all_' + resource_type).side_effect = fetcher(resource_type)
+
+    snapshot = resources.fetch_resources(manager)
+
+    assert sorted(started) == sorted(resources.RESOURCE_TYPES)
+    assert snapshot.droplets == []
+
+
+def test_fetch_resources_error(manager):
+    """
+    Test 'do_audit.resources.fetch_resources' when one of the listings fails
+    """
+    manager.get_all_firewalls.side_effect = digitalocean.DataReadError('error')
+
+    with pytest.raises(click.ClickException):
+        resources.fetch_resources(manager, ['droplets', 'firewalls'])
+
+
+def test_resource_snapshot_indexes(manager):
+    """
+    Test 'do_audit.resources.ResourceSnapshot' cross reference indexes
+    """
+    snapshot = resources.fetch_resources(manager, ['droplets', 'volumes', 'snapshots', 'floating_ips',
+                                                   'load_balancers', 'firewalls'])
+
+    assert snapshot.tags == []
+    assert snapshot.droplets_by_id[3].name == 'db'
+
+    assert [volume.id for volume in snapshot.volumes_by_droplet[3]] == ['v']
+    assert [s.id for s in snapshot.snapshots_by_droplet[1]] == ['s']
+    assert [floating_ip.ip for floating_ip in snapshot.floating_ips_by_droplet[2]] == ['192.168.100.1']
+
+    # Tagged droplets are included
+    assert [lb.id for lb in snapshot.load_balancers_by_droplet[1]] == ['lb']
+    assert 3 not in snapshot.load_balancers_by_droplet
+    assert sorted(snapshot.firewalls_by_droplet) == [1, 2, 3]
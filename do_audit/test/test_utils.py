@@ -60,3 +60,27 @@ def test_droplet_url():
     """
     uuid = str(uuid4())
     assert utils.droplet_url(uuid) == 'https://cloud.digitalocean.com/droplets/{}/graphs'.format(uuid)
+
+
+@pytest.mark.parametrize('value,seconds', [
+    ('0', 0),
+    ('90', 90),
+    ('30s', 30),
+    ('15m', 900),
+    ('1h', 3600),
+    ('7D', 604800),
+])
+def test_parse_duration(value, seconds):
+    """
+    Test 'do_audit.utils.parse_duration'
+    """
+    assert utils.parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['', '1w', '-1h', '1.5h'])
+def test_parse_duration_invalid(value):
+    """
+    Test 'do_audit.utils.parse_duration' with invalid durations
+    """
+    with pytest.raises(ValueError):
+        utils.parse_duration(value)
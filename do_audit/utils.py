@@ -4,14 +4,21 @@ do-audit utils
 """
 from __future__ import unicode_literals
 
+import io
+import json
 import os
+import re
 
 import click
 import digitalocean
+import six
 
 
 DO_ACCESS_TOKEN_ENV = 'DO_ACCESS_TOKEN'
 
+# Duration units, in seconds
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
 
 def add_options(options):
     """
@@ -102,3 +109,37 @@ def droplet_url(droplet_id):
     :rtype: str
     """
     return 'https://cloud.digitalocean.com/droplets/{}/graphs'.format(droplet_id)
+
+
+def parse_duration(value):
+    """
+    Helper function for parsing human friendly durations, e.g. '90', '30s', '15m', '1h' or '7d'
+
+    :param value: duration, seconds if there's no unit
+    :type value: str
+    :returns: number of seconds
+    :rtype: int
+    :raises ValueError: when the duration isn't in the expected format
+    """
+    match = re.match(r'^\s*(\d+)\s*([smhd]?)\s*$', value.lower())
+    if not match:
+        raise ValueError("Invalid duration '{}', expected e.g. '90', '30s', '15m', '1h' or '7d'".format(value))
+
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def write_json_atomic(path, data):
+    """
+    Helper function for writing a JSON file so readers never see a partially written one
+
+    :param path: JSON file path
+    :type path: str
+    :param data: JSON serializable data
+    :type data: any
+    """
+    temp_path = '{}.tmp'.format(path)
+    with io.open(temp_path, 'w', encoding='utf-8') as fp:
+        fp.write(six.text_type(json.dumps(data)))
+
+    # `os.rename` can't replace existing files on Windows and `os.replace` is Python 3 only
+    getattr(os, 'replace', os.rename)(temp_path, path)
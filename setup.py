@@ -54,8 +54,9 @@ setup(
     include_package_data=True,
     scripts=['bin/do-audit'],
     install_requires=[
-        'click>=6.7',
+        'click>=7.0',
         'dnspython>=1.15.0',
+        'futures>=3.1.1; python_version < "3.0"',
         'python-dateutil>=2.6.0',
         'python-digitalocean>=1.11',
         'requests>=2.18.1',
@@ -63,6 +64,9 @@ setup(
         'tablib>=0.11.5',
     ],
     extras_require={
+        'columnar': [
+            'pyarrow',
+        ],
         'testing': [
             'pytest',
             'pytest-mock',